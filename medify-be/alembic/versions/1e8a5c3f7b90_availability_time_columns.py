@@ -0,0 +1,41 @@
+"""availability time columns
+
+Revision ID: 1e8a5c3f7b90
+Revises: c3d9f1a7b5e2
+Create Date: 2026-10-18 16:21:07.334862
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1e8a5c3f7b90'
+down_revision: Union[str, Sequence[str], None] = 'c3d9f1a7b5e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ('start_time', 'end_time')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # "HH:MM" -> time; chuỗi rỗng thành NULL
+    for column in COLUMNS:
+        op.alter_column(
+            'availabilities', column, type_=sa.Time(), existing_type=sa.String(),
+            postgresql_using=f"CAST(NULLIF(trim({column}), '') AS time)",
+        )
+    op.create_index('ix_availabilities_doctor_id_weekday', 'availabilities', ['doctor_id', 'weekday'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_availabilities_doctor_id_weekday', table_name='availabilities')
+    for column in COLUMNS:
+        op.alter_column(
+            'availabilities', column, type_=sa.String(), existing_type=sa.Time(),
+            postgresql_using=f"to_char({column}, 'HH24:MI')",
+        )
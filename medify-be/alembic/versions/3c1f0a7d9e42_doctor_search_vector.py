@@ -0,0 +1,86 @@
+"""doctor search vector
+
+Revision ID: 3c1f0a7d9e42
+Revises: a2e20931253e, ff790875856b
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+import re
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f0a7d9e42'
+# Gộp hai nhánh head cũ để `alembic upgrade head` chạy được
+down_revision: Union[str, Sequence[str], None] = ('a2e20931253e', 'ff790875856b')
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Cách chuẩn hoá văn bản của app/search.py tại thời điểm tạo revision, chép lại ở đây
+# để migration không đổi theo code ứng dụng
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Số hồ sơ mỗi câu UPDATE khi backfill
+BATCH_SIZE = 5000
+
+BACKFILL = sa.text(
+    "UPDATE doctor_profiles p SET search_vector = "
+    "setweight(to_tsvector('simple', d.name), 'A') "
+    "|| setweight(to_tsvector('simple', d.specialty), 'B') "
+    "|| setweight(to_tsvector('simple', d.bio), 'C') "
+    "FROM unnest(CAST(:ids AS integer[]), CAST(:names AS text[]), CAST(:specialties AS text[]), "
+    "            CAST(:bios AS text[])) AS d(id, name, specialty, bio) "
+    "WHERE p.id = d.id"
+)
+
+
+def _document(text) -> str:
+    """Chữ thường, bỏ dấu (kể cả "đ" -> "d"), các token [a-z0-9] cách nhau bởi dấu cách."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFD", text.lower().replace("đ", "d"))
+    return " ".join(_TOKEN_RE.findall("".join(c for c in decomposed if not unicodedata.combining(c))))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('doctor_profiles', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.create_index(
+        'ix_doctor_profiles_search_vector', 'doctor_profiles', ['search_vector'],
+        unique=False, postgresql_using='gin',
+    )
+
+    # Backfill: việc bỏ dấu làm ở Python, tsvector ghép trong SQL theo lô BATCH_SIZE hồ sơ
+    profiles = sa.table(
+        'doctor_profiles',
+        sa.column('id', sa.Integer),
+        sa.column('user_id', sa.Integer),
+        sa.column('specialty', sa.String),
+        sa.column('bio', sa.Text),
+    )
+    users = sa.table('users', sa.column('id', sa.Integer), sa.column('full_name', sa.String))
+
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(profiles.c.id, users.c.full_name, profiles.c.specialty, profiles.c.bio)
+        .select_from(profiles.outerjoin(users, users.c.id == profiles.c.user_id))
+    ).all()
+    for i in range(0, len(rows), BATCH_SIZE):
+        batch = rows[i:i + BATCH_SIZE]
+        conn.execute(BACKFILL, {
+            "ids": [r[0] for r in batch],
+            "names": [_document(r[1]) for r in batch],
+            "specialties": [_document(r[2]) for r in batch],
+            "bios": [_document(r[3]) for r in batch],
+        })
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_doctor_profiles_search_vector', table_name='doctor_profiles', postgresql_using='gin')
+    op.drop_column('doctor_profiles', 'search_vector')
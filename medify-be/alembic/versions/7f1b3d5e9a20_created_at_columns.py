@@ -0,0 +1,38 @@
+"""created_at columns
+
+Revision ID: 7f1b3d5e9a20
+Revises: e4a6c8f0b2d1
+Create Date: 2026-10-18 13:48:10.275019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f1b3d5e9a20'
+down_revision: Union[str, Sequence[str], None] = 'e4a6c8f0b2d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('users', 'appointments', 'reviews')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bản ghi đã có nhận thời điểm chạy migration (không có dữ liệu gốc)
+    for table in TABLES:
+        op.add_column(table, sa.Column(
+            'created_at', sa.DateTime(), nullable=False,
+            server_default=sa.text("(now() AT TIME ZONE 'utc')"),
+        ))
+        op.create_index(f'ix_{table}_created_at_id', table, ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(TABLES):
+        op.drop_index(f'ix_{table}_created_at_id', table_name=table)
+        op.drop_column(table, 'created_at')
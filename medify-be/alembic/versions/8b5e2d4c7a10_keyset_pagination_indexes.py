@@ -0,0 +1,32 @@
+"""keyset pagination indexes
+
+Revision ID: 8b5e2d4c7a10
+Revises: 3c1f0a7d9e42
+Create Date: 2026-10-18 10:05:13.502871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b5e2d4c7a10'
+down_revision: Union[str, Sequence[str], None] = '3c1f0a7d9e42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # So sánh tuple (avg_rating, id) < cursor bỏ sót dòng có avg_rating NULL
+    op.execute("UPDATE doctor_profiles SET avg_rating = 0 WHERE avg_rating IS NULL")
+    op.create_index('ix_doctor_profiles_avg_rating_id', 'doctor_profiles', ['avg_rating', 'id'], unique=False)
+    op.create_index('ix_appointments_start_at_id', 'appointments', ['start_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_appointments_start_at_id', table_name='appointments')
+    op.drop_index('ix_doctor_profiles_avg_rating_id', table_name='doctor_profiles')
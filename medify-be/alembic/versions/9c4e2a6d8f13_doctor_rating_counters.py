@@ -0,0 +1,44 @@
+"""doctor rating counters
+
+Revision ID: 9c4e2a6d8f13
+Revises: 1e8a5c3f7b90
+Create Date: 2026-10-18 17:05:52.190446
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e2a6d8f13'
+down_revision: Union[str, Sequence[str], None] = '1e8a5c3f7b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('doctor_profiles', sa.Column('review_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('doctor_profiles', sa.Column('rating_sum', sa.BigInteger(), nullable=False, server_default='0'))
+
+    # Backfill từ bảng reviews; avg_rating tính lại cùng công thức với app/ratings.py
+    op.execute(
+        "UPDATE doctor_profiles p SET review_count = r.count, rating_sum = r.sum, "
+        "       avg_rating = CAST(r.sum AS float8) / r.count "
+        "FROM (SELECT doctor_profile_id, count(*) AS count, sum(rating) AS sum FROM reviews "
+        "      WHERE rating IS NOT NULL GROUP BY doctor_profile_id) r "
+        "WHERE r.doctor_profile_id = p.id"
+    )
+
+    # avg_rating là một phần khoá keyset (avg_rating, id): NULL làm hỏng cursor
+    op.execute("UPDATE doctor_profiles SET avg_rating = 0 WHERE avg_rating IS NULL")
+    op.alter_column('doctor_profiles', 'avg_rating', existing_type=sa.Float(), nullable=False, server_default='0')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('doctor_profiles', 'avg_rating', existing_type=sa.Float(), nullable=True, server_default=None)
+    op.drop_column('doctor_profiles', 'rating_sum')
+    op.drop_column('doctor_profiles', 'review_count')
@@ -0,0 +1,56 @@
+"""appointment overlap constraint
+
+Revision ID: c3d9f1a7b5e2
+Revises: 7f1b3d5e9a20
+Create Date: 2026-10-18 15:02:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d9f1a7b5e2'
+down_revision: Union[str, Sequence[str], None] = '7f1b3d5e9a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# doctor_id NULL (bác sĩ đã bị xoá): int4range(NULL, NULL) là khoảng vô hạn, phải loại ra
+ACTIVE = "doctor_id IS NOT NULL AND status <> 'canceled' AND end_at > start_at"
+
+# Các cặp lịch hẹn đang trùng giờ (phải xử lý tay trước khi tạo constraint)
+OVERLAPS = (
+    "SELECT a.id, b.id FROM appointments a JOIN appointments b "
+    "  ON a.doctor_id = b.doctor_id AND a.id < b.id "
+    " AND tsrange(a.start_at, a.end_at) && tsrange(b.start_at, b.end_at) "
+    "WHERE a.status <> 'canceled' AND a.end_at > a.start_at "
+    "  AND b.status <> 'canceled' AND b.end_at > b.start_at "
+    "LIMIT 10"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_appointments_doctor_id_start_at', 'appointments', ['doctor_id', 'start_at'], unique=False)
+    op.create_index('ix_appointments_patient_id_start_at', 'appointments', ['patient_id', 'start_at'], unique=False)
+
+    pairs = op.get_bind().execute(sa.text(OVERLAPS)).all()
+    if pairs:
+        raise RuntimeError(
+            "Có lịch hẹn trùng giờ của cùng bác sĩ, cần huỷ bớt trước khi nâng cấp "
+            f"(id: {', '.join(f'{a}/{b}' for a, b in pairs)})"
+        )
+    op.execute(
+        "ALTER TABLE appointments ADD CONSTRAINT appointments_no_overlap "
+        "EXCLUDE USING gist (int4range(doctor_id, doctor_id, '[]') WITH =, tsrange(start_at, end_at) WITH &&) "
+        f"WHERE ({ACTIVE})"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE appointments DROP CONSTRAINT appointments_no_overlap")
+    op.drop_index('ix_appointments_patient_id_start_at', table_name='appointments')
+    op.drop_index('ix_appointments_doctor_id_start_at', table_name='appointments')
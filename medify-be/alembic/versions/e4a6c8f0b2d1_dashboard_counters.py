@@ -0,0 +1,52 @@
+"""dashboard counters
+
+Revision ID: e4a6c8f0b2d1
+Revises: 5d7e9c1b3a24
+Create Date: 2026-10-18 13:02:27.640115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a6c8f0b2d1'
+down_revision: Union[str, Sequence[str], None] = '5d7e9c1b3a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('appointment_daily_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('status', postgresql.ENUM('booked', 'canceled', 'done', name='appointmentstatus', create_type=False), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'doctor_id', 'status')
+    )
+    op.create_table('user_stats',
+    sa.Column('role', postgresql.ENUM('patient', 'doctor', 'admin', name='role', create_type=False), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('role', 'is_active')
+    )
+    # Backfill từ dữ liệu hiện có (cùng logic với app.stats.rebuild)
+    op.execute(
+        "INSERT INTO appointment_daily_stats (day, doctor_id, status, count) "
+        "SELECT CAST(start_at AS DATE), COALESCE(doctor_id, 0), COALESCE(status, 'booked'), count(*) "
+        "FROM appointments WHERE start_at IS NOT NULL GROUP BY 1, 2, 3"
+    )
+    op.execute(
+        "INSERT INTO user_stats (role, is_active, count) "
+        "SELECT role, COALESCE(is_active, false), count(*) FROM users WHERE role IS NOT NULL GROUP BY 1, 2"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_stats')
+    op.drop_table('appointment_daily_stats')
@@ -0,0 +1,82 @@
+# app/appointment_listing.py
+"""
+Đọc một trang lịch hẹn kèm bệnh nhân / bác sĩ (GET /appointments, GET /admin/appointments).
+
+Một câu SELECT duy nhất: appointments LEFT JOIN users (bệnh nhân), users (bác sĩ) và
+doctor_profiles (chuyên khoa), chỉ lấy các cột AppointmentOut cần. Không dựng đối
+tượng ORM nên không có lazy-load: số truy vấn mỗi request không phụ thuộc số dòng
+(scripts/check_query_counts.py kiểm tra điều này).
+
+Mỗi dòng trả về là dict đúng thứ tự field của AppointmentOut: dùng được cho
+response_model và cho FAST_JSON (serialization.dumps) như nhau.
+"""
+from typing import Any, List, Optional, Sequence
+
+from fastapi import Response
+from sqlalchemy.orm import Session, aliased
+
+from app import models
+from app.pagination import PageParams, paginate
+
+APPOINTMENT_FIELDS = ("id", "doctor_id", "patient_id", "start_at", "end_at", "status", "note")
+USER_FIELDS = ("id", "email", "full_name", "gender", "role", "is_active")
+
+_patient = aliased(models.User, name="patient")
+_doctor = aliased(models.User, name="doctor")
+
+_COLUMNS = (
+    [getattr(models.Appointment, f) for f in APPOINTMENT_FIELDS]
+    + [getattr(_patient, f).label(f"patient_{f}_") for f in USER_FIELDS]
+    + [getattr(_doctor, f).label(f"doctor_{f}_") for f in USER_FIELDS]
+    + [models.DoctorProfile.specialty.label("doctor_specialty_")]
+)
+
+# Vị trí các nhóm cột trong một dòng kết quả
+_P = len(APPOINTMENT_FIELDS)
+_D = _P + len(USER_FIELDS)
+_S = _D + len(USER_FIELDS)
+
+_SORT = [models.Appointment.start_at, models.Appointment.id]
+
+
+def _user(values: Sequence[Any]) -> Optional[dict]:
+    # LEFT JOIN không khớp (user đã bị xoá): cả nhóm cột là NULL
+    if values[0] is None:
+        return None
+    return dict(zip(USER_FIELDS, values))
+
+
+def _to_dict(row: Sequence[Any]) -> dict:
+    appt_id, doctor_id, patient_id, start_at, end_at, status, note = row[:_P]
+    doctor = _user(row[_D:_S])
+    if doctor is not None:
+        doctor["specialty"] = row[_S]
+    return {
+        "id": appt_id,
+        "doctor_user_id": doctor_id,
+        "patient_id": patient_id,
+        "start_at": start_at,
+        "end_at": end_at,
+        "status": status,
+        "note": note,
+        "patient": _user(row[_P:_D]),
+        "doctor": doctor,
+    }
+
+
+def load_page(db: Session, page: PageParams, response: Response, *criteria) -> List[dict]:
+    """
+    Một trang lịch hẹn (mới nhất trước, keyset theo (start_at, id)) thoả `criteria`.
+    Đặt header X-Next-Cursor như pagination.paginate.
+    """
+    q = (
+        db.query(*_COLUMNS)
+        .select_from(models.Appointment)
+        .outerjoin(_patient, _patient.id == models.Appointment.patient_id)
+        .outerjoin(_doctor, _doctor.id == models.Appointment.doctor_id)
+        .outerjoin(models.DoctorProfile, models.DoctorProfile.user_id == _doctor.id)
+    )
+    if criteria:
+        q = q.filter(*criteria)
+    rows = paginate(q, page, _SORT, lambda r: (r.start_at, r.id), response)
+    return [_to_dict(r) for r in rows]
@@ -0,0 +1,97 @@
+# app/cache.py
+"""Cache trong bộ nhớ tiến trình: LRU + TTL, an toàn luồng."""
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Cache có giới hạn số phần tử (loại bỏ phần tử ít dùng nhất) và thời hạn cho
+    từng phần tử. Thời gian tính theo time.monotonic().
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class ShardedTTLCache:
+    """
+    TTLCache chia thành nhiều shard theo hash(key), mỗi shard một lock riêng:
+    các thread truy cập key khác nhau hầu như không tranh chấp cùng một lock.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, shards: int = 16):
+        per_shard = max(1, -(-maxsize // shards))
+        self._shards = [TTLCache(per_shard, ttl) for _ in range(shards)]
+        self.maxsize = per_shard * shards
+        self.ttl = ttl
+
+    def _shard(self, key: Hashable) -> TTLCache:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return self._shard(key).get(key, default)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._shard(key).set(key, value, ttl)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        return self._shard(key).pop(key, default)
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            shard.clear()
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "hits": sum(shard.hits for shard in self._shards),
+            "misses": sum(shard.misses for shard in self._shards),
+        }
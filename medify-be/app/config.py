@@ -1,11 +1,71 @@
 # app/config.py
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # Bật AsyncEngine (asyncpg) cho các route async; mặc định dùng engine sync + threadpool
+    DB_ASYNC: bool = False
+    # Mặc định suy ra từ DATABASE_URL (đổi driver sang postgresql+asyncpg)
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # Connection pool (xem app/db_pool.py)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800        # giây; -1 = không recycle
+    DB_POOL_TIMEOUT: float = 30.0      # giây chờ tối đa để lấy connection
+    DB_POOL_PRE_PING: str = "idle"     # always | idle | never
+    DB_POOL_PING_IDLE_SECONDS: int = 30
+    # /health chỉ ping DB tối đa 1 lần trong khoảng này (giây)
+    HEALTH_DB_PROBE_TTL: float = 5.0
+
     JWT_SECRET: str
     JWT_ALG: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Cache token -> claims đã giải mã trong get_current_user (0 = tắt)
+    JWT_CLAIMS_CACHE_SIZE: int = 10000
+
+    # Danh sách token đã thu hồi (xem app/token_blocklist.py)
+    TOKEN_BLOCKLIST_BACKEND: str = "memory"   # memory | database | redis
+    REDIS_URL: Optional[str] = None
+    # Cache cục bộ mỗi worker trước backend dùng chung (giây; 0 = tắt)
+    TOKEN_BLOCKLIST_CACHE_SECONDS: float = 5.0
+    TOKEN_BLOCKLIST_CACHE_SIZE: int = 10000
+
+    # Độ khó bcrypt (log2 số vòng). Hash có số vòng khác được hash lại khi user đăng nhập.
+    # Chọn bằng scripts/bench_hash.py
+    BCRYPT_ROUNDS: int = 12
+
+    # Process pool hash mật khẩu (xem app/hash_pool.py)
+    HASH_POOL_WORKERS: Optional[int] = None   # None = số core; 0 = chạy trong threadpool
+    HASH_POOL_MAX_PENDING: int = 64           # vượt quá -> 503
+    HASH_POOL_RETRY_AFTER: int = 1            # giây, header Retry-After
+
+    # Cache response GET /doctors, /doctors/{id} (xem app/response_cache.py; 0 = tắt)
+    DOCTOR_CACHE_SECONDS: float = 30.0
+    DOCTOR_CACHE_SIZE: int = 2048
+    # Serialize danh sách lịch hẹn / user không qua validate response_model, encode bằng orjson
+    # (xem app/serialization.py)
+    FAST_JSON: bool = False
+
+    # Cache lịch làm việc đã parse cho API khung giờ trống (xem app/slots.py)
+    AVAILABILITY_CACHE_SECONDS: float = 300.0
+
+    # Danh mục bác sĩ trong bộ nhớ cho danh sách không có q (xem app/doctor_catalog.py; 0 = tắt)
+    DOCTOR_CATALOG_REFRESH_SECONDS: float = 60.0
+
+    # Số connection tối đa các widget của GET /admin/dashboard dùng cùng lúc (tính chung
+    # cho mọi request dashboard của worker), để dashboard không chiếm hết pool
+    DASHBOARD_MAX_CONNECTIONS: int = 2
+
+    # Số liệu theo route + đếm SQL mỗi request, xuất ở GET /metrics (xem app/instrumentation.py)
+    METRICS_ENABLED: bool = True
+    LOG_LEVEL: str = "INFO"
+
+    # Phân trang cho các endpoint danh sách (xem app/pagination.py)
+    PAGE_SIZE_DEFAULT: int = 50
+    PAGE_SIZE_MAX: int = 200
 
     # Pydantic v2: cấu hình đọc .env
     model_config = SettingsConfigDict(
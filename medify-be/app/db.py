@@ -1,10 +1,33 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
+from app.db_pool import engine_options, install_idle_ping
 
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+engine = create_engine(settings.DATABASE_URL, **engine_options())
+install_idle_ping(engine)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
 
-Base = declarative_base()
\ No newline at end of file
+def async_database_url() -> str:
+    """ASYNC_DATABASE_URL nếu có, ngược lại đổi driver của DATABASE_URL sang asyncpg."""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(settings.DATABASE_URL)
+    return url.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+
+# Engine async chỉ được tạo khi bật DB_ASYNC (cần cài asyncpg)
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB_ASYNC:
+    async_engine = create_async_engine(async_database_url(), **engine_options(async_=True))
+    install_idle_ping(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, class_=AsyncSession, autoflush=False
+    )
+
+
+Base = declarative_base()
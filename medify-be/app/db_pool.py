@@ -0,0 +1,113 @@
+# app/db_pool.py
+"""
+Connection pool có đo đạc + chiến lược pre-ping cấu hình được.
+
+- TimedQueuePool / TimedAsyncAdaptedQueuePool: ghi histogram thời gian chờ lấy
+  connection và đếm số lần hết thời gian chờ (pool timeout).
+- DB_POOL_PRE_PING:
+    "always": ping mỗi lần checkout (pool_pre_ping của SQLAlchemy, thêm 1 round-trip)
+    "idle":   chỉ ping connection đã nằm trong pool lâu hơn DB_POOL_PING_IDLE_SECONDS
+    "never":  không ping; connection hỏng được phát hiện khi truy vấn lỗi
+"""
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import settings
+from app.metrics import Histogram
+
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+
+_LAST_CHECKIN = "medify_last_checkin"
+
+
+class _TimedCheckoutMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_seconds = Histogram()
+        self.timeouts = 0
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.wait_seconds.observe(time.perf_counter() - t0)
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(async_: bool = False) -> dict:
+    """Tham số create_engine / create_async_engine lấy từ Settings."""
+    strategy = settings.DB_POOL_PRE_PING
+    if strategy not in PRE_PING_STRATEGIES:
+        raise ValueError(f"DB_POOL_PRE_PING must be one of {PRE_PING_STRATEGIES}, got {strategy!r}")
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool if async_ else TimedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": strategy == "always",
+    }
+
+
+def install_idle_ping(engine) -> None:
+    """Gắn event ping-khi-idle nếu chiến lược là "idle" (engine sync hoặc engine.sync_engine)."""
+    if settings.DB_POOL_PRE_PING != "idle":
+        return
+    idle_seconds = settings.DB_POOL_PING_IDLE_SECONDS
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        connection_record.info[_LAST_CHECKIN] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        last = connection_record.info.get(_LAST_CHECKIN)
+        if last is None or time.monotonic() - last < idle_seconds:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception:
+            # Pool sẽ bỏ connection này và thử lấy connection khác
+            raise exc.DisconnectionError()
+        finally:
+            cursor.close()
+
+
+def pool_stats(engine) -> Optional[Dict]:
+    """Trạng thái hiện tại của pool (None nếu engine chưa được tạo)."""
+    if engine is None:
+        return None
+    pool = getattr(engine, "sync_engine", engine).pool
+    size = pool.size()
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    stats = {
+        "size": size,
+        "max_overflow": max_overflow,
+        "capacity": size + max(max_overflow, 0),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+    }
+    if isinstance(pool, _TimedCheckoutMixin):
+        stats["timeouts"] = pool.timeouts
+        stats["wait_seconds"] = pool.wait_seconds.snapshot()
+    return stats
+
+
+def is_exhausted(stats: Optional[Dict]) -> bool:
+    return bool(stats) and stats["max_overflow"] >= 0 and stats["checked_out"] >= stats["capacity"]
@@ -1,16 +1,26 @@
 # app/deps.py
+import time
+from typing import Any, Callable, Dict, Union
+
 from fastapi import Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db import SessionLocal
+from app.cache import ShardedTTLCache
+from app.db import SessionLocal, AsyncSessionLocal
 from app.config import settings
 from app.models import Role
-from app.token_blocklist import is_blocked
+from app.token_blocklist import is_revoked
 
 oauth2 = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# token -> claims đã xác thực chữ ký; mỗi mục hết hạn cùng lúc với token.
+# Thu hồi (logout, khoá user) vẫn được kiểm tra ở mọi request.
+_claims_cache = ShardedTTLCache(maxsize=max(settings.JWT_CLAIMS_CACHE_SIZE, 1), ttl=0)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -18,20 +28,71 @@ def get_db():
     finally:
         db.close()
 
-def get_current_user(token: str = Depends(oauth2)):
-    # 1) chặn token đã logout
-    if is_blocked(token):
-        raise HTTPException(status_code=401, detail="Token is revoked")
+async def get_async_db():
+    """
+    Session cho các route `async def`:
+    - DB_ASYNC=true: AsyncSession trên asyncpg, không chiếm thread của threadpool
+    - DB_ASYNC=false: Session thường, truy vấn chạy trong threadpool như route sync
+    Dùng cùng với run_db() để một code truy vấn chạy được ở cả hai chế độ.
+    """
+    if AsyncSessionLocal is None:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+    else:
+        async with AsyncSessionLocal() as db:
+            yield db
 
-    # 2) giải mã JWT
-    try:
+async def run_db(db: Union[Session, AsyncSession], fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Chạy `fn(session, *args, **kwargs)` (code ORM sync) trên session của request.
+    Với AsyncSession, fn chạy qua run_sync (greenlet, I/O async); lazy-load chỉ hợp lệ
+    bên trong fn nên fn phải trả về dữ liệu đã serialize (schema Pydantic, dict...).
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+async def run_in_new_session(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Như run_db nhưng mỗi lần gọi dùng session (connection) riêng, để nhiều truy vấn
+    độc lập chạy song song bằng asyncio.gather.
+    """
+    if AsyncSessionLocal is None:
+        def call():
+            with SessionLocal() as db:
+                return fn(db, *args, **kwargs)
+        return await run_in_threadpool(call)
+    async with AsyncSessionLocal() as db:
+        return await db.run_sync(fn, *args, **kwargs)
+
+def _decode_token(token: str) -> Dict:
+    if settings.JWT_CLAIMS_CACHE_SIZE <= 0:
+        return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
+    payload = _claims_cache.get(token)
+    if payload is None:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
+        ttl = payload.get("exp", 0) - time.time()
+        if ttl > 0:
+            _claims_cache.set(token, payload, ttl=ttl)
+    return payload
+
+def get_current_user(token: str = Depends(oauth2)):
+    # 1) giải mã JWT (có cache)
+    try:
+        payload = _decode_token(token)
         sub = int(payload["sub"])
         role = payload["role"]
-        return {"sub": sub, "role": role}
-    except JWTError:
+    except (JWTError, KeyError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    # 2) chặn token đã logout / user đã bị thu hồi phiên
+    if is_revoked(payload, token):
+        raise HTTPException(status_code=401, detail="Token is revoked")
+    return {"sub": sub, "role": role}
+
 def require_role(*roles: Role):
     def inner(user = Depends(get_current_user)):
         if user["role"] not in [r.value for r in roles]:
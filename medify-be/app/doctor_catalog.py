@@ -0,0 +1,288 @@
+# app/doctor_catalog.py
+"""
+Danh mục bác sĩ trong bộ nhớ cho các trang danh sách không cần full-text search
+(GET /doctors không có q, GET /admin/doctors).
+
+- Dữ liệu lưu theo cột (array) + JSON của từng DoctorCard đã encode sẵn; response
+  được ghép bằng cách nối các đoạn bytes, không dựng model Pydantic cho từng dòng.
+- Thứ tự theo (avg_rating, profile id) giảm dần và theo user id được sắp sẵn;
+  phân trang bằng bisect với cursor giống hệt nhánh SQL nên client dùng lẫn được.
+- Thao tác ghi trong worker gọi refresh_doctor()/remove_doctor(); thay đổi từ worker
+  khác được nạp lại toàn bộ sau DOCTOR_CATALOG_REFRESH_SECONDS (0 = tắt, luôn
+  truy vấn SQL).
+- Mỗi lần cập nhật tạo snapshot mới rồi thay tham chiếu, nên luồng đọc không cần lock.
+  Cập nhật một bác sĩ chỉ encode lại dòng đó và chuyển nó tới vị trí mới (bisect);
+  nạp lại toàn bộ chỉ chạy trên một thread, các request khác dùng snapshot cũ.
+"""
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models, schemas, search
+from app.config import settings
+
+_GENDERS = list(models.Gender)
+_NO_GENDER = -1
+
+
+@dataclass(frozen=True)
+class _Row:
+    user_id: int
+    profile_id: int
+    full_name: str
+    specialty: str
+    years_exp: int
+    avg_rating: float
+    gender: Optional[models.Gender]
+
+
+def _gender_code(gender: Optional[models.Gender]) -> int:
+    return _NO_GENDER if gender is None else _GENDERS.index(gender)
+
+
+def _card_json(r: _Row) -> bytes:
+    return schemas.DoctorCard(
+        id=r.user_id, full_name=r.full_name, specialty=r.specialty,
+        years_exp=r.years_exp, avg_rating=r.avg_rating, gender=r.gender,
+    ).model_dump_json().encode()
+
+
+def _rating_key(r: _Row) -> Tuple[float, int]:
+    # Khoá (-rating, -profile_id) tăng dần để dùng bisect
+    return -r.avg_rating, -r.profile_id
+
+
+class _Snapshot:
+    # Các cột theo thứ tự rating (cùng vị trí) và theo user id
+    _RATING_COLUMNS = (
+        "user_id", "profile_id", "avg_rating", "years_exp", "gender",
+        "full_name", "specialty", "specialty_tokens", "card_json", "rating_keys",
+    )
+    _ID_COLUMNS = ("id_keys", "id_cards")
+
+    def __init__(self, rows: Iterable[_Row]):
+        rows = sorted(rows, key=_rating_key)
+        self.user_id = array("q", (r.user_id for r in rows))
+        self.profile_id = array("q", (r.profile_id for r in rows))
+        self.avg_rating = array("d", (r.avg_rating for r in rows))
+        self.years_exp = array("q", (r.years_exp for r in rows))
+        self.gender = array("b", (_gender_code(r.gender) for r in rows))
+        self.full_name = [r.full_name for r in rows]
+        self.specialty = [r.specialty for r in rows]
+        self.specialty_tokens = [tuple(search.tokenize(r.specialty)) for r in rows]
+        self.card_json = [_card_json(r) for r in rows]
+        self.rating_keys = [_rating_key(r) for r in rows]
+        # Thứ tự theo user id (trang admin): khoá + JSON dùng chung bytes với cột rating
+        id_order = sorted(range(len(rows)), key=self.user_id.__getitem__)
+        self.id_keys = array("q", (self.user_id[i] for i in id_order))
+        self.id_cards = [self.card_json[i] for i in id_order]
+
+    def __len__(self) -> int:
+        return len(self.user_id)
+
+    def _matches_specialty(self, pos: int, tokens: Sequence[str]) -> bool:
+        # Giống tsquery "tok:*B": mỗi token là tiền tố của một token chuyên khoa
+        own = self.specialty_tokens[pos]
+        return all(any(t.startswith(q) for t in own) for q in tokens)
+
+    def replaced(self, old: Optional[_Row], new: Optional[_Row]) -> "_Snapshot":
+        """
+        Bản sao với dòng `old` được thay bằng `new` (None = thêm / xoá). Chỉ dòng thay
+        đổi được encode lại và chèn đúng vị trí bằng bisect; các dòng khác chỉ được
+        copy tham chiếu.
+        """
+        snap = object.__new__(_Snapshot)
+        for name in self._RATING_COLUMNS + self._ID_COLUMNS:
+            setattr(snap, name, getattr(self, name)[:])
+
+        if old is not None:
+            pos = bisect_left(snap.rating_keys, _rating_key(old))
+            for name in self._RATING_COLUMNS:
+                getattr(snap, name).pop(pos)
+        card = None
+        if new is not None:
+            card = _card_json(new)
+            key = _rating_key(new)
+            pos = bisect_left(snap.rating_keys, key)
+            values = (
+                new.user_id, new.profile_id, new.avg_rating, new.years_exp, _gender_code(new.gender),
+                new.full_name, new.specialty, tuple(search.tokenize(new.specialty)), card, key,
+            )
+            for name, value in zip(self._RATING_COLUMNS, values):
+                getattr(snap, name).insert(pos, value)
+
+        user_id = (new or old).user_id
+        pos = bisect_left(snap.id_keys, user_id)
+        present = pos < len(snap.id_keys) and snap.id_keys[pos] == user_id
+        if card is None:
+            if present:
+                snap.id_keys.pop(pos)
+                snap.id_cards.pop(pos)
+        elif present:
+            snap.id_cards[pos] = card
+        else:
+            snap.id_keys.insert(pos, user_id)
+            snap.id_cards.insert(pos, card)
+        return snap
+
+
+def _body(cards: Iterable[bytes]) -> bytes:
+    return b"[" + b",".join(cards) + b"]"
+
+
+class DoctorCatalog:
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._rows: Dict[int, _Row] = {}
+        self._snapshot = _Snapshot([])
+        self._loaded_at: Optional[float] = None
+        self._lock = Lock()
+        # Chỉ một thread nạp lại; các thay đổi trong lúc nạp được áp lại sau khi thay snapshot
+        self._reload_lock = Lock()
+        self._pending: Optional[Dict[int, Optional[_Row]]] = None
+
+    # --- Nạp / cập nhật ---
+
+    @property
+    def enabled(self) -> bool:
+        return self.refresh_seconds > 0
+
+    def is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds
+
+    def ensure_loaded(self, db: Session) -> None:
+        if self.is_fresh():
+            return
+        # Đã có dữ liệu (cũ): thread khác đang nạp thì dùng luôn snapshot hiện tại.
+        # Chưa có dữ liệu: chờ lần nạp đang chạy.
+        if not self._reload_lock.acquire(blocking=self._loaded_at is None):
+            return
+        try:
+            if not self.is_fresh():
+                self.reload(db)
+        finally:
+            self._reload_lock.release()
+
+    def _query(self, db: Session):
+        return (
+            db.query(
+                models.User.id, models.DoctorProfile.id, models.User.full_name,
+                models.DoctorProfile.specialty, models.DoctorProfile.years_exp,
+                models.DoctorProfile.avg_rating, models.User.gender,
+            )
+            .join(models.DoctorProfile, models.DoctorProfile.user_id == models.User.id)
+            .filter(models.User.role == models.Role.doctor)
+        )
+
+    @staticmethod
+    def _row(values) -> _Row:
+        user_id, profile_id, full_name, specialty, years_exp, avg_rating, gender = values
+        return _Row(user_id, profile_id, full_name, specialty, years_exp, avg_rating or 0.0, gender)
+
+    def reload(self, db: Session) -> None:
+        with self._lock:
+            self._pending = {}
+        try:
+            rows = {r.user_id: r for r in map(self._row, self._query(db))}
+            snapshot = _Snapshot(rows.values())
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            pending, self._pending = self._pending, None
+            self._rows = rows
+            self._snapshot = snapshot
+            # refresh_doctor / remove_doctor chạy trong lúc truy vấn: có thể mới hơn kết quả nạp
+            for user_id, row in pending.items():
+                self._apply(user_id, row)
+            self._loaded_at = time.monotonic()
+
+    def _apply(self, user_id: int, row: Optional[_Row]) -> None:
+        # Gọi khi đang giữ self._lock
+        old = self._rows.get(user_id)
+        if old == row:
+            return
+        rows = dict(self._rows)
+        if row is None:
+            del rows[user_id]
+        else:
+            rows[user_id] = row
+        self._snapshot = self._snapshot.replaced(old, row)
+        self._rows = rows
+
+    def _update(self, user_id: int, row: Optional[_Row]) -> None:
+        with self._lock:
+            if self._pending is not None:
+                self._pending[user_id] = row
+            if self._loaded_at is not None:
+                self._apply(user_id, row)
+
+    def refresh_doctor(self, db: Session, user_id: int) -> None:
+        """Nạp lại một bác sĩ sau khi ghi (hồ sơ, đánh giá...)."""
+        if self._loaded_at is None and self._pending is None:
+            return
+        values = self._query(db).filter(models.User.id == user_id).first()
+        self._update(user_id, None if values is None else self._row(values))
+
+    def remove_doctor(self, user_id: int) -> None:
+        self._update(user_id, None)
+
+    # --- Đọc ---
+
+    def page_by_rating(
+            self,
+            limit: int,
+            cursor: Optional[Tuple[float, int]] = None,
+            gender: Optional[models.Gender] = None,
+            specialty: Optional[str] = None,
+    ) -> Tuple[bytes, Optional[Tuple[float, int]]]:
+        """
+        Trang sắp theo (avg_rating, profile id) giảm dần, giống nhánh SQL của
+        search_doctors. Trả về (body JSON, khoá cursor trang sau hoặc None).
+        """
+        snap = self._snapshot
+        start = 0 if cursor is None else bisect_right(snap.rating_keys, (-(cursor[0] or 0.0), -cursor[1]))
+        gender_code = None if gender is None else _gender_code(gender)
+        tokens = search.query_tokens(specialty) if specialty else []
+
+        picked: List[int] = []
+        for pos in range(start, len(snap)):
+            if gender_code is not None and snap.gender[pos] != gender_code:
+                continue
+            if tokens and not snap._matches_specialty(pos, tokens):
+                continue
+            picked.append(pos)
+            if len(picked) > limit:
+                break
+
+        next_key = None
+        if len(picked) > limit:
+            picked = picked[:limit]
+            last = picked[-1]
+            next_key = (snap.avg_rating[last], snap.profile_id[last])
+        return _body(snap.card_json[i] for i in picked), next_key
+
+    def page_by_id(self, limit: int, after_id: Optional[int] = None) -> Tuple[bytes, Optional[int]]:
+        """Trang sắp theo user id tăng dần (GET /admin/doctors)."""
+        snap = self._snapshot
+        start = 0 if after_id is None else bisect_right(snap.id_keys, after_id)
+        end = min(start + limit, len(snap.id_keys))
+        next_key = snap.id_keys[end - 1] if end < len(snap.id_keys) else None
+        return _body(snap.id_cards[start:end]), next_key
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "doctors": len(self._snapshot),
+            "age_seconds": None if self._loaded_at is None else round(time.monotonic() - self._loaded_at, 1),
+            "refresh_seconds": self.refresh_seconds,
+        }
+
+
+doctor_catalog = DoctorCatalog(refresh_seconds=settings.DOCTOR_CATALOG_REFRESH_SECONDS)
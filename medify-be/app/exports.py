@@ -0,0 +1,114 @@
+# app/exports.py
+"""
+Xuất báo cáo dạng stream (NDJSON / CSV) cho admin.
+
+Truy vấn chạy bằng server-side cursor (`yield_per` -> stream_results) và từng lô
+dòng được ghi ra ngay khi fetch về, nên bộ nhớ không phụ thuộc số dòng xuất.
+Generator tự mở Session riêng vì nó chạy sau khi handler (và dependency get_db)
+đã trả về.
+"""
+import csv
+import enum
+import io
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Iterator
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from app import models
+from app.db import SessionLocal
+
+EXPORT_FORMATS = ("ndjson", "csv")
+FORMAT_PATTERN = "^(json|ndjson|csv)$"
+
+_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Số dòng mỗi lần fetch từ server-side cursor
+BATCH_SIZE = 1000
+
+
+def _plain(v: Any) -> Any:
+    if isinstance(v, enum.Enum):
+        return v.value
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    return v
+
+
+def _ndjson_lines(result) -> Iterator[str]:
+    for rows in result.partitions():
+        yield "".join(
+            json.dumps({k: _plain(v) for k, v in row._mapping.items()}, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+
+def _csv_lines(result) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(result.keys())
+    for rows in result.partitions():
+        writer.writerows([_plain(v) for v in row] for row in rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    # Trường hợp không có dòng nào: vẫn trả header
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def stream_export(build_query: Callable[[], Any], fmt: str, filename: str) -> StreamingResponse:
+    """Trả StreamingResponse cho câu SELECT do `build_query()` tạo ra."""
+
+    def generate() -> Iterator[str]:
+        db = SessionLocal()
+        try:
+            result = db.execute(build_query().execution_options(yield_per=BATCH_SIZE))
+            lines = _csv_lines(result) if fmt == "csv" else _ndjson_lines(result)
+            for chunk in lines:
+                yield chunk
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        generate(),
+        media_type=_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+
+def users_export_query():
+    u = models.User
+    return select(u.id, u.email, u.full_name, u.gender, u.role, u.is_active).order_by(u.id)
+
+
+def appointments_export_query():
+    ap = models.Appointment
+    patient = aliased(models.User)
+    doctor = aliased(models.User)
+    return (
+        select(
+            ap.id,
+            ap.start_at,
+            ap.end_at,
+            ap.status,
+            ap.note,
+            ap.patient_id,
+            patient.full_name.label("patient_name"),
+            patient.email.label("patient_email"),
+            ap.doctor_id.label("doctor_user_id"),
+            doctor.full_name.label("doctor_name"),
+            doctor.email.label("doctor_email"),
+            models.DoctorProfile.specialty,
+        )
+        .outerjoin(patient, patient.id == ap.patient_id)
+        .outerjoin(doctor, doctor.id == ap.doctor_id)
+        .outerjoin(models.DoctorProfile, models.DoctorProfile.user_id == ap.doctor_id)
+        .order_by(ap.start_at.desc(), ap.id.desc())
+    )
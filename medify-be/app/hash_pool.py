@@ -0,0 +1,114 @@
+# app/hash_pool.py
+"""
+Process pool riêng cho hash/verify mật khẩu (bcrypt tốn ~100-300 ms CPU mỗi lần).
+
+Chạy trong process con nên không giữ GIL của worker uvicorn: đợt đăng nhập dồn dập
+không làm chậm các endpoint khác, và throughput login tăng theo số core.
+Số việc đang chờ bị giới hạn (HASH_POOL_MAX_PENDING); vượt quá thì trả 503 kèm
+Retry-After thay vì để hàng đợi dài vô hạn.
+
+HASH_POOL_WORKERS = 0 tắt process pool: hash chạy trong threadpool như trước.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app import security
+from app.config import settings
+from app.metrics import Histogram
+
+
+class HashPool:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.latency_seconds = Histogram()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # "spawn": không fork process đang có thread (uvicorn, pool DB)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Chạy fn(*args) trong pool; fn phải là hàm top-level (pickle được)."""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please retry",
+                headers={"Retry-After": str(settings.HASH_POOL_RETRY_AFTER)},
+            )
+        self.pending += 1
+        t0 = time.perf_counter()
+        try:
+            if self.workers > 0:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self._get_executor(), fn, *args)
+            else:
+                result = await run_in_threadpool(fn, *args)
+        except BrokenProcessPool:
+            # Process con bị kill (OOM...): tạo pool mới cho lần sau
+            self.failed += 1
+            self.shutdown()
+            raise HTTPException(status_code=503, detail="Server is busy, please retry")
+        finally:
+            self.pending -= 1
+            self.latency_seconds.observe(time.perf_counter() - t0)
+        self.completed += 1
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "started": self._executor is not None,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "latency_seconds": self.latency_seconds.snapshot(),
+        }
+
+
+def _default_workers() -> int:
+    if settings.HASH_POOL_WORKERS is not None:
+        return settings.HASH_POOL_WORKERS
+    return os.cpu_count() or 1
+
+
+hash_pool = HashPool(workers=_default_workers(), max_pending=settings.HASH_POOL_MAX_PENDING)
+
+
+async def hash_password(pw: str) -> str:
+    return await hash_pool.run(security.hash_password, pw)
+
+async def verify_password(pw: str, hashed: str) -> bool:
+    return await hash_pool.run(security.verify_password, pw, hashed)
+
+async def verify_and_update(pw: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return await hash_pool.run(security.verify_and_update, pw, hashed)
@@ -0,0 +1,55 @@
+# app/health.py
+"""
+Kiểm tra sức khoẻ DB cho /health (dùng cho load balancer).
+
+Kết quả probe được cache HEALTH_DB_PROBE_TTL giây và chỉ một thread được probe
+tại một thời điểm, nên LB gọi /health dày đặc cũng không tạo thêm tải cho DB.
+Nếu pool đã cạn connection thì báo "down" ngay, không chờ lấy connection.
+"""
+import time
+from threading import Lock
+from typing import Dict, Optional
+
+from app.config import settings
+from app.db import engine, async_engine
+from app.db_pool import is_exhausted, pool_stats
+
+
+class DatabaseProbe:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = Lock()
+        self._last: Optional[Dict] = None
+        self._checked_at = 0.0
+
+    def status(self) -> Dict:
+        if self._last is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._last
+        if not self._lock.acquire(blocking=False):
+            # Thread khác đang probe: dùng kết quả cũ thay vì xếp hàng
+            return self._last or {"status": "unknown"}
+        try:
+            self._last = self._probe()
+            self._checked_at = time.monotonic()
+            return self._last
+        finally:
+            self._lock.release()
+
+    def _probe(self) -> Dict:
+        for name, eng in (("sync", engine), ("async", async_engine)):
+            if is_exhausted(pool_stats(eng)):
+                return {"status": "down", "reason": f"{name} connection pool exhausted"}
+        t0 = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.exec_driver_sql("SELECT 1")
+        except Exception as e:
+            return {"status": "down", "reason": type(e).__name__}
+        return {"status": "up", "latency_ms": round((time.perf_counter() - t0) * 1000, 2)}
+
+
+db_probe = DatabaseProbe(ttl=settings.HEALTH_DB_PROBE_TTL)
+
+
+def pool_report() -> Dict:
+    return {"sync": pool_stats(engine), "async": pool_stats(async_engine)}
@@ -0,0 +1,233 @@
+# app/instrumentation.py
+"""
+Số liệu theo route + số câu SQL / thời gian DB của từng request, xuất ra GET /metrics
+(định dạng text của Prometheus).
+
+- InstrumentationMiddleware (ASGI thuần, không đệm response): độ trễ, kích thước
+  response, mã trạng thái theo (method, route) và số request đang xử lý. Route là
+  mẫu đường dẫn đã khớp (vd /doctors/{doctor_user_id}), request không khớp route
+  nào được gộp vào "unmatched" để số nhãn không tăng theo URL.
+- instrument_engine(): before/after_cursor_execute cộng số câu SQL và thời gian chạy
+  vào request hiện tại (contextvar, được copy sang threadpool và greenlet của
+  asyncpg). Câu SQL ngoài request (làm mới cache nền...) chỉ vào tổng chung.
+
+Mỗi worker uvicorn giữ số liệu riêng của nó (như app/metrics.py); Prometheus
+scrape từng worker hoặc gộp theo instance.
+"""
+import contextvars
+import time
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.db_pool import pool_stats
+from app.metrics import Histogram
+
+# Mốc histogram kích thước response (byte) và số câu SQL mỗi request
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+UNMATCHED = "unmatched"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_QUERY_START = "medify_query_start"
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Bộ đếm SQL của request đang xử lý (None khi ngoài request)."""
+    return _current.get()
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.duration_seconds = Histogram()
+        self.response_bytes = Histogram(SIZE_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_seconds = Histogram()
+        self.statuses: Dict[int, int] = {}
+
+
+class Registry:
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.in_flight = 0
+        self.queries_total = 0
+        self.db_seconds_total = 0.0
+        self.errors_total = 0
+        self._lock = Lock()
+
+    def route(self, method: str, path: str) -> RouteMetrics:
+        key = (method, path)
+        metrics = self.routes.get(key)
+        if metrics is None:
+            with self._lock:
+                metrics = self.routes.setdefault(key, RouteMetrics())
+        return metrics
+
+    def observe_request(
+            self, method: str, path: str, status: int, seconds: float, size: int, stats: RequestStats
+    ) -> None:
+        metrics = self.route(method, path)
+        metrics.duration_seconds.observe(seconds)
+        metrics.response_bytes.observe(size)
+        metrics.queries.observe(stats.queries)
+        metrics.db_seconds.observe(stats.db_seconds)
+        with self._lock:
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+    def observe_query(self, seconds: float, failed: bool = False) -> None:
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += seconds
+        with self._lock:
+            self.queries_total += 1
+            self.db_seconds_total += seconds
+            if failed:
+                self.errors_total += 1
+
+
+registry = Registry()
+
+
+class InstrumentationMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status, size = 500, 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        registry.in_flight += 1
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            registry.in_flight -= 1
+            _current.reset(token)
+            # Router gắn route đã khớp vào scope
+            path = getattr(scope.get("route"), "path", None) or UNMATCHED
+            registry.observe_request(scope["method"], path, status, elapsed, size, stats)
+
+
+def instrument_engine(engine) -> None:
+    """Gắn event đếm SQL (engine sync hoặc engine.sync_engine)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_QUERY_START, []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        registry.observe_query(time.perf_counter() - conn.info[_QUERY_START].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        started = context.connection.info.get(_QUERY_START) if context.connection is not None else None
+        if started:
+            registry.observe_query(time.perf_counter() - started.pop(), failed=True)
+
+
+# --- Định dạng text của Prometheus ---
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _header(lines: List[str], name: str, kind: str, help_: str) -> None:
+    lines.append(f"# HELP {name} {help_}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _histogram(lines: List[str], name: str, snapshot: Dict, **labels) -> None:
+    for le, count in snapshot["buckets"].items():
+        lines.append(f"{name}_bucket{_labels(**labels, le=le)} {count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {snapshot['sum']}")
+    lines.append(f"{name}_count{_labels(**labels)} {snapshot['count']}")
+
+
+def render(engines: Dict[str, object], hash_stats: Optional[Dict] = None) -> str:
+    """Toàn bộ số liệu ở định dạng text của Prometheus."""
+    lines: List[str] = []
+    routes = sorted(registry.routes.items())
+
+    _header(lines, "medify_http_requests_total", "counter", "Số request theo route và mã trạng thái.")
+    for (method, path), m in routes:
+        for status, count in sorted(m.statuses.items()):
+            lines.append(f"medify_http_requests_total{_labels(method=method, route=path, status=status)} {count}")
+
+    _header(lines, "medify_http_requests_in_flight", "gauge", "Số request đang xử lý.")
+    lines.append(f"medify_http_requests_in_flight {registry.in_flight}")
+
+    histograms = (
+        ("medify_http_request_duration_seconds", "duration_seconds", "Thời gian xử lý request (giây)."),
+        ("medify_http_response_size_bytes", "response_bytes", "Kích thước body response (byte)."),
+        ("medify_http_request_db_queries", "queries", "Số câu SQL mỗi request."),
+        ("medify_http_request_db_seconds", "db_seconds", "Thời gian chạy SQL mỗi request (giây)."),
+    )
+    for name, attr, help_ in histograms:
+        _header(lines, name, "histogram", help_)
+        for (method, path), m in routes:
+            _histogram(lines, name, getattr(m, attr).snapshot(), method=method, route=path)
+
+    _header(lines, "medify_db_queries_total", "counter", "Tổng số câu SQL (kể cả ngoài request).")
+    lines.append(f"medify_db_queries_total {registry.queries_total}")
+    _header(lines, "medify_db_query_seconds_total", "counter", "Tổng thời gian chạy SQL (giây).")
+    lines.append(f"medify_db_query_seconds_total {registry.db_seconds_total}")
+    _header(lines, "medify_db_query_errors_total", "counter", "Số câu SQL lỗi.")
+    lines.append(f"medify_db_query_errors_total {registry.errors_total}")
+
+    pools = [(name, pool_stats(eng)) for name, eng in engines.items()]
+    pools = [(name, s) for name, s in pools if s is not None]
+    _header(lines, "medify_db_pool_checked_out", "gauge", "Số connection đang được dùng.")
+    for name, s in pools:
+        lines.append(f"medify_db_pool_checked_out{_labels(engine=name)} {s['checked_out']}")
+    _header(lines, "medify_db_pool_timeouts_total", "counter", "Số lần hết thời gian chờ connection.")
+    for name, s in pools:
+        lines.append(f"medify_db_pool_timeouts_total{_labels(engine=name)} {s.get('timeouts', 0)}")
+    _header(lines, "medify_db_pool_wait_seconds", "histogram", "Thời gian chờ lấy connection (giây).")
+    for name, s in pools:
+        if "wait_seconds" in s:
+            _histogram(lines, "medify_db_pool_wait_seconds", s["wait_seconds"], engine=name)
+
+    if hash_stats is not None:
+        _header(lines, "medify_hash_pending", "gauge", "Số việc hash mật khẩu đang chờ.")
+        lines.append(f"medify_hash_pending {hash_stats['pending']}")
+        _header(lines, "medify_hash_rejected_total", "counter", "Số việc hash bị từ chối (503).")
+        lines.append(f"medify_hash_rejected_total {hash_stats['rejected']}")
+        _header(lines, "medify_hash_duration_seconds", "histogram", "Thời gian hash / verify mật khẩu (giây).")
+        _histogram(lines, "medify_hash_duration_seconds", hash_stats["latency_seconds"])
+
+    return "\n".join(lines) + "\n"
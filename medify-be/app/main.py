@@ -1,15 +1,29 @@
 # app/main.py
+import logging
 from datetime import datetime, timezone
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.pagination import NEXT_CURSOR_HEADER
 
 from app.routers import auth, doctors, appointments, reviews, admin, dashboard
+from app.health import db_probe, pool_report
+from app.hash_pool import hash_pool
+from app.response_cache import doctor_cache
+from app.doctor_catalog import doctor_catalog
+from app import instrumentation
+from app.config import settings
+from app.db import engine, async_engine
 
-# (Tùy chọn) Nếu bạn muốn dùng settings cho các cấu hình khác:
-# from app.config import settings
 # from app.db import Base, engine  # Khi dùng Alembic, KHÔNG create_all()
 
+# Log của app dưới logger "medify"; handler mặc định chỉ được thêm khi root chưa có handler
+logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("medify")
+logger.setLevel(settings.LOG_LEVEL)
+
 tags_metadata = [
     {"name": "auth", "description": "Đăng ký / đăng nhập, cấp JWT"},
     {"name": "doctors", "description": "Tìm kiếm, xem hồ sơ bác sĩ"},
@@ -45,21 +59,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
+# --- Số liệu theo route + số câu SQL mỗi request (GET /metrics) ---
+if settings.METRICS_ENABLED:
+    app.add_middleware(instrumentation.InstrumentationMiddleware)
+    instrumentation.instrument_engine(engine)
+    if async_engine is not None:
+        instrumentation.instrument_engine(async_engine.sync_engine)
+
 # --- KHÔNG tạo bảng khi dùng Alembic ---
 # from app.db import Base, engine
 # Base.metadata.create_all(bind=engine)  # ❌ Không bật khi dùng Alembic
 
 
-# --- Lifespan logs (tùy chọn) ---
+# --- Lifespan logs ---
 @app.on_event("startup")
 def on_startup():
-    print("🚀 Medify API started")
+    logger.info("Medify API started (DB_ASYNC=%s, metrics=%s)", settings.DB_ASYNC, settings.METRICS_ENABLED)
 
 @app.on_event("shutdown")
 def on_shutdown():
-    print("🛑 Medify API stopped")
+    hash_pool.shutdown()
+    logger.info("Medify API stopped")
 
 
 # --- Health & Root ---
@@ -69,14 +92,45 @@ def root():
 
 @app.get("/health", tags=["auth"])
 def health():
-    return {
-        "status": "ok",
-        "time_utc": datetime.now(timezone.utc).isoformat(),
-        "services": {
-            "api": "up",
-            # Bạn có thể bổ sung ping DB nếu muốn
+    # Trả 503 khi DB không phản hồi / pool cạn để load balancer ngừng gửi request tới worker này
+    database = db_probe.status()
+    ok = database["status"] != "down"
+    return JSONResponse(
+        status_code=200 if ok else 503,
+        content={
+            "status": "ok" if ok else "degraded",
+            "time_utc": datetime.now(timezone.utc).isoformat(),
+            "services": {
+                "api": "up",
+                "database": database,
+            },
         },
-    }
+    )
+
+
+@app.get("/health/pool", tags=["auth"])
+def health_pool():
+    """Thống kê connection pool của worker hiện tại."""
+    return pool_report()
+
+
+@app.get("/health/hashing", tags=["auth"])
+def health_hashing():
+    """Hàng đợi + độ trễ hash mật khẩu của worker hiện tại."""
+    return hash_pool.stats()
+
+
+@app.get("/health/cache", tags=["auth"])
+def health_cache():
+    """Hit/miss của cache response /doctors và danh mục bác sĩ trên worker hiện tại."""
+    return {**doctor_cache.stats(), "catalog": doctor_catalog.stats()}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Số liệu của worker hiện tại, định dạng text của Prometheus."""
+    body = instrumentation.render({"sync": engine, "async": async_engine}, hash_pool.stats())
+    return PlainTextResponse(body, media_type=instrumentation.CONTENT_TYPE)
 
 
 # --- Routers ---
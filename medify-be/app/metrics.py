@@ -0,0 +1,39 @@
+# app/metrics.py
+"""
+Số liệu đo trong tiến trình (không phụ thuộc thư viện ngoài).
+Mỗi worker uvicorn giữ số liệu riêng của nó.
+"""
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, Sequence
+
+# Mốc histogram thời gian (giây)
+DEFAULT_TIME_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+class Histogram:
+    """Histogram với các mốc cố định (kiểu Prometheus: đếm cộng dồn theo `le`)."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_TIME_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # phần tử cuối = +Inf
+        self._sum = 0.0
+        self._lock = Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative, running = {}, 0
+        for le, c in zip(list(self.buckets) + ["+Inf"], counts):
+            running += c
+            cumulative[str(le)] = running
+        return {"count": running, "sum": total, "buckets": cumulative}
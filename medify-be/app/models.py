@@ -1,12 +1,19 @@
 # app/models.py
 from sqlalchemy import (
-    Column, Integer, String, Boolean, Enum, ForeignKey, DateTime, Text, Float
+    Column, Integer, BigInteger, String, Boolean, Enum, ForeignKey, Date, DateTime, Text, Float, Index, Time, text
 )
+from sqlalchemy.dialects.postgresql import ExcludeConstraint, TSVECTOR
 from sqlalchemy.orm import relationship
 import enum
 
 from app.db import Base
 
+# Thời điểm tạo bản ghi (UTC, không kèm múi giờ) do DB điền
+CREATED_AT_DEFAULT = text("(now() AT TIME ZONE 'utc')")
+
+# Exclusion constraint chặn 2 lịch hẹn (chưa huỷ) của cùng bác sĩ chồng giờ nhau
+APPOINTMENT_NO_OVERLAP = "appointments_no_overlap"
+
 class Gender(str, enum.Enum):
     male = "MALE"
     female = "FEMALE"
@@ -26,6 +33,7 @@ class User(Base):
     password_hash = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     role = Column(Enum(Role), nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False, server_default=CREATED_AT_DEFAULT)
 
     doctor_profile = relationship("DoctorProfile", back_populates="user", uselist=False)
     appointments_patient = relationship(
@@ -35,6 +43,10 @@ class User(Base):
         "Appointment", back_populates="doctor", foreign_keys="Appointment.doctor_id"
     )
 
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
+
 class DoctorProfile(Base):
     __tablename__ = "doctor_profiles"
     id = Column(Integer, primary_key=True)
@@ -42,22 +54,38 @@ class DoctorProfile(Base):
     specialty = Column(String, index=True)
     years_exp = Column(Integer, default=0)
     bio = Column(Text)
-    avg_rating = Column(Float, default=0.0)
+    # NOT NULL: là một phần khoá keyset (avg_rating, id) khi liệt kê bác sĩ
+    avg_rating = Column(Float, nullable=False, default=0.0, server_default="0")
+    # Cộng dồn khi có review mới, avg_rating = rating_sum / review_count (xem app/ratings.py)
+    review_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(BigInteger, nullable=False, default=0, server_default="0")
+    # Họ tên + chuyên khoa + tiểu sử đã bỏ dấu, xem app/search.py
+    search_vector = Column(TSVECTOR)
 
     user = relationship("User", back_populates="doctor_profile")
     availabilities = relationship("Availability", back_populates="doctor")
     reviews = relationship("Review", back_populates="doctor")
 
+    __table_args__ = (
+        Index("ix_doctor_profiles_search_vector", "search_vector", postgresql_using="gin"),
+        # Khoá keyset khi liệt kê bác sĩ theo điểm đánh giá
+        Index("ix_doctor_profiles_avg_rating_id", "avg_rating", "id"),
+    )
+
 class Availability(Base):
     __tablename__ = "availabilities"
     id = Column(Integer, primary_key=True)
     doctor_id = Column(Integer, ForeignKey("doctor_profiles.id"))
-    weekday = Column(Integer)            # 0..6
-    start_time = Column(String)          # "08:00"
-    end_time = Column(String)            # "11:30"
+    weekday = Column(Integer)            # 0..6, 0 = thứ Hai (datetime.weekday())
+    start_time = Column(Time)            # 08:00
+    end_time = Column(Time)              # 11:30
 
     doctor = relationship("DoctorProfile", back_populates="availabilities")
 
+    __table_args__ = (
+        Index("ix_availabilities_doctor_id_weekday", "doctor_id", "weekday"),
+    )
+
 class AppointmentStatus(str, enum.Enum):
     booked = "BOOKED"
     canceled = "CANCELED"
@@ -72,11 +100,31 @@ class Appointment(Base):
     end_at = Column(DateTime)
     status = Column(Enum(AppointmentStatus), default=AppointmentStatus.booked)
     note = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, server_default=CREATED_AT_DEFAULT)
 
     patient = relationship("User", foreign_keys=[patient_id], back_populates="appointments_patient")
     doctor = relationship("User", foreign_keys=[doctor_id], back_populates="appointments_doctor")
     review = relationship("Review", back_populates="appointment", uselist=False)
 
+    __table_args__ = (
+        # Khoá keyset khi liệt kê lịch hẹn theo thời gian
+        Index("ix_appointments_start_at_id", "start_at", "id"),
+        Index("ix_appointments_created_at_id", "created_at", "id"),
+        Index("ix_appointments_doctor_id_start_at", "doctor_id", "start_at"),
+        Index("ix_appointments_patient_id_start_at", "patient_id", "start_at"),
+        # Kiểm tra trùng giờ bằng tra index GiST, không khoá bảng. doctor_id bọc trong
+        # int4range để dùng opclass range có sẵn (không cần extension btree_gist).
+        # int4range(NULL, NULL) là khoảng vô hạn: phải loại doctor_id NULL (bác sĩ đã
+        # bị xoá) nếu không mọi lịch hẹn đó bị coi là của cùng một bác sĩ
+        ExcludeConstraint(
+            (text("int4range(doctor_id, doctor_id, '[]')"), "="),
+            (text("tsrange(start_at, end_at)"), "&&"),
+            name=APPOINTMENT_NO_OVERLAP,
+            using="gist",
+            where=text("doctor_id IS NOT NULL AND status <> 'canceled' AND end_at > start_at"),
+        ),
+    )
+
 class Review(Base):
     __tablename__ = "reviews"
     id = Column(Integer, primary_key=True)
@@ -84,6 +132,33 @@ class Review(Base):
     doctor_profile_id = Column(Integer, ForeignKey("doctor_profiles.id"))
     rating = Column(Integer)  # 1..5
     comment = Column(Text)
+    created_at = Column(DateTime, nullable=False, server_default=CREATED_AT_DEFAULT)
 
     appointment = relationship("Appointment", back_populates="review")
     doctor = relationship("DoctorProfile", back_populates="reviews")
+
+    __table_args__ = (
+        Index("ix_reviews_created_at_id", "created_at", "id"),
+    )
+
+class AppointmentDailyStat(Base):
+    """Số lịch hẹn theo (ngày khám, bác sĩ, trạng thái), cập nhật cùng transaction ghi (app/stats.py)."""
+    __tablename__ = "appointment_daily_stats"
+    day = Column(Date, primary_key=True)
+    doctor_id = Column(Integer, primary_key=True)  # users.id; 0 = bác sĩ đã bị xoá
+    status = Column(Enum(AppointmentStatus), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class UserStat(Base):
+    """Số user theo (role, is_active) (app/stats.py)."""
+    __tablename__ = "user_stats"
+    role = Column(Enum(Role), primary_key=True)
+    is_active = Column(Boolean, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class TokenRevocation(Base):
+    """Token đã thu hồi, dùng chung giữa các worker (TOKEN_BLOCKLIST_BACKEND=database)."""
+    __tablename__ = "token_revocations"
+    key = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False)
+    expires_at = Column(BigInteger, nullable=False, index=True)  # epoch giây
@@ -0,0 +1,94 @@
+# app/pagination.py
+"""
+Phân trang keyset (cursor) cho các endpoint trả về danh sách.
+
+- Thân response vẫn là một mảng JSON (giữ tương thích với app Flutter / admin SPA).
+- Cursor trang kế tiếp nằm ở header `X-Next-Cursor`; không có header = hết dữ liệu.
+- Cursor là giá trị khoá sắp xếp của phần tử cuối trang, mã hoá base64url nên
+  client chỉ cần gửi lại nguyên văn qua `?cursor=`.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_
+
+from app.config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass
+class PageParams:
+    limit: int
+    cursor: Optional[str] = None
+
+
+def page_params(
+        limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+        cursor: Optional[str] = Query(None, description="Giá trị header X-Next-Cursor của trang trước"),
+) -> PageParams:
+    return PageParams(limit=limit, cursor=cursor)
+
+
+def _encode_value(v: Any) -> Any:
+    if isinstance(v, datetime):
+        return v.isoformat()
+    return v
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, columns: Sequence[Any]) -> List[Any]:
+    """Giải mã cursor và ép kiểu theo cột sắp xếp tương ứng."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        out = []
+        for col, v in zip(columns, values):
+            py_type = col.type.python_type
+            if v is None:
+                out.append(None)
+            elif py_type is datetime:
+                out.append(datetime.fromisoformat(v))
+            else:
+                out.append(py_type(v))
+        return out
+    except (ValueError, TypeError, NotImplementedError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(
+        query,
+        page: PageParams,
+        columns: Sequence[Any],
+        key: Callable[[Any], Sequence[Any]],
+        response: Response,
+        descending: bool = True,
+) -> list:
+    """
+    Áp dụng keyset pagination lên một ORM Query.
+    - columns: các cột khoá sắp xếp, cột cuối phải duy nhất (thường là id)
+    - key: lấy giá trị khoá từ một dòng kết quả (để tạo cursor)
+    Trả về tối đa `page.limit` dòng; đặt header X-Next-Cursor nếu còn trang sau.
+    """
+    if page.cursor:
+        values = decode_cursor(page.cursor, columns)
+        cond = tuple_(*columns) < tuple_(*values) if descending else tuple_(*columns) > tuple_(*values)
+        query = query.filter(cond)
+
+    order = [c.desc() for c in columns] if descending else [c.asc() for c in columns]
+    rows = query.order_by(*order).limit(page.limit + 1).all()
+
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(rows[-1]))
+    return rows
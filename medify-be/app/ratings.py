@@ -0,0 +1,74 @@
+# app/ratings.py
+"""
+Điểm đánh giá của bác sĩ: doctor_profiles.review_count / rating_sum được cộng dồn
+trong cùng transaction với việc tạo review (một câu UPDATE, không tính lại AVG trên
+toàn bộ review), avg_rating = rating_sum / review_count.
+
+Review ghi ngoài API (SQL tay, script cũ) làm lệch số liệu: chạy
+scripts/reconcile_ratings.py để kiểm tra / sửa.
+"""
+from typing import Dict, List
+
+from sqlalchemy import Float, cast, text, update
+from sqlalchemy.orm import Session
+
+from app.models import DoctorProfile
+
+
+def add_rating(db: Session, doctor_profile_id: int, rating: int) -> float:
+    """Cộng một đánh giá vào hồ sơ bác sĩ (khoá dòng tới khi commit), trả về avg_rating mới."""
+    # Vế phải của SET đọc giá trị cũ của dòng nên không cần đọc trước
+    stmt = (
+        update(DoctorProfile)
+        .where(DoctorProfile.id == doctor_profile_id)
+        .values(
+            review_count=DoctorProfile.review_count + 1,
+            rating_sum=DoctorProfile.rating_sum + rating,
+            avg_rating=cast(DoctorProfile.rating_sum + rating, Float) / (DoctorProfile.review_count + 1),
+        )
+        .returning(DoctorProfile.avg_rating)
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).scalar_one()
+
+
+# Số liệu thực tế tính từ bảng reviews cho mọi hồ sơ
+_ACTUAL = (
+    "SELECT p.id, COALESCE(r.count, 0) AS review_count, COALESCE(r.sum, 0) AS rating_sum, "
+    "       CASE WHEN COALESCE(r.count, 0) = 0 THEN 0 ELSE CAST(r.sum AS float8) / r.count END AS avg_rating "
+    "FROM doctor_profiles p LEFT JOIN ("
+    "  SELECT doctor_profile_id, count(*) AS count, sum(rating) AS sum FROM reviews "
+    "  WHERE rating IS NOT NULL GROUP BY doctor_profile_id"
+    ") r ON r.doctor_profile_id = p.id"
+)
+
+
+def drift(db: Session) -> List[Dict]:
+    """Các hồ sơ có review_count / rating_sum / avg_rating khác với bảng reviews (rỗng = khớp)."""
+    rows = db.execute(
+        text(
+            f"WITH actual AS ({_ACTUAL}) "
+            "SELECT p.id, p.review_count, a.review_count AS actual_count, p.rating_sum, "
+            "       a.rating_sum AS actual_sum, p.avg_rating, a.avg_rating AS actual_avg "
+            "FROM doctor_profiles p JOIN actual a ON a.id = p.id "
+            "WHERE p.review_count <> a.review_count OR p.rating_sum <> a.rating_sum "
+            "   OR p.avg_rating IS DISTINCT FROM a.avg_rating "
+            "ORDER BY p.id"
+        )
+    ).mappings().all()
+    return [dict(r) for r in rows]
+
+
+def reconcile(db: Session) -> int:
+    """Tính lại các hồ sơ bị lệch từ bảng reviews, trả về số hồ sơ đã sửa."""
+    result = db.execute(
+        text(
+            f"WITH actual AS ({_ACTUAL}) "
+            "UPDATE doctor_profiles p SET review_count = a.review_count, rating_sum = a.rating_sum, "
+            "       avg_rating = a.avg_rating "
+            "FROM actual a WHERE a.id = p.id "
+            "  AND (p.review_count <> a.review_count OR p.rating_sum <> a.rating_sum "
+            "       OR p.avg_rating IS DISTINCT FROM a.avg_rating)"
+        )
+    )
+    return result.rowcount
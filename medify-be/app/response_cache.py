@@ -0,0 +1,95 @@
+# app/response_cache.py
+"""
+Cache response đã serialize (JSON bytes) cho các endpoint công khai, đọc nhiều:
+GET /doctors và GET /doctors/{id}.
+
+- Khoá là tham số đã chuẩn hoá (do router tạo), giá trị gồm body, header
+  (vd X-Next-Cursor) và ETag; hết hạn sau DOCTOR_CACHE_SECONDS, LRU khi đầy.
+- ETag + If-None-Match: client gửi lại ETag đang giữ sẽ nhận 304 không có body.
+- Thao tác ghi liên quan gọi invalidate(). Cache nằm trong từng worker nên worker
+  khác có thể trả dữ liệu cũ tối đa DOCTOR_CACHE_SECONDS giây.
+"""
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.cache import TTLCache
+from app.config import settings
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Chấp nhận cả dạng weak (W/"...") mà một số proxy thêm vào
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.enabled = ttl > 0 and maxsize > 0
+        self._cache = TTLCache(maxsize=max(maxsize, 1), ttl=ttl)
+        # Tăng mỗi lần invalidate: kết quả tính trước đó không được ghi vào cache
+        self._generation = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    async def respond(
+            self,
+            request: Request,
+            key: Hashable,
+            compute: Callable[[], Awaitable[Tuple[bytes, Dict[str, str]]]],
+    ) -> Response:
+        """compute() trả về (body JSON, header cần giữ) khi cache miss."""
+        entry: Optional[CachedResponse] = self._cache.get(key) if self.enabled else None
+        if entry is None:
+            generation = self._generation
+            body, headers = await compute()
+            entry = CachedResponse(body=body, etag=make_etag(body), headers=headers)
+            if self.enabled and generation == self._generation:
+                self._cache.set(key, entry)
+
+        headers = {**entry.headers, "ETag": entry.etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request, entry.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self.invalidations += 1
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._cache.stats(),
+            "enabled": self.enabled,
+            "ttl_seconds": self._cache.ttl,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+        }
+
+
+doctor_cache = ResponseCache(maxsize=settings.DOCTOR_CACHE_SIZE, ttl=settings.DOCTOR_CACHE_SECONDS)
+
+
+def invalidate_doctors() -> None:
+    """Gọi sau khi ghi dữ liệu hiển thị ở /doctors (hồ sơ, lịch làm việc, đánh giá, user)."""
+    doctor_cache.invalidate()
@@ -1,18 +1,39 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session
 
-from app import models, schemas
+from app import appointment_listing, models, schemas, serialization, slots, stats
+from app.config import settings
 from app.deps import get_db, require_role
 from app.models import Role
+from app.pagination import NEXT_CURSOR_HEADER, PageParams, decode_cursor, encode_cursor, page_params, paginate
+from app.security import hash_password
+from app.token_blocklist import revoke_user
+from app.response_cache import invalidate_doctors
+from app.doctor_catalog import doctor_catalog
+from app import exports
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 
-# 🧩 Lấy danh sách tất cả người dùng
+# 🧩 Lấy danh sách tất cả người dùng (?format=ndjson|csv để xuất toàn bộ dạng stream)
 @router.get("/users", response_model=List[schemas.UserOut])
-def get_all_users(db: Session = Depends(get_db), _: dict = Depends(require_role(Role.admin))):
-    users = db.query(models.User).all()
+def get_all_users(
+        response: Response,
+        page: PageParams = Depends(page_params),
+        fmt: Optional[str] = Query(None, alias="format", pattern=exports.FORMAT_PATTERN),
+        db: Session = Depends(get_db),
+        _: dict = Depends(require_role(Role.admin)),
+):
+    if fmt in exports.EXPORT_FORMATS:
+        return exports.stream_export(exports.users_export_query, fmt, "users")
+
+    users = paginate(
+        db.query(models.User), page, [models.User.id], lambda u: (u.id,), response,
+        descending=False,
+    )
+    if settings.FAST_JSON:
+        return serialization.json_response(serialization.dumps_trusted(schemas.UserOut, users), response)
     return users
 
 
@@ -32,22 +53,44 @@ def delete_user(user_id: int, db: Session = Depends(get_db), _: dict = Depends(r
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    is_doctor = user.role == Role.doctor
+    stats.user_removed(db, user)
     db.delete(user)
     db.commit()
+    revoke_user(user_id)
+    if is_doctor:
+        doctor_catalog.remove_doctor(user_id)
+        slots.invalidate(user_id)
+        invalidate_doctors()
     return {"message": "User deleted successfully"}
 
 
 # 🧩 Lấy danh sách tất cả bác sĩ
 @router.get("/doctors", response_model=List[schemas.DoctorCard])
-def list_doctors(db: Session = Depends(get_db), _: dict = Depends(require_role(Role.admin))):
+def list_doctors(
+        response: Response,
+        page: PageParams = Depends(page_params),
+        db: Session = Depends(get_db),
+        _: dict = Depends(require_role(Role.admin)),
+):
+    if doctor_catalog.enabled:
+        # Ghép sẵn từ danh mục trong bộ nhớ, cùng thứ tự và cursor với nhánh SQL bên dưới
+        after_id = decode_cursor(page.cursor, [models.User.id])[0] if page.cursor else None
+        doctor_catalog.ensure_loaded(db)
+        body, next_id = doctor_catalog.page_by_id(page.limit, after_id)
+        headers = {NEXT_CURSOR_HEADER: encode_cursor([next_id])} if next_id is not None else None
+        return Response(content=body, media_type="application/json", headers=headers)
+
     qry = (
         db.query(models.User, models.DoctorProfile)
         .join(models.DoctorProfile, models.DoctorProfile.user_id == models.User.id)
         .filter(models.User.role == Role.doctor)
     )
 
+    rows = paginate(qry, page, [models.User.id], lambda row: (row[0].id,), response, descending=False)
+
     items = []
-    for u, p in qry.all():
+    for u, p in rows:
         items.append(
             schemas.DoctorCard(
                 id=u.id,
@@ -62,20 +105,21 @@ def list_doctors(db: Session = Depends(get_db), _: dict = Depends(require_role(R
     return items
 
 
-# 🧩 Xem tất cả các cuộc hẹn
+# 🧩 Xem tất cả các cuộc hẹn (?format=ndjson|csv để xuất toàn bộ dạng stream)
 @router.get("/appointments", response_model=List[schemas.AppointmentOut])
-def list_appointments(db: Session = Depends(get_db), _: dict = Depends(require_role(Role.admin))):
-    appointments = db.query(models.Appointment)\
-        .options(joinedload(models.Appointment.patient))\
-        .options(joinedload(models.Appointment.doctor).joinedload(models.User.doctor_profile))\
-        .order_by(models.Appointment.start_at.desc())\
-        .all()
-    
-    # Populate specialty field for doctors
-    for appt in appointments:
-        if appt.doctor and appt.doctor.doctor_profile:
-            appt.doctor.specialty = appt.doctor.doctor_profile.specialty
-    
+def list_appointments(
+        response: Response,
+        page: PageParams = Depends(page_params),
+        fmt: Optional[str] = Query(None, alias="format", pattern=exports.FORMAT_PATTERN),
+        db: Session = Depends(get_db),
+        _: dict = Depends(require_role(Role.admin)),
+):
+    if fmt in exports.EXPORT_FORMATS:
+        return exports.stream_export(exports.appointments_export_query, fmt, "appointments")
+
+    appointments = appointment_listing.load_page(db, page, response)
+    if settings.FAST_JSON:
+        return serialization.json_response(serialization.dumps(appointments), response)
     return appointments
 
 
@@ -86,6 +130,7 @@ def delete_appointment(appointment_id: int, db: Session = Depends(get_db), _: di
     if not appt:
         raise HTTPException(status_code=404, detail="Appointment not found")
 
+    stats.appointment_removed(db, appt)
     db.delete(appt)
     db.commit()
     return {"message": "Appointment deleted successfully"}
@@ -99,9 +144,16 @@ def toggle_user_active(user_id: int, db: Session = Depends(get_db), _: dict = De
         raise HTTPException(status_code=404, detail="User not found")
     
     user.is_active = not user.is_active
+    stats.user_active_changed(db, user)
     db.commit()
     db.refresh(user)
-    
+
+    # Khoá tài khoản: các token đang dùng hết hiệu lực ngay
+    if not user.is_active:
+        revoke_user(user_id)
+    if user.role == Role.doctor:
+        invalidate_doctors()
+
     return {
         "message": f"User {'activated' if user.is_active else 'deactivated'} successfully",
         "is_active": user.is_active
@@ -111,16 +163,15 @@ def toggle_user_active(user_id: int, db: Session = Depends(get_db), _: dict = De
 # 🧩 Reset mật khẩu user về default
 @router.post("/users/{user_id}/reset-password")
 def reset_user_password(user_id: int, db: Session = Depends(get_db), _: dict = Depends(require_role(Role.admin))):
-    from app.security import get_password_hash
-    
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Reset về mật khẩu mặc định
     default_password = "Password@123"
-    user.password_hash = get_password_hash(default_password)
+    user.password_hash = hash_password(default_password)
     db.commit()
+    revoke_user(user_id)
     
     return {
         "message": "Password reset successfully",
@@ -1,27 +1,47 @@
+from datetime import datetime
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.deps import get_db, get_current_user, require_role
-from app import models, schemas
+from app.deps import get_async_db, get_current_user, require_role, run_db
+from app import appointment_listing, models, schemas, serialization, slots, stats
+from app.config import settings
+from app.pagination import PageParams, page_params
 
 router = APIRouter(prefix="/appointments", tags=["appointments"])
 
 
 # 🧩 Lấy danh sách cuộc hẹn (theo vai trò)
 @router.get("", response_model=List[schemas.AppointmentOut])
-def my_appointments(
+async def my_appointments(
+        response: Response,
+        page: PageParams = Depends(page_params),
         user=Depends(get_current_user),
-        db: Session = Depends(get_db),
+        db=Depends(get_async_db),
 ):
+    if settings.FAST_JSON:
+        body = await run_db(db, _my_appointments_json, user, page, response)
+        return serialization.json_response(body, response)
+    return await run_db(db, _my_appointments, user, page, response)
+
+
+def _my_appointments(db: Session, user: dict, page: PageParams, response: Response) -> List[dict]:
+    return _my_appointment_rows(db, user, page, response)
+
+
+def _my_appointments_json(db: Session, user: dict, page: PageParams, response: Response) -> bytes:
+    return serialization.dumps(_my_appointment_rows(db, user, page, response))
+
+
+def _my_appointment_rows(db: Session, user: dict, page: PageParams, response: Response) -> List[dict]:
     if user["role"] == models.Role.patient.value:
-        q = db.query(models.Appointment).filter_by(patient_id=user["sub"])
+        criteria = [models.Appointment.patient_id == user["sub"]]
     elif user["role"] == models.Role.doctor.value:
-        q = db.query(models.Appointment).filter_by(doctor_id=user["sub"])
+        criteria = [models.Appointment.doctor_id == user["sub"]]
     else:
-        q = db.query(models.Appointment)
-
-    return q.order_by(models.Appointment.start_at.desc()).all()
+        criteria = []
+    return appointment_listing.load_page(db, page, response, *criteria)
 
 
 # 🧩 Bệnh nhân tạo cuộc hẹn mới
@@ -30,31 +50,75 @@ def my_appointments(
     response_model=schemas.AppointmentOut,
     dependencies=[Depends(require_role(models.Role.patient))],
 )
-def create_appointment(
+async def create_appointment(
         payload: schemas.AppointmentCreate,
         user=Depends(get_current_user),
-        db: Session = Depends(get_db),
+        db=Depends(get_async_db),
 ):
+    return await run_db(db, _create_appointment, payload, user)
+
+
+def _within_availability(windows: List[models.Availability], start_at: datetime, end_at: datetime) -> bool:
+    # weekday theo datetime.weekday(): 0 = thứ Hai ... 6 = Chủ nhật; lịch hẹn không qua ngày
+    if end_at.date() != start_at.date():
+        return False
+    return any(
+        w.weekday == start_at.weekday()
+        and w.start_time is not None and w.end_time is not None
+        and w.start_time <= start_at.time() and end_at.time() <= w.end_time
+        for w in windows
+    )
+
+
+def _create_appointment(db: Session, payload: schemas.AppointmentCreate, user: dict) -> schemas.AppointmentOut:
+    profile = (
+        db.query(models.DoctorProfile)
+        .join(models.User, models.User.id == models.DoctorProfile.user_id)
+        .filter(models.User.id == payload.doctor_user_id, models.User.role == models.Role.doctor)
+        .first()
+    )
+    if not profile:
+        raise HTTPException(404, "Doctor not found")
+    # Cùng quy ước thời gian với slot engine: giờ có múi giờ được đổi sang UTC không kèm múi giờ
+    start_at, end_at = slots.naive_utc(payload.start_at), slots.naive_utc(payload.end_at)
+    # Bác sĩ chưa khai báo lịch làm việc: nhận mọi khung giờ (như trước đây)
+    if profile.availabilities and not _within_availability(profile.availabilities, start_at, end_at):
+        raise HTTPException(400, "Outside doctor's working hours")
+
     ap = models.Appointment(
         patient_id=user["sub"],
         doctor_id=payload.doctor_user_id,
-        start_at=payload.start_at,
-        end_at=payload.end_at,
+        start_at=start_at,
+        end_at=end_at,
         note=payload.note,
     )
     db.add(ap)
+    try:
+        # Trùng giờ được chặn bởi exclusion constraint (tra index GiST); hai request
+        # cùng khung giờ thì request sau chờ request trước commit rồi mới bị từ chối
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        if models.APPOINTMENT_NO_OVERLAP in str(e.orig):
+            raise HTTPException(409, "Time slot already booked")
+        raise
+    stats.appointment_added(db, ap)
     db.commit()
     db.refresh(ap)
-    return ap
+    return schemas.AppointmentOut.model_validate(ap)
 
 
 # 🧩 Hủy cuộc hẹn (bệnh nhân hoặc bác sĩ)
 @router.post("/{appointment_id}/cancel", response_model=schemas.AppointmentOut)
-def cancel_appointment(
+async def cancel_appointment(
         appointment_id: int,
         user=Depends(get_current_user),
-        db: Session = Depends(get_db),
+        db=Depends(get_async_db),
 ):
+    return await run_db(db, _cancel_appointment, appointment_id, user)
+
+
+def _cancel_appointment(db: Session, appointment_id: int, user: dict) -> schemas.AppointmentOut:
     ap = db.query(models.Appointment).get(appointment_id)
     if not ap:
         raise HTTPException(404, "Not found")
@@ -65,7 +129,9 @@ def cancel_appointment(
     if user["role"] == models.Role.doctor.value and ap.doctor_id != user["sub"]:
         raise HTTPException(403, "Forbidden")
 
+    old_status = ap.status
     ap.status = models.AppointmentStatus.canceled
+    stats.appointment_status_changed(db, ap, old_status)
     db.commit()
     db.refresh(ap)
-    return ap
+    return schemas.AppointmentOut.model_validate(ap)
@@ -1,31 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import Generator
 
-from app import schemas, models
-from app.db import SessionLocal
-from app.security import hash_password, verify_password, create_access_token
+from app import schemas, models, search, stats
+from app.security import create_access_token
+from app.hash_pool import hash_password, verify_and_update
 
 from jose import jwt
-from app.deps import get_db, oauth2, get_current_user
-from app.token_blocklist import block as block_token
+from app.deps import get_async_db, run_db, oauth2, get_current_user
+from app.token_blocklist import revoke_token
+from app.response_cache import invalidate_doctors
+from app.doctor_catalog import doctor_catalog
 from app.config import settings
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-# 🧩 Tạo session database cho mỗi request
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 # 🧩 API đăng ký tài khoản
 @router.post("/register", response_model=schemas.UserOut)
-def register(payload: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(payload: schemas.UserCreate, db=Depends(get_async_db)):
+    # Hash (tốn CPU) chạy trong process pool riêng
+    password_hash = await hash_password(payload.password)
+    return await run_db(db, _register, payload, password_hash)
+
+
+def _register(db: Session, payload: schemas.UserCreate, password_hash: str) -> schemas.UserOut:
     # Kiểm tra email đã tồn tại
     exists = db.query(models.User).filter(models.User.email == payload.email).first()
     if exists:
@@ -35,12 +33,14 @@ def register(payload: schemas.UserCreate, db: Session = Depends(get_db)):
     user = models.User(
         email=payload.email,
         full_name=payload.full_name,
-        password_hash=hash_password(payload.password),
+        password_hash=password_hash,
         role=payload.role,
         gender=payload.gender,
     )
 
     db.add(user)
+    db.flush()
+    stats.user_added(db, user)
     db.commit()
     db.refresh(user)
 
@@ -51,25 +51,38 @@ def register(payload: schemas.UserCreate, db: Session = Depends(get_db)):
             specialty="General",
             years_exp=0,
             bio="",
+            search_vector=search.doctor_search_vector(user.full_name, "General", ""),
         )
         db.add(prof)
         db.commit()
+        db.refresh(user)
+        doctor_catalog.refresh_doctor(db, user.id)
+        invalidate_doctors()
 
-    return user
+    return schemas.UserOut.model_validate(user)
 
 
 # 🧩 API đăng nhập
 @router.post("/login", response_model=schemas.TokenOut)
-def login(payload: schemas.LoginIn, db: Session = Depends(get_db)):
+async def login(payload: schemas.LoginIn, db=Depends(get_async_db)):
     # Kiểm tra người dùng tồn tại
-    u = db.query(models.User).filter(models.User.email == payload.email).first()
+    u = await run_db(db, _find_user_by_email, payload.email)
     if not u:
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
-    # Kiểm tra mật khẩu
-    if not verify_password(payload.password, u.password_hash):
+    # Kiểm tra mật khẩu (tốn CPU, chạy trong process pool riêng)
+    verified, new_hash = await verify_and_update(payload.password, u.password_hash)
+    if not verified:
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
+    # Hash theo chính sách cũ (scheme / số vòng) -> lưu hash mới
+    if new_hash:
+        await run_db(db, _update_password_hash, u.id, new_hash)
+
+    # Tài khoản đã bị admin khoá
+    if u.is_active is False:
+        raise HTTPException(status_code=403, detail="Account is deactivated")
+
     # Tạo token đăng nhập
     token = create_access_token(str(u.id), u.role.value)
 
@@ -77,15 +90,33 @@ def login(payload: schemas.LoginIn, db: Session = Depends(get_db)):
     return {"access_token": token, "token_type": "bearer", "user": u}
 
 
+def _find_user_by_email(db: Session, email: str):
+    u = db.query(models.User).filter(models.User.email == email).first()
+    # Trả connection về pool trước khi chờ verify mật khẩu (có thể xếp hàng lâu)
+    if u is not None:
+        db.expunge(u)
+    db.rollback()
+    return u
+
+
+def _update_password_hash(db: Session, user_id: int, password_hash: str) -> None:
+    db.query(models.User).filter(models.User.id == user_id).update({"password_hash": password_hash})
+    db.commit()
+
+
 # 🧩 API lấy thông tin user hiện tại
 @router.get("/me", response_model=schemas.UserOut)
-def get_me(user=Depends(get_current_user), db: Session = Depends(get_db)):
-    u = db.query(models.User).filter(models.User.id == user["sub"]).first()
+async def get_me(user=Depends(get_current_user), db=Depends(get_async_db)):
+    u = await run_db(db, _get_user, user["sub"])
     if not u:
         raise HTTPException(status_code=404, detail="User not found")
     return u
 
 
+def _get_user(db: Session, user_id: int):
+    return db.query(models.User).filter(models.User.id == user_id).first()
+
+
 @router.post("/logout")
 def logout(token: str = Depends(oauth2)):
     """
@@ -99,5 +130,5 @@ def logout(token: str = Depends(oauth2)):
         # Token không hợp lệ thì coi như đã "logout" ở client; trả về 200 cho idempotency.
         return {"ok": True, "revoked": False}
 
-    block_token(token, exp_epoch=exp)
+    revoke_token(payload, token)
     return {"ok": True, "revoked": True, "exp": exp}
\ No newline at end of file
@@ -1,54 +1,53 @@
 # app/routers/dashboard.py
-from typing import List
-from datetime import datetime, timedelta, date
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func, cast, Date, desc
-
-from app import models, schemas
-from app.deps import get_db, require_role
+import asyncio
+from typing import Dict, List, Optional
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import (
+    DateTime, Integer, String, column, desc, func, literal, null, select, tuple_, union_all
+)
+
+from app import models, schemas, stats, timeseries
+from app.deps import get_db, require_role, run_in_new_session
 from app.models import Role, AppointmentStatus
+from app.config import settings
+from app.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
 
 router = APIRouter(prefix="/admin/dashboard", tags=["dashboard"])
 
 
-@router.get("/stats", response_model=schemas.DashboardStats)
-def get_dashboard_stats(
-    db: Session = Depends(get_db),
-    _: dict = Depends(require_role(Role.admin))
-):
-    """
-    Lấy thống kê tổng quan cho dashboard
-    """
-    # Tổng số bệnh nhân
-    total_patients = db.query(models.User).filter(
-        models.User.role == Role.patient
-    ).count()
-    
-    # Tổng số bác sĩ
-    total_doctors = db.query(models.User).filter(
-        models.User.role == Role.doctor
-    ).count()
-    
-    # Tổng số appointments
-    total_appointments = db.query(models.Appointment).count()
-    
-    # Số appointments đang chờ (BOOKED)
-    pending_appointments = db.query(models.Appointment).filter(
-        models.Appointment.status == AppointmentStatus.booked
-    ).count()
-    
-    # Số appointments hôm nay
-    today = date.today()
-    today_appointments = db.query(models.Appointment).filter(
-        cast(models.Appointment.start_at, Date) == today
-    ).count()
-    
-    # Số user đang hoạt động
-    active_users = db.query(models.User).filter(
-        models.User.is_active == True
-    ).count()
-    
+# Các widget đọc bộ đếm trong app/stats.py (cập nhật khi ghi) thay vì quét appointments
+Stat = models.AppointmentDailyStat
+
+
+def _utc_today() -> date:
+    # appointments.start_at (và appointment_daily_stats.day) tính theo UTC
+    return datetime.utcnow().date()
+
+
+# Số lịch hẹn theo bác sĩ (dùng chung cho thống kê chuyên khoa & top bác sĩ)
+def _appointment_counts_by_doctor(db: Session):
+    return db.query(
+        Stat.doctor_id.label("doctor_id"),
+        stats.appointment_count().label("appointment_count"),
+    ).group_by(Stat.doctor_id).subquery()
+
+
+def _overview(db: Session) -> schemas.DashboardStats:
+    user_count = models.UserStat.count
+    total_patients, total_doctors, active_users = db.query(
+        func.coalesce(func.sum(user_count).filter(models.UserStat.role == Role.patient), 0),
+        func.coalesce(func.sum(user_count).filter(models.UserStat.role == Role.doctor), 0),
+        func.coalesce(func.sum(user_count).filter(models.UserStat.is_active == True), 0),
+    ).one()
+
+    total_appointments, pending_appointments, today_appointments = db.query(
+        func.coalesce(func.sum(Stat.count), 0),
+        func.coalesce(func.sum(Stat.count).filter(Stat.status == AppointmentStatus.booked), 0),
+        func.coalesce(func.sum(Stat.count).filter(Stat.day == _utc_today()), 0),
+    ).one()
+
     return schemas.DashboardStats(
         total_patients=total_patients,
         total_doctors=total_doctors,
@@ -59,19 +58,13 @@ def get_dashboard_stats(
     )
 
 
-@router.get("/appointments-by-status", response_model=List[schemas.AppointmentStatusCount])
-def get_appointments_by_status(
-    db: Session = Depends(get_db),
-    _: dict = Depends(require_role(Role.admin))
-):
-    """
-    Thống kê số lượng appointments theo trạng thái
-    """
+def _appointments_by_status(db: Session) -> List[schemas.AppointmentStatusCount]:
+    count = stats.appointment_count()
     results = db.query(
-        models.Appointment.status,
-        func.count(models.Appointment.id).label('count')
-    ).group_by(models.Appointment.status).all()
-    
+        Stat.status,
+        count.label('count')
+    ).group_by(Stat.status).having(count > 0).all()
+
     return [
         schemas.AppointmentStatusCount(
             status=status.value,
@@ -80,19 +73,13 @@ def get_appointments_by_status(
     ]
 
 
-@router.get("/users-by-role", response_model=List[schemas.UserRoleCount])
-def get_users_by_role(
-    db: Session = Depends(get_db),
-    _: dict = Depends(require_role(Role.admin))
-):
-    """
-    Thống kê số lượng users theo role
-    """
+def _users_by_role(db: Session) -> List[schemas.UserRoleCount]:
+    count = stats.user_count()
     results = db.query(
-        models.User.role,
-        func.count(models.User.id).label('count')
-    ).group_by(models.User.role).all()
-    
+        models.UserStat.role,
+        count.label('count')
+    ).group_by(models.UserStat.role).having(count > 0).all()
+
     return [
         schemas.UserRoleCount(
             role=role.value,
@@ -101,72 +88,44 @@ def get_users_by_role(
     ]
 
 
-@router.get("/specialties", response_model=List[schemas.SpecialtyStats])
-def get_specialty_stats(
-    db: Session = Depends(get_db),
-    _: dict = Depends(require_role(Role.admin))
-):
-    """
-    Thống kê theo chuyên khoa: số bác sĩ và số appointments
-    """
-    # Đếm số bác sĩ theo chuyên khoa
-    doctor_counts = db.query(
-        models.DoctorProfile.specialty,
-        func.count(models.DoctorProfile.id).label('doctor_count')
-    ).group_by(models.DoctorProfile.specialty).all()
-    
-    # Đếm số appointments theo chuyên khoa
-    appointment_counts = db.query(
+def _specialty_stats(db: Session) -> List[schemas.SpecialtyStats]:
+    counts = _appointment_counts_by_doctor(db)
+    results = db.query(
         models.DoctorProfile.specialty,
-        func.count(models.Appointment.id).label('appointment_count')
-    ).join(
-        models.User, models.DoctorProfile.user_id == models.User.id
-    ).join(
-        models.Appointment, models.Appointment.doctor_id == models.User.id
+        func.count(models.DoctorProfile.id).label('doctor_count'),
+        func.coalesce(func.sum(counts.c.appointment_count), 0).label('appointment_count'),
+    ).outerjoin(
+        counts, counts.c.doctor_id == models.DoctorProfile.user_id
     ).group_by(models.DoctorProfile.specialty).all()
-    
-    # Tạo dict để merge data
-    appt_dict = {specialty: count for specialty, count in appointment_counts}
-    
+
     return [
         schemas.SpecialtyStats(
             specialty=specialty,
             doctor_count=doctor_count,
-            appointment_count=appt_dict.get(specialty, 0)
-        ) for specialty, doctor_count in doctor_counts
+            appointment_count=appointment_count
+        ) for specialty, doctor_count, appointment_count in results
     ]
 
 
-@router.get("/top-doctors", response_model=List[schemas.TopDoctor])
-def get_top_doctors(
-    limit: int = 5,
-    db: Session = Depends(get_db),
-    _: dict = Depends(require_role(Role.admin))
-):
-    """
-    Lấy top bác sĩ có nhiều appointments nhất
-    """
+def _top_doctors(db: Session, limit: int) -> List[schemas.TopDoctor]:
+    counts = _appointment_counts_by_doctor(db)
+    appointment_count = func.coalesce(counts.c.appointment_count, 0).label('appointment_count')
     results = db.query(
         models.User.id,
         models.User.full_name,
         models.DoctorProfile.specialty,
         models.DoctorProfile.avg_rating,
-        func.count(models.Appointment.id).label('appointment_count')
+        appointment_count,
     ).join(
         models.DoctorProfile, models.User.id == models.DoctorProfile.user_id
     ).outerjoin(
-        models.Appointment, models.Appointment.doctor_id == models.User.id
+        counts, counts.c.doctor_id == models.User.id
     ).filter(
         models.User.role == Role.doctor
-    ).group_by(
-        models.User.id,
-        models.User.full_name,
-        models.DoctorProfile.specialty,
-        models.DoctorProfile.avg_rating
     ).order_by(
-        desc('appointment_count')
+        desc(appointment_count)
     ).limit(limit).all()
-    
+
     return [
         schemas.TopDoctor(
             doctor_id=doctor_id,
@@ -178,30 +137,21 @@ def get_top_doctors(
     ]
 
 
-@router.get("/appointment-trends", response_model=List[schemas.AppointmentTrend])
-def get_appointment_trends(
-    days: int = 7,
-    db: Session = Depends(get_db),
-    _: dict = Depends(require_role(Role.admin))
-):
-    """
-    Xu hướng đặt lịch theo ngày (mặc định 7 ngày gần nhất)
-    """
-    # Lấy appointments trong N ngày gần nhất
-    start_date = date.today() - timedelta(days=days)
-    
+def _appointment_trends(db: Session, days: int) -> List[schemas.AppointmentTrend]:
+    # Lấy số lịch hẹn trong N ngày gần nhất (tính cả hôm nay, theo UTC)
+    start_date = _utc_today() - timedelta(days=days - 1)
+
     results = db.query(
-        cast(models.Appointment.start_at, Date).label('date'),
-        func.count(models.Appointment.id).label('count')
+        Stat.day,
+        stats.appointment_count().label('count')
     ).filter(
-        cast(models.Appointment.start_at, Date) >= start_date
-    ).group_by(
-        cast(models.Appointment.start_at, Date)
-    ).order_by('date').all()
-    
+        Stat.day >= start_date,
+        Stat.day < start_date + timedelta(days=days),
+    ).group_by(Stat.day).order_by(Stat.day).all()
+
     # Tạo dict từ kết quả
     data_dict = {str(d): count for d, count in results}
-    
+
     # Tạo list đầy đủ các ngày (kể cả ngày không có appointment)
     trends = []
     for i in range(days):
@@ -213,63 +163,238 @@ def get_appointment_trends(
                 count=data_dict.get(date_str, 0)
             )
         )
-    
+
     return trends
 
 
+# Loại hoạt động trong feed, kèm truy vấn lấy (id, created_at, người thực hiện, đối tượng, điểm)
+def _activity_branches():
+    Appointment, User, Review = models.Appointment, models.User, models.Review
+    no_int = null().cast(Integer)
+    return [
+        ("appointment", Appointment, select(
+            Appointment.id, Appointment.created_at,
+            Appointment.patient_id.label("actor_id"), Appointment.doctor_id.label("target_id"),
+            no_int.label("rating"),
+        )),
+        ("user_registration", User, select(
+            User.id, User.created_at,
+            User.id.label("actor_id"), no_int.label("target_id"),
+            no_int.label("rating"),
+        )),
+        ("review", Review, select(
+            Review.id, Review.created_at,
+            Appointment.patient_id.label("actor_id"), models.DoctorProfile.user_id.label("target_id"),
+            Review.rating.label("rating"),
+        ).outerjoin(
+            Appointment, Appointment.id == Review.appointment_id
+        ).outerjoin(
+            models.DoctorProfile, models.DoctorProfile.id == Review.doctor_profile_id
+        )),
+    ]
+
+
+# Khoá keyset của feed: (created_at, type, id) giảm dần
+_FEED_KEY_COLUMNS = [column("created_at", DateTime), column("type", String), column("id", Integer)]
+
+
+def _describe(kind: str, actor: str, target: str, role, rating) -> str:
+    if kind == "appointment":
+        return f"{actor} đặt lịch với {target}"
+    if kind == "user_registration":
+        return f"{actor} đăng ký tài khoản {role.value if role else ''}".rstrip()
+    return f"{actor} đánh giá {target} {rating}★"
+
+
+def _recent_activities(
+        db: Session, limit: int, cursor: Optional[str] = None, response: Optional[Response] = None,
+) -> List[schemas.RecentActivity]:
+    """
+    Feed hoạt động (lịch hẹn mới, đăng ký, đánh giá) trong một truy vấn:
+    mỗi nhánh lấy tối đa limit+1 dòng mới nhất theo index (created_at, id),
+    UNION ALL, rồi join users một lần để lấy tên.
+    """
+    values = decode_cursor(cursor, _FEED_KEY_COLUMNS) if cursor else None
+    branches = []
+    for kind, model, stmt in _activity_branches():
+        kind_col = literal(kind, String)
+        if values is not None:
+            stmt = stmt.where(tuple_(model.created_at, kind_col, model.id) < tuple_(*values))
+        stmt = stmt.add_columns(kind_col.label("type"))
+        branches.append(stmt.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1))
+    feed = union_all(*branches).subquery("feed")
+
+    actor = aliased(models.User)
+    target = aliased(models.User)
+    rows = db.execute(
+        select(
+            feed.c.type, feed.c.id, feed.c.created_at, feed.c.rating,
+            actor.full_name, actor.role, target.full_name,
+        ).outerjoin(
+            actor, actor.id == feed.c.actor_id
+        ).outerjoin(
+            target, target.id == feed.c.target_id
+        ).order_by(
+            feed.c.created_at.desc(), feed.c.type.desc(), feed.c.id.desc()
+        ).limit(limit + 1)
+    ).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if response is not None:
+            last = rows[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor([last.created_at, last.type, last.id])
+
+    return [
+        schemas.RecentActivity(
+            id=row.id,
+            type=row.type,
+            description=_describe(row.type, row[4] or "Unknown", row[6] or "Unknown", row.role, row.rating),
+            created_at=row.created_at,
+        ) for row in rows
+    ]
+
+
+@router.get("/stats", response_model=schemas.DashboardStats)
+def get_dashboard_stats(
+    db: Session = Depends(get_db),
+    _: dict = Depends(require_role(Role.admin))
+):
+    """
+    Lấy thống kê tổng quan cho dashboard
+    """
+    return _overview(db)
+
+
+@router.get("/appointments-by-status", response_model=List[schemas.AppointmentStatusCount])
+def get_appointments_by_status(
+    db: Session = Depends(get_db),
+    _: dict = Depends(require_role(Role.admin))
+):
+    """
+    Thống kê số lượng appointments theo trạng thái
+    """
+    return _appointments_by_status(db)
+
+
+@router.get("/users-by-role", response_model=List[schemas.UserRoleCount])
+def get_users_by_role(
+    db: Session = Depends(get_db),
+    _: dict = Depends(require_role(Role.admin))
+):
+    """
+    Thống kê số lượng users theo role
+    """
+    return _users_by_role(db)
+
+
+@router.get("/specialties", response_model=List[schemas.SpecialtyStats])
+def get_specialty_stats(
+    db: Session = Depends(get_db),
+    _: dict = Depends(require_role(Role.admin))
+):
+    """
+    Thống kê theo chuyên khoa: số bác sĩ và số appointments
+    """
+    return _specialty_stats(db)
+
+
+@router.get("/top-doctors", response_model=List[schemas.TopDoctor])
+def get_top_doctors(
+    limit: int = 5,
+    db: Session = Depends(get_db),
+    _: dict = Depends(require_role(Role.admin))
+):
+    """
+    Lấy top bác sĩ có nhiều appointments nhất
+    """
+    return _top_doctors(db, limit)
+
+
+@router.get("/appointment-trends", response_model=List[schemas.AppointmentTrend])
+def get_appointment_trends(
+    days: int = 7,
+    db: Session = Depends(get_db),
+    _: dict = Depends(require_role(Role.admin))
+):
+    """
+    Xu hướng đặt lịch theo ngày (mặc định 7 ngày gần nhất)
+    """
+    return _appointment_trends(db, days)
+
+
+@router.get("/timeseries", response_model=List[schemas.TimeSeriesPoint])
+def get_appointment_timeseries(
+    params: timeseries.TimeSeriesParams = Depends(timeseries.timeseries_params),
+    doctor_id: Optional[int] = Query(None, description="Chỉ tính lịch hẹn của bác sĩ này (users.id)"),
+    db: Session = Depends(get_db),
+    _: dict = Depends(require_role(Role.admin))
+):
+    """
+    Số lịch hẹn theo giờ / ngày / tuần / tháng trong [from, to), chia khoảng theo múi giờ `tz`
+    """
+    return timeseries.appointment_counts(db, params, doctor_id)
+
+
 @router.get("/recent-activities", response_model=List[schemas.RecentActivity])
 def get_recent_activities(
-    limit: int = 10,
+    response: Response,
+    limit: int = Query(10, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(None, description="Giá trị header X-Next-Cursor của trang trước"),
     db: Session = Depends(get_db),
     _: dict = Depends(require_role(Role.admin))
 ):
     """
     Lấy các hoạt động gần đây (appointments mới, users mới đăng ký, reviews mới)
     """
-    activities = []
-    
-    # Lấy appointments mới nhất
-    recent_appointments = db.query(models.Appointment).order_by(
-        desc(models.Appointment.id)
-    ).limit(limit // 2).all()
-    
-    for appt in recent_appointments:
-        patient = db.query(models.User).filter(models.User.id == appt.patient_id).first()
-        doctor = db.query(models.User).filter(models.User.id == appt.doctor_id).first()
-        
-        activities.append(
-            schemas.RecentActivity(
-                id=appt.id,
-                type="appointment",
-                description=f"{patient.full_name if patient else 'Unknown'} đặt lịch với {doctor.full_name if doctor else 'Unknown'}",
-                created_at=appt.start_at
-            )
-        )
-    
-    # Lấy users mới đăng ký (giả sử có created_at field, nếu không thì bỏ qua)
-    # Vì model User không có created_at, ta sẽ skip phần này hoặc dùng id
-    
-    # Sắp xếp theo thời gian
-    activities.sort(key=lambda x: x.created_at, reverse=True)
-    
-    return activities[:limit]
+    return _recent_activities(db, limit, cursor, response)
+
+
+# Giới hạn chung cho mọi request dashboard của worker: vài admin mở dashboard cùng lúc
+# cũng chỉ dùng tối đa DASHBOARD_MAX_CONNECTIONS connection, phần còn lại cho API khác
+_widget_slots: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+
+async def _widget(fn, *args):
+    # Semaphore gắn với event loop (script / TestClient có thể tạo nhiều loop)
+    loop = asyncio.get_running_loop()
+    slots = _widget_slots.get(loop)
+    if slots is None:
+        _widget_slots.clear()
+        slots = _widget_slots[loop] = asyncio.Semaphore(max(settings.DASHBOARD_MAX_CONNECTIONS, 1))
+    async with slots:
+        return await run_in_new_session(fn, *args)
+
+
+async def dashboard_data() -> schemas.DashboardData:
+    # Các truy vấn độc lập chạy song song (tối đa DASHBOARD_MAX_CONNECTIONS connection)
+    (
+        overview, by_status, by_role, specialties, top_doctors, activities, trends
+    ) = await asyncio.gather(
+        _widget(_overview),
+        _widget(_appointments_by_status),
+        _widget(_users_by_role),
+        _widget(_specialty_stats),
+        _widget(_top_doctors, 5),
+        _widget(_recent_activities, 10),
+        _widget(_appointment_trends, 7),
+    )
+    return schemas.DashboardData(
+        overview=overview,
+        appointments_by_status=by_status,
+        users_by_role=by_role,
+        specialties=specialties,
+        top_doctors=top_doctors,
+        recent_activities=activities,
+        appointment_trends=trends
+    )
 
 
 @router.get("", response_model=schemas.DashboardData)
-def get_dashboard_data(
-    db: Session = Depends(get_db),
+async def get_dashboard_data(
     _: dict = Depends(require_role(Role.admin))
 ):
     """
     API tổng hợp - lấy tất cả dữ liệu dashboard trong một request
     """
-    return schemas.DashboardData(
-        overview=get_dashboard_stats(db, _),
-        appointments_by_status=get_appointments_by_status(db, _),
-        users_by_role=get_users_by_role(db, _),
-        specialties=get_specialty_stats(db, _),
-        top_doctors=get_top_doctors(5, db, _),
-        recent_activities=get_recent_activities(10, db, _),
-        appointment_trends=get_appointment_trends(7, db, _)
-    )
-
+    return await dashboard_data()
@@ -1,40 +1,114 @@
+from datetime import datetime
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import exists
 from sqlalchemy.orm import Session
-from app.deps import get_db
-from app import models, schemas
+from app.deps import get_async_db, run_db
+from app import models, schemas, search, slots
+from app.pagination import NEXT_CURSOR_HEADER, PageParams, decode_cursor, encode_cursor, page_params, paginate
+from app.response_cache import doctor_cache
+from app.doctor_catalog import doctor_catalog
 
 router = APIRouter(prefix="/doctors", tags=["doctors"])
 
+_doctor_cards = TypeAdapter(List[schemas.DoctorCard])
+
+
+def _effective_sort(q_tokens: list, sort: Optional[str]) -> str:
+    # Giống _search_doctors: chỉ xếp theo độ liên quan khi có từ khoá tìm kiếm
+    return "relevance" if q_tokens and sort in (None, "relevance") else "rating_desc"
+
 
 @router.get("", response_model=List[schemas.DoctorCard])
-def search_doctors(
+async def search_doctors(
+        request: Request,
         q: Optional[str] = None,
         specialty: Optional[str] = None,
         gender: Optional[models.Gender] = None,
-        sort: str = "rating_desc",
-        db: Session = Depends(get_db),
+        sort: Optional[str] = None,
+        page: PageParams = Depends(page_params),
+        db=Depends(get_async_db),
 ):
+    """
+    Tìm bác sĩ theo họ tên / chuyên khoa / tiểu sử (không phân biệt dấu, khớp tiền tố).
+    - sort: "relevance" (mặc định khi có q) | "rating_desc" (mặc định khi không có q)
+    Kết quả được cache theo tham số đã chuẩn hoá, hỗ trợ ETag / If-None-Match.
+    """
+    q_tokens = search.query_tokens(q)
+    key = (
+        "list", tuple(q_tokens), tuple(search.query_tokens(specialty)), gender,
+        _effective_sort(q_tokens, sort), page.limit, page.cursor,
+    )
+
+    async def compute():
+        if not q_tokens and doctor_catalog.enabled:
+            return await _catalog_page(db, specialty, gender, page)
+        captured = Response()
+        items = await run_db(db, _search_doctors, q, specialty, gender, sort, page, captured)
+        headers = {}
+        if NEXT_CURSOR_HEADER in captured.headers:
+            headers[NEXT_CURSOR_HEADER] = captured.headers[NEXT_CURSOR_HEADER]
+        return _doctor_cards.dump_json(items), headers
+
+    return await doctor_cache.respond(request, key, compute)
+
+
+async def _catalog_page(db, specialty: Optional[str], gender: Optional[models.Gender], page: PageParams):
+    # Không có từ khoá: lọc / sắp theo rating trong bộ nhớ, cursor giống _search_doctors
+    cursor = None
+    if page.cursor:
+        cursor = tuple(decode_cursor(page.cursor, [models.DoctorProfile.avg_rating, models.DoctorProfile.id]))
+    if not doctor_catalog.is_fresh():
+        await run_db(db, doctor_catalog.ensure_loaded)
+    body, next_key = doctor_catalog.page_by_rating(page.limit, cursor, gender, specialty)
+    headers = {NEXT_CURSOR_HEADER: encode_cursor(next_key)} if next_key is not None else {}
+    return body, headers
+
+
+def _search_doctors(
+        db: Session,
+        q: Optional[str],
+        specialty: Optional[str],
+        gender: Optional[models.Gender],
+        sort: Optional[str],
+        page: PageParams,
+        response: Response,
+) -> List[schemas.DoctorCard]:
     qry = (
         db.query(models.User, models.DoctorProfile)
         .join(models.DoctorProfile, models.DoctorProfile.user_id == models.User.id)
         .filter(models.User.role == models.Role.doctor)
     )
+    vector = models.DoctorProfile.search_vector
 
     if specialty:
-        qry = qry.filter(models.DoctorProfile.specialty.ilike(f"%{specialty}%"))
+        spec_query = search.to_tsquery(specialty, weights=search.WEIGHT_SPECIALTY)
+        if spec_query is not None:
+            qry = qry.filter(search.matches(vector, spec_query))
     if gender:
         qry = qry.filter(models.User.gender == gender)
-    if q:
-        qry = qry.filter(
-            models.User.full_name.ilike(f"%{q}%")
-            | models.DoctorProfile.bio.ilike(f"%{q}%")
-        )
-    if sort == "rating_desc":
-        qry = qry.order_by(models.DoctorProfile.avg_rating.desc())
+
+    text_query = search.to_tsquery(q) if q else None
+    if text_query is not None:
+        qry = qry.filter(search.matches(vector, text_query))
+
+    if sort is None:
+        sort = "relevance" if text_query is not None else "rating_desc"
+    # Khoá keyset: (điểm liên quan?, avg_rating, profile id) giảm dần
+    keys = [models.DoctorProfile.avg_rating, models.DoctorProfile.id]
+    if sort == "relevance" and text_query is not None:
+        relevance = search.rank(vector, text_query)
+        qry = qry.add_columns(relevance)
+        keys.insert(0, relevance)
+        key = lambda row: (row[2], row[1].avg_rating, row[1].id)
+    else:
+        key = lambda row: (row[1].avg_rating, row[1].id)
+
+    rows = paginate(qry, page, keys, key, response)
 
     items = []
-    for u, p in qry.all():
+    for u, p, *_ in rows:
         items.append(
             schemas.DoctorCard(
                 id=u.id,
@@ -48,8 +122,119 @@ def search_doctors(
     return items
 
 
+# Khai báo trước /{doctor_user_id} để "available", "slots" không bị hiểu là id
+@router.get("/available", response_model=List[schemas.DoctorCard])
+async def available_doctors(
+        response: Response,
+        start: datetime = Query(..., alias="from", description="Bắt đầu khung giờ cần khám (ISO 8601)"),
+        end: datetime = Query(..., alias="to", description="Kết thúc khung giờ, cùng ngày với `from`"),
+        specialty: Optional[str] = None,
+        gender: Optional[models.Gender] = None,
+        page: PageParams = Depends(page_params),
+        db=Depends(get_async_db),
+):
+    """
+    Bác sĩ rảnh trong cả khung [from, to): có một dòng lịch làm việc đúng thứ trong
+    tuần bao trọn khung giờ và không có lịch hẹn chưa huỷ chồng lên. Xếp theo đánh giá.
+    """
+    start, end = slots.naive_utc(start), slots.naive_utc(end)
+    if end <= start or end.date() != start.date():
+        raise HTTPException(status_code=400, detail="`to` must be after `from` on the same day")
+    return await run_db(db, _available_doctors, start, end, specialty, gender, page, response)
+
+
+def _available_doctors(
+        db: Session,
+        start: datetime,
+        end: datetime,
+        specialty: Optional[str],
+        gender: Optional[models.Gender],
+        page: PageParams,
+        response: Response,
+) -> List[schemas.DoctorCard]:
+    qry = (
+        db.query(models.User, models.DoctorProfile)
+        .join(models.DoctorProfile, models.DoctorProfile.user_id == models.User.id)
+        .filter(models.User.role == models.Role.doctor)
+    )
+    if specialty:
+        spec_query = search.to_tsquery(specialty, weights=search.WEIGHT_SPECIALTY)
+        if spec_query is not None:
+            qry = qry.filter(search.matches(models.DoctorProfile.search_vector, spec_query))
+    if gender:
+        qry = qry.filter(models.User.gender == gender)
+
+    works = exists().where(
+        models.Availability.doctor_id == models.DoctorProfile.id,
+        models.Availability.weekday == start.weekday(),
+        models.Availability.start_time <= start.time(),
+        models.Availability.end_time >= end.time(),
+    )
+    qry = qry.filter(works, ~slots.booked_overlap(models.User.id, start, end))
+
+    rows = paginate(
+        qry, page,
+        [models.DoctorProfile.avg_rating, models.DoctorProfile.id],
+        lambda row: (row[1].avg_rating, row[1].id),
+        response,
+    )
+    return [
+        schemas.DoctorCard(
+            id=u.id,
+            full_name=u.full_name,
+            specialty=p.specialty,
+            years_exp=p.years_exp,
+            avg_rating=p.avg_rating,
+            gender=u.gender,
+        )
+        for u, p in rows
+    ]
+
+
+@router.get("/slots", response_model=List[schemas.DoctorSlots])
+async def batch_slots(
+        ids: List[int] = Query(..., max_length=slots.MAX_BATCH, description="User id của các bác sĩ"),
+        params: slots.SlotParams = Depends(slots.slot_params),
+        db=Depends(get_async_db),
+):
+    """Khung giờ trống của nhiều bác sĩ trong một lần gọi (id không phải bác sĩ bị bỏ qua)."""
+    return await run_db(db, _slots, list(dict.fromkeys(ids)), params)
+
+
+@router.get("/{doctor_user_id}/slots", response_model=List[schemas.SlotOut])
+async def doctor_slots(
+        doctor_user_id: int,
+        params: slots.SlotParams = Depends(slots.slot_params),
+        db=Depends(get_async_db),
+):
+    """Khung giờ trống dài `duration` phút trong [from, to) theo lịch làm việc và lịch hẹn."""
+    result = await run_db(db, _slots, [doctor_user_id], params)
+    if not result:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    return result[0].slots
+
+
+def _slots(db: Session, doctor_ids: List[int], params: slots.SlotParams) -> List[schemas.DoctorSlots]:
+    free = slots.doctor_slots(db, doctor_ids, params.start, params.end, params.duration)
+    return [
+        schemas.DoctorSlots(
+            doctor_user_id=i,
+            slots=[schemas.SlotOut(start_at=s, end_at=e) for s, e in free[i]],
+        )
+        for i in doctor_ids if i in free
+    ]
+
+
 @router.get("/{doctor_user_id}", response_model=schemas.DoctorDetail)
-def doctor_detail(doctor_user_id: int, db: Session = Depends(get_db)):
+async def doctor_detail(request: Request, doctor_user_id: int, db=Depends(get_async_db)):
+    async def compute():
+        detail = await run_db(db, _doctor_detail, doctor_user_id)
+        return detail.model_dump_json().encode(), {}
+
+    return await doctor_cache.respond(request, ("detail", doctor_user_id), compute)
+
+
+def _doctor_detail(db: Session, doctor_user_id: int) -> schemas.DoctorDetail:
     u = (
         db.query(models.User)
         .filter_by(id=doctor_user_id, role=models.Role.doctor)
@@ -60,17 +245,20 @@ def doctor_detail(doctor_user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Doctor not found")
 
     p = u.doctor_profile
+    # Khung thiếu giờ bắt đầu / kết thúc (NULL) không dùng được để đặt lịch: bỏ qua
+    # như slot engine và kiểm tra giờ làm việc khi đặt lịch
     avs = [
         schemas.AvailabilityOut(
             weekday=a.weekday,
-            start_time=a.start_time,
-            end_time=a.end_time,
+            start_time=a.start_time.strftime("%H:%M"),
+            end_time=a.end_time.strftime("%H:%M"),
         )
         for a in p.availabilities
+        if a.start_time is not None and a.end_time is not None
     ]
 
     return schemas.DoctorDetail(
-        user=u,
+        user=schemas.UserOut.model_validate(u),
         profile_specialty=p.specialty,
         years_exp=p.years_exp,
         bio=p.bio,
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from app.deps import get_db, require_role, get_current_user
-from app import models, schemas
+from app import models, ratings, schemas
+from app.response_cache import invalidate_doctors
+from app.doctor_catalog import doctor_catalog
 
 
 router = APIRouter(prefix="/reviews", tags=["reviews"])
@@ -39,18 +41,17 @@ def create_review(
         comment=payload.comment,
     )
     db.add(rv)
+    try:
+        db.flush()
+    except IntegrityError:
+        # reviews.appointment_id là unique: mỗi cuộc hẹn chỉ được đánh giá một lần
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Appointment already reviewed")
+
+    # 🔁 Cập nhật điểm trung bình cho bác sĩ (cùng transaction với review)
+    new_avg = ratings.add_rating(db, doc_profile_id, payload.rating)
     db.commit()
+    doctor_catalog.refresh_doctor(db, ap.doctor_id)
+    invalidate_doctors()
 
-    # 🔁 Cập nhật điểm trung bình cho bác sĩ
-    avg = (
-            db.query(func.avg(models.Review.rating))
-            .filter_by(doctor_profile_id=doc_profile_id)
-            .scalar()
-            or 0
-    )
-
-    dp = db.query(models.DoctorProfile).get(doc_profile_id)
-    dp.avg_rating = float(avg)
-    db.commit()
-
-    return {"ok": True, "new_avg_rating": dp.avg_rating}
+    return {"ok": True, "new_avg_rating": new_avg}
@@ -3,7 +3,7 @@ from typing import Optional, List
 from datetime import datetime
 import re
 
-from pydantic import BaseModel, EmailStr, Field, ConfigDict, field_validator
+from pydantic import AliasChoices, BaseModel, EmailStr, Field, ConfigDict, field_validator
 
 from app.models import Gender, Role, AppointmentStatus
 
@@ -82,11 +82,21 @@ class DoctorCard(BaseModel):
 
 
 class AvailabilityOut(BaseModel):
-    weekday: int  # 0..6 (tùy bạn quy ước)
+    weekday: int  # 0..6, 0 = thứ Hai
     start_time: str  # "08:00"
     end_time: str    # "17:00"
 
 
+class SlotOut(BaseModel):
+    start_at: datetime
+    end_at: datetime
+
+
+class DoctorSlots(BaseModel):
+    doctor_user_id: int
+    slots: List[SlotOut]
+
+
 class DoctorDetail(BaseModel):
     user: UserOut
     profile_specialty: str
@@ -115,7 +125,8 @@ class AppointmentOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
     id: int
-    doctor_user_id: int
+    # ORM Appointment lưu cột là doctor_id
+    doctor_user_id: int = Field(validation_alias=AliasChoices("doctor_user_id", "doctor_id"))
     patient_id: int
     start_at: datetime
     end_at: datetime
@@ -187,6 +198,15 @@ class AppointmentTrend(BaseModel):
     count: int
 
 
+class TimeSeriesPoint(BaseModel):
+    """Số lịch hẹn trong một khoảng của chuỗi thời gian"""
+    bucket: datetime  # đầu khoảng, theo múi giờ `tz` của request
+    count: int
+    booked: int
+    done: int
+    canceled: int
+
+
 class DashboardData(BaseModel):
     """Tổng hợp tất cả dữ liệu dashboard"""
     overview: DashboardStats
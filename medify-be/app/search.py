@@ -0,0 +1,107 @@
+# app/search.py
+"""
+Tìm kiếm bác sĩ bằng full-text search của Postgres.
+
+- Văn bản (họ tên, chuyên khoa, tiểu sử) được chuẩn hoá ở Python: chữ thường,
+  bỏ dấu tiếng Việt (kể cả "đ" -> "d"), tách token [a-z0-9].
+- Kết quả lưu vào cột `doctor_profiles.search_vector` (tsvector, config 'simple')
+  với trọng số A = họ tên, B = chuyên khoa, C = tiểu sử; cột có GIN index nên
+  truy vấn `@@` không phải quét toàn bảng.
+- Truy vấn dùng prefix (`token:*`) cho mọi token để hỗ trợ gõ tới đâu tìm tới đó.
+"""
+import re
+import unicodedata
+from typing import List, Optional, Tuple
+
+from sqlalchemy import cast, func, literal, literal_column
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
+from sqlalchemy.sql.elements import ColumnElement
+
+SEARCH_CONFIG = "simple"
+
+WEIGHT_NAME = "A"
+WEIGHT_SPECIALTY = "B"
+WEIGHT_BIO = "C"
+
+# Giới hạn số token của một truy vấn để tránh tsquery quá dài
+MAX_QUERY_TOKENS = 8
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold(text: Optional[str]) -> str:
+    """Chữ thường + bỏ dấu: "Nguyễn Văn Đức" -> "nguyen van duc"."""
+    if not text:
+        return ""
+    text = text.lower().replace("đ", "d")
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(fold(text))
+
+
+def search_document(
+        full_name: Optional[str], specialty: Optional[str], bio: Optional[str]
+) -> Tuple[str, str, str]:
+    """Văn bản đã chuẩn hoá cho từng trường (dùng khi nạp dữ liệu hàng loạt)."""
+    return (
+        " ".join(tokenize(full_name)),
+        " ".join(tokenize(specialty)),
+        " ".join(tokenize(bio)),
+    )
+
+
+def vector_from_document(name, specialty, bio) -> ColumnElement:
+    """Ghép tsvector có trọng số từ văn bản đã chuẩn hoá (giá trị hoặc biểu thức SQL)."""
+    return (
+        _weighted(name, WEIGHT_NAME)
+        .op("||")(_weighted(specialty, WEIGHT_SPECIALTY))
+        .op("||")(_weighted(bio, WEIGHT_BIO))
+    )
+
+
+def _weighted(text, weight: str) -> ColumnElement:
+    # Trọng số là hằng số, render trực tiếp: setweight() nhận kiểu "char" và
+    # asyncpg sẽ ép tham số bind thành VARCHAR (không có hàm tương ứng)
+    return func.setweight(func.to_tsvector(SEARCH_CONFIG, text), literal_column(f"'{weight}'"))
+
+
+def doctor_search_vector(
+        full_name: Optional[str], specialty: Optional[str], bio: Optional[str]
+) -> ColumnElement:
+    """
+    Biểu thức SQL để gán vào `DoctorProfile.search_vector` mỗi khi hồ sơ
+    (hoặc họ tên bác sĩ) thay đổi.
+    """
+    return vector_from_document(*search_document(full_name, specialty, bio))
+
+
+def query_tokens(text: Optional[str]) -> List[str]:
+    """Các token thực sự dùng để tìm (đã bỏ dấu, tối đa MAX_QUERY_TOKENS)."""
+    return tokenize(text)[:MAX_QUERY_TOKENS]
+
+
+def to_tsquery(text: Optional[str], weights: str = "") -> Optional[ColumnElement]:
+    """
+    Chuyển chuỗi người dùng gõ thành tsquery prefix, AND giữa các token.
+    - weights: giới hạn trọng số khớp, vd "B" = chỉ khớp chuyên khoa.
+    Trả về None nếu chuỗi không có token nào.
+    """
+    tokens = query_tokens(text)
+    if not tokens:
+        return None
+    # Token chỉ gồm [a-z0-9] nên ghép trực tiếp vào cú pháp tsquery là an toàn
+    expr = " & ".join(f"{t}:*{weights}" for t in tokens)
+    return func.to_tsquery(SEARCH_CONFIG, literal(expr))
+
+
+def matches(vector, query: ColumnElement) -> ColumnElement:
+    return vector.op("@@")(query)
+
+
+def rank(vector, query: ColumnElement) -> ColumnElement:
+    # ts_rank_cd trả về real; ép sang double precision để giá trị trong cursor keyset
+    # (float Python) so sánh đúng bằng với giá trị trong DB khi nhiều dòng trùng điểm
+    return cast(func.ts_rank_cd(vector, query), DOUBLE_PRECISION)
@@ -1,6 +1,7 @@
 # app/security.py
+import secrets
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
 from jose import jwt
 from passlib.context import CryptContext
@@ -8,10 +9,14 @@ from passlib.context import CryptContext
 from app.config import settings
 
 # Dùng bcrypt_sha256 để tránh giới hạn 72 bytes của bcrypt thuần.
-# Giữ "bcrypt" để verify các hash cũ nếu có.
+# Giữ "bcrypt" để verify các hash cũ nếu có (bị coi là deprecated -> hash lại).
+# min_rounds = max_rounds = BCRYPT_ROUNDS: hash có số vòng khác cần hash lại.
 pwd_ctx = CryptContext(
     schemes=["bcrypt_sha256", "bcrypt"],
     deprecated="auto",
+    bcrypt_sha256__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt_sha256__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt_sha256__max_rounds=settings.BCRYPT_ROUNDS,
 )
 
 def hash_password(pw: str) -> str:
@@ -26,14 +31,31 @@ def verify_password(pw: str, hashed: str) -> bool:
     """
     return pwd_ctx.verify(pw, hashed)
 
-def create_access_token(sub: str, role: str, expires_minutes: Optional[int] = None) -> str:
+def verify_and_update(pw: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    Như verify_password, kèm hash mới nếu hash cũ không còn đúng chính sách
+    (scheme cũ hoặc số vòng khác BCRYPT_ROUNDS); None nếu không cần đổi.
+    """
+    return pwd_ctx.verify_and_update(pw, hashed)
+
+def create_access_token(
+    sub: str, role: str, expires_minutes: Optional[int] = None
+) -> str:
     """
     Tạo JWT access token.
     - sub: user id (string)
     - role: vai trò (vd: 'admin' | 'doctor' | 'patient')
     - expires_minutes: thời gian hết hạn (mặc định lấy từ settings)
+    Mỗi token có `jti` ngẫu nhiên (16 ký tự) để logout chỉ cần lưu jti; `iat` được so
+    với thời điểm thu hồi của user (xem token_blocklist.revoke_user).
     """
     minutes = expires_minutes or settings.ACCESS_TOKEN_EXPIRE_MINUTES
-    exp = datetime.utcnow() + timedelta(minutes=minutes)
-    payload = {"sub": sub, "role": role, "exp": exp}
+    now = datetime.utcnow()
+    payload = {
+        "sub": sub,
+        "role": role,
+        "jti": secrets.token_urlsafe(12),
+        "iat": now,
+        "exp": now + timedelta(minutes=minutes),
+    }
     return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALG)
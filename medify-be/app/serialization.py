@@ -0,0 +1,115 @@
+# app/serialization.py
+"""
+Serialize nhanh cho các endpoint danh sách trả về dòng ORM (bật bằng FAST_JSON=true).
+
+Mặc định FastAPI validate lại từng dòng qua response_model (from_attributes) rồi mới
+dump JSON. Dữ liệu đọc từ DB đã đúng kiểu nên ở đây "tin" nó: đọc thẳng thuộc tính
+theo khai báo field của schema (kể cả validation_alias, model lồng nhau) thành dict,
+encode một lần bằng orjson và trả về Response, FastAPI bỏ qua bước response_model.
+OpenAPI vẫn sinh từ response_model như cũ.
+
+Không đặt ORJSONResponse làm default_response_class của app: với FastAPI hiện tại,
+response class tuỳ chỉnh làm mất đường dump_json (Pydantic core) của mọi endpoint khác.
+"""
+import typing
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Tuple, Type
+
+from fastapi import Response
+from pydantic import AliasChoices, BaseModel
+
+JSON_MEDIA_TYPE = "application/json"
+
+_MISSING = object()
+
+
+def _orjson():
+    try:
+        import orjson
+    except ImportError:
+        raise RuntimeError("FAST_JSON=true cần cài gói `orjson`")
+    return orjson
+
+
+@dataclass(frozen=True)
+class _Field:
+    name: str
+    attrs: Tuple[str, ...]  # tên thuộc tính thử lần lượt (giống AliasChoices)
+    default: Any
+    nested: Optional[Type[BaseModel]] = None
+    many: bool = False
+
+
+def _nested_model(annotation) -> Tuple[Optional[Type[BaseModel]], bool]:
+    """Optional[Model] -> (Model, False); List[Model] -> (Model, True)."""
+    origin = typing.get_origin(annotation)
+    if origin in (list, List):
+        model, _ = _nested_model(typing.get_args(annotation)[0])
+        return model, model is not None
+    if origin is not None:
+        for arg in typing.get_args(annotation):
+            model, many = _nested_model(arg)
+            if model is not None:
+                return model, many
+        return None, False
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None, False
+
+
+@lru_cache(maxsize=None)
+def _plan(schema: Type[BaseModel]) -> Tuple[_Field, ...]:
+    fields = []
+    for name, info in schema.model_fields.items():
+        alias = info.validation_alias
+        if isinstance(alias, AliasChoices):
+            attrs = tuple(c for c in alias.choices if isinstance(c, str))
+        elif isinstance(alias, str):
+            attrs = (alias,)
+        else:
+            attrs = (name,)
+        nested, many = _nested_model(info.annotation)
+        default = None if info.is_required() else info.get_default(call_default_factory=True)
+        fields.append(_Field(name, attrs, default, nested, many))
+    return tuple(fields)
+
+
+def trusted_dump(schema: Type[BaseModel], obj: Any) -> Optional[dict]:
+    """Như schema.model_validate(obj).model_dump() nhưng không kiểm tra kiểu."""
+    if obj is None:
+        return None
+    out = {}
+    for f in _plan(schema):
+        value = _MISSING
+        for attr in f.attrs:
+            value = getattr(obj, attr, _MISSING)
+            if value is not _MISSING:
+                break
+        if value is _MISSING:
+            value = f.default
+        elif f.nested is not None:
+            if f.many:
+                value = [trusted_dump(f.nested, v) for v in value]
+            else:
+                value = trusted_dump(f.nested, value)
+        out[f.name] = value
+    return out
+
+
+def dumps(content: Any) -> bytes:
+    """Encode dict / list đã đúng dạng output (Enum -> value, datetime -> ISO 8601)."""
+    return _orjson().dumps(content)
+
+
+def dumps_trusted(schema: Type[BaseModel], rows: Iterable[Any]) -> bytes:
+    """Mảng JSON của các dòng ORM theo schema."""
+    return dumps([trusted_dump(schema, r) for r in rows])
+
+
+def json_response(body: bytes, response: Optional[Response] = None) -> Response:
+    """Trả body đã encode; giữ lại header đã đặt trên `response` (vd X-Next-Cursor)."""
+    headers = dict(response.headers) if response is not None else None
+    if headers:
+        headers.pop("content-length", None)
+    return Response(content=body, media_type=JSON_MEDIA_TYPE, headers=headers)
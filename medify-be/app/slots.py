@@ -0,0 +1,211 @@
+# app/slots.py
+"""
+Tính khung giờ trống của bác sĩ (GET /doctors/{id}/slots, GET /doctors/slots).
+
+- Lịch làm việc (availabilities) được parse một lần thành các khoảng phút trong
+  ngày [start, end) theo weekday (0 = thứ Hai, như datetime.weekday()), gộp các
+  khoảng chồng nhau, cache theo bác sĩ trong AVAILABILITY_CACHE_SECONDS.
+- Lịch hẹn chưa huỷ trong khoảng [from, to) của một hoặc nhiều bác sĩ được lấy bằng
+  một truy vấn (tra index GiST của appointments_no_overlap cho từng bác sĩ).
+- Mỗi ngày: khoảng làm việc trừ đi các lịch hẹn đã sắp xếp (quét một lượt), phần
+  còn lại được chia thành các khung `duration` phút tính từ đầu khoảng trống.
+
+Mọi thời điểm là datetime không kèm múi giờ như cột appointments.start_at;
+giá trị có múi giờ được đổi sang UTC.
+"""
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query
+from sqlalchemy import and_, exists, func, literal_column, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.cache import TTLCache
+from app.config import settings
+from app.models import Appointment
+
+# Khoảng thời gian tối đa của một lần truy vấn / số bác sĩ tối đa của truy vấn batch
+MAX_RANGE = timedelta(days=62)
+MAX_BATCH = 100
+
+Interval = Tuple[int, int]
+# Khoảng làm việc (phút trong ngày) theo weekday 0..6
+WeeklyHours = Tuple[Tuple[Interval, ...], ...]
+
+_hours_cache = TTLCache(maxsize=settings.DOCTOR_CACHE_SIZE, ttl=settings.AVAILABILITY_CACHE_SECONDS)
+
+_HOURS_SQL = text(
+    "SELECT p.user_id, a.weekday, a.start_time, a.end_time "
+    "FROM doctor_profiles p JOIN users u ON u.id = p.user_id "
+    "LEFT JOIN availabilities a ON a.doctor_id = p.id "
+    "WHERE u.role = 'doctor' AND p.user_id = ANY(CAST(:ids AS integer[]))"
+)
+
+# LATERAL theo từng bác sĩ để mỗi nhánh dùng được index GiST của constraint
+_BOOKED_SQL = text(
+    "SELECT d.id, a.start_at, a.end_at "
+    "FROM unnest(CAST(:ids AS integer[])) AS d(id) "
+    "CROSS JOIN LATERAL ("
+    "  SELECT start_at, end_at FROM appointments "
+    "  WHERE int4range(doctor_id, doctor_id, '[]') = int4range(d.id, d.id, '[]') "
+    "    AND tsrange(start_at, end_at) && tsrange(CAST(:start AS timestamp), CAST(:end AS timestamp)) "
+    "    AND doctor_id IS NOT NULL AND status <> 'canceled' AND end_at > start_at"
+    ") a "
+    "ORDER BY d.id, a.start_at"
+)
+
+
+@dataclass
+class SlotParams:
+    start: datetime
+    end: datetime
+    duration: int
+
+
+def slot_params(
+        start: datetime = Query(..., alias="from", description="Từ thời điểm (ISO 8601)"),
+        end: datetime = Query(..., alias="to", description="Đến thời điểm, tối đa 62 ngày sau `from`"),
+        duration: int = Query(30, ge=5, le=480, description="Độ dài mỗi khung (phút)"),
+) -> SlotParams:
+    start, end = naive_utc(start), naive_utc(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="`to` must be after `from`")
+    if end - start > MAX_RANGE:
+        raise HTTPException(status_code=400, detail=f"Range must not exceed {MAX_RANGE.days} days")
+    return SlotParams(start=start, end=end, duration=duration)
+
+
+def booked_overlap(doctor_id, start: datetime, end: datetime) -> ColumnElement:
+    """
+    EXISTS lịch hẹn chưa huỷ của bác sĩ `doctor_id` chồng lên [start, end).
+    Biểu thức và điều kiện giống hệt appointments_no_overlap (hằng số render trực
+    tiếp, không bind) để planner dùng được index GiST của constraint.
+    """
+    closed = literal_column("'[]'")
+    return exists().where(and_(
+        Appointment.doctor_id.isnot(None),
+        func.int4range(Appointment.doctor_id, Appointment.doctor_id, closed)
+        == func.int4range(doctor_id, doctor_id, closed),
+        func.tsrange(Appointment.start_at, Appointment.end_at).op("&&")(func.tsrange(start, end)),
+        Appointment.status != literal_column("'canceled'"),
+        Appointment.end_at > Appointment.start_at,
+    ))
+
+
+def naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def _merge(intervals: Iterable[Interval]) -> Tuple[Interval, ...]:
+    out: List[List[int]] = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if out and start <= out[-1][1]:
+            out[-1][1] = max(out[-1][1], end)
+        else:
+            out.append([start, end])
+    return tuple((s, e) for s, e in out)
+
+
+def _load_hours(db: Session, doctor_ids: Sequence[int]) -> Dict[int, WeeklyHours]:
+    """Lịch làm việc đã parse của các bác sĩ (bỏ qua id không phải bác sĩ)."""
+    result: Dict[int, WeeklyHours] = {}
+    missing = []
+    for doctor_id in doctor_ids:
+        hours = _hours_cache.get(doctor_id)
+        if hours is None:
+            missing.append(doctor_id)
+        else:
+            result[doctor_id] = hours
+
+    if missing:
+        raw: Dict[int, List[List[Interval]]] = {}
+        for user_id, weekday, start, end in db.execute(_HOURS_SQL, {"ids": missing}):
+            days = raw.setdefault(user_id, [[] for _ in range(7)])
+            if weekday is not None and start is not None and end is not None and 0 <= weekday <= 6:
+                days[weekday].append((_minutes(start), _minutes(end)))
+        for user_id, days in raw.items():
+            hours = tuple(_merge(d) for d in days)
+            _hours_cache.set(user_id, hours)
+            result[user_id] = hours
+    return result
+
+
+def _load_booked(
+        db: Session, doctor_ids: Sequence[int], start: datetime, end: datetime
+) -> Dict[int, List[Tuple[datetime, datetime]]]:
+    booked: Dict[int, List[Tuple[datetime, datetime]]] = {i: [] for i in doctor_ids}
+    rows = db.execute(_BOOKED_SQL, {"ids": list(doctor_ids), "start": start, "end": end})
+    for doctor_id, start_at, end_at in rows:
+        booked[doctor_id].append((start_at, end_at))
+    return booked
+
+
+def free_slots(
+        hours: WeeklyHours,
+        booked: Sequence[Tuple[datetime, datetime]],
+        start: datetime,
+        end: datetime,
+        duration: int,
+) -> List[Tuple[datetime, datetime]]:
+    """
+    Các khung `duration` phút trống nằm trọn trong [start, end).
+    booked phải được sắp theo thời điểm bắt đầu (lịch hẹn chưa huỷ không chồng nhau).
+    """
+    origin = datetime.combine(start.date(), time())
+
+    def floor_min(dt: datetime) -> int:
+        return int((dt - origin).total_seconds() // 60)
+
+    def ceil_min(dt: datetime) -> int:
+        return -int((origin - dt).total_seconds() // 60)
+
+    lo, hi = ceil_min(start), floor_min(end)
+    busy = [(floor_min(s), ceil_min(e)) for s, e in booked]
+    slots: List[Interval] = []
+    b = 0
+    for day in range(-(-hi // 1440)):
+        base = day * 1440
+        for w_start, w_end in hours[(start.weekday() + day) % 7]:
+            cur, stop = max(base + w_start, lo), min(base + w_end, hi)
+            # Lịch hẹn kết thúc trước khoảng đang xét không còn ảnh hưởng
+            while b < len(busy) and busy[b][1] <= cur:
+                b += 1
+            i = b
+            while cur + duration <= stop:
+                if i < len(busy) and busy[i][0] < cur + duration:
+                    # Khung chạm lịch hẹn: nhảy tới cuối lịch hẹn đó
+                    cur = max(cur, busy[i][1])
+                    i += 1
+                    continue
+                slots.append((cur, cur + duration))
+                cur += duration
+    return [(origin + timedelta(minutes=s), origin + timedelta(minutes=e)) for s, e in slots]
+
+
+def doctor_slots(
+        db: Session, doctor_ids: Sequence[int], start: datetime, end: datetime, duration: int
+) -> Dict[int, List[Tuple[datetime, datetime]]]:
+    """Khung trống theo bác sĩ; id không phải bác sĩ không có trong kết quả."""
+    hours = _load_hours(db, doctor_ids)
+    if not hours:
+        return {}
+    booked = _load_booked(db, list(hours), start, end)
+    return {i: free_slots(hours[i], booked[i], start, end, duration) for i in hours}
+
+
+def invalidate(doctor_user_id: Optional[int] = None) -> None:
+    """Gọi sau khi sửa lịch làm việc của bác sĩ (None = tất cả)."""
+    if doctor_user_id is None:
+        _hours_cache.clear()
+    else:
+        _hours_cache.pop(doctor_user_id)
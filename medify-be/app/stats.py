@@ -0,0 +1,156 @@
+# app/stats.py
+"""
+Bộ đếm cho dashboard, cập nhật tăng dần cùng transaction với thao tác ghi:
+
+- appointment_daily_stats: số lịch hẹn theo (ngày khám, bác sĩ, trạng thái).
+  Theo trạng thái / chuyên khoa / xu hướng ngày / top bác sĩ đều cộng từ bảng này
+  (số dòng ~ ngày x bác sĩ x trạng thái) thay vì quét bảng appointments.
+- user_stats: số user theo (role, is_active).
+
+Các hàm *_added/_removed/... chỉ thực hiện UPSERT trong session, người gọi commit
+cùng với thay đổi chính. Dữ liệu ghi ngoài API (SQL tay, script cũ) làm lệch bộ đếm:
+chạy scripts/rebuild_stats.py để kiểm tra / dựng lại.
+Lịch hẹn không có start_at không được đếm.
+"""
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models import Appointment, AppointmentDailyStat, AppointmentStatus, Role, User, UserStat
+
+# doctor_id dùng cho lịch hẹn của bác sĩ đã bị xoá (appointments.doctor_id = NULL)
+NO_DOCTOR = 0
+
+
+def _bump(db: Session, model, keys: Dict, delta: int) -> None:
+    stmt = insert(model).values(**keys, count=delta)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={"count": model.count + stmt.excluded.count},
+    )
+    db.execute(stmt)
+
+
+def _bump_appointment(db: Session, start_at, doctor_id: Optional[int], status, delta: int) -> None:
+    if start_at is None:
+        return
+    keys = {
+        "day": start_at.date(),
+        "doctor_id": doctor_id or NO_DOCTOR,
+        "status": status or AppointmentStatus.booked,
+    }
+    _bump(db, AppointmentDailyStat, keys, delta)
+
+
+def appointment_added(db: Session, ap: Appointment) -> None:
+    _bump_appointment(db, ap.start_at, ap.doctor_id, ap.status, 1)
+
+
+def appointment_removed(db: Session, ap: Appointment) -> None:
+    _bump_appointment(db, ap.start_at, ap.doctor_id, ap.status, -1)
+
+
+def appointment_status_changed(db: Session, ap: Appointment, old_status) -> None:
+    if old_status == ap.status:
+        return
+    _bump_appointment(db, ap.start_at, ap.doctor_id, old_status, -1)
+    _bump_appointment(db, ap.start_at, ap.doctor_id, ap.status, 1)
+
+
+def _bump_user(db: Session, role, is_active, delta: int) -> None:
+    _bump(db, UserStat, {"role": role, "is_active": bool(is_active)}, delta)
+
+
+def user_added(db: Session, user: User) -> None:
+    _bump_user(db, user.role, user.is_active, 1)
+
+
+def user_active_changed(db: Session, user: User) -> None:
+    _bump_user(db, user.role, not user.is_active, -1)
+    _bump_user(db, user.role, user.is_active, 1)
+
+
+def user_role_changed(db: Session, user: User, old_role) -> None:
+    """Đổi role (user và lịch hẹn vẫn còn nên bộ đếm lịch hẹn theo bác sĩ giữ nguyên)."""
+    if old_role == user.role:
+        return
+    _bump_user(db, old_role, user.is_active, -1)
+    _bump_user(db, user.role, user.is_active, 1)
+
+
+def user_removed(db: Session, user: User) -> None:
+    """Gọi trước khi xoá user (lịch hẹn của bác sĩ chuyển sang NO_DOCTOR)."""
+    _bump_user(db, user.role, user.is_active, -1)
+    if user.role == Role.doctor:
+        db.execute(
+            text(
+                "INSERT INTO appointment_daily_stats AS s (day, doctor_id, status, count) "
+                "SELECT day, :none, status, count FROM appointment_daily_stats WHERE doctor_id = :doctor_id "
+                "ON CONFLICT (day, doctor_id, status) DO UPDATE SET count = s.count + excluded.count"
+            ),
+            {"none": NO_DOCTOR, "doctor_id": user.id},
+        )
+        db.query(AppointmentDailyStat).filter(AppointmentDailyStat.doctor_id == user.id).delete(
+            synchronize_session=False
+        )
+
+
+# --- Dựng lại / kiểm tra ---
+
+_REBUILD_APPOINTMENTS = (
+    "INSERT INTO appointment_daily_stats (day, doctor_id, status, count) "
+    "SELECT CAST(start_at AS DATE), COALESCE(doctor_id, :none), COALESCE(status, 'booked'), count(*) "
+    "FROM appointments WHERE start_at IS NOT NULL GROUP BY 1, 2, 3"
+)
+_REBUILD_USERS = (
+    "INSERT INTO user_stats (role, is_active, count) "
+    "SELECT role, COALESCE(is_active, false), count(*) FROM users WHERE role IS NOT NULL GROUP BY 1, 2"
+)
+
+
+def rebuild(db: Session) -> None:
+    """Tính lại toàn bộ bộ đếm từ bảng gốc (khoá bảng đếm để chặn ghi song song)."""
+    db.execute(text("LOCK TABLE appointment_daily_stats, user_stats IN EXCLUSIVE MODE"))
+    db.query(AppointmentDailyStat).delete(synchronize_session=False)
+    db.query(UserStat).delete(synchronize_session=False)
+    db.execute(text(_REBUILD_APPOINTMENTS), {"none": NO_DOCTOR})
+    db.execute(text(_REBUILD_USERS))
+
+
+def drift(db: Session) -> List[Dict]:
+    """Các khoá mà bộ đếm khác với số đếm thực tế (rỗng = khớp)."""
+    rows = db.execute(
+        text(
+            "WITH actual AS ("
+            "  SELECT CAST(start_at AS DATE) AS day, COALESCE(doctor_id, :none) AS doctor_id, "
+            "         COALESCE(status, 'booked') AS status, count(*) AS count "
+            "  FROM appointments WHERE start_at IS NOT NULL GROUP BY 1, 2, 3) "
+            "SELECT 'appointments' AS stat, COALESCE(a.day, s.day)::text || '/' || "
+            "       COALESCE(a.doctor_id, s.doctor_id) || '/' || COALESCE(a.status, s.status) AS key, "
+            "       COALESCE(s.count, 0) AS counter, COALESCE(a.count, 0) AS actual "
+            "FROM actual a FULL JOIN appointment_daily_stats s "
+            "  ON s.day = a.day AND s.doctor_id = a.doctor_id AND s.status = a.status "
+            "WHERE COALESCE(s.count, 0) <> COALESCE(a.count, 0) "
+            "UNION ALL "
+            "SELECT 'users', COALESCE(a.role, s.role) || '/' || COALESCE(a.is_active, s.is_active), "
+            "       COALESCE(s.count, 0), COALESCE(a.count, 0) "
+            "FROM (SELECT role, COALESCE(is_active, false) AS is_active, count(*) AS count "
+            "      FROM users WHERE role IS NOT NULL GROUP BY 1, 2) a "
+            "FULL JOIN user_stats s ON s.role = a.role AND s.is_active = a.is_active "
+            "WHERE COALESCE(s.count, 0) <> COALESCE(a.count, 0)"
+        ),
+        {"none": NO_DOCTOR},
+    ).mappings().all()
+    return [dict(r) for r in rows]
+
+
+# --- Đọc cho dashboard ---
+
+def appointment_count():
+    return func.coalesce(func.sum(AppointmentDailyStat.count), 0)
+
+
+def user_count():
+    return func.coalesce(func.sum(UserStat.count), 0)
@@ -0,0 +1,119 @@
+# app/timeseries.py
+"""
+Chuỗi thời gian số lịch hẹn cho dashboard (GET /admin/dashboard/timeseries).
+
+- Lọc theo khoảng nửa mở [from, to) trực tiếp trên cột appointments.start_at (UTC,
+  không kèm múi giờ) nên dùng được index start_at (hoặc (doctor_id, start_at)),
+  không cast cột.
+- Gom nhóm bằng date_trunc trên giờ địa phương của múi giờ `tz`; một truy vấn duy
+  nhất, các khoảng không có lịch hẹn được lấp 0 bằng generate_series.
+- `from`/`to` không kèm múi giờ được hiểu là giờ địa phương của `tz`.
+
+Ngày chuyển giờ mùa hè (DST): chuỗi theo giờ địa phương nên giờ bị bỏ qua có giá
+trị 0, giờ bị lặp được gộp chung một khoảng.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from fastapi import HTTPException, Query
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import schemas
+
+GRANULARITY_PATTERN = "^(hour|day|week|month)$"
+
+# Độ dài ngắn nhất của mỗi loại khoảng (để ước lượng số khoảng trước khi truy vấn)
+_MIN_STEP = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+    "month": timedelta(days=28),
+}
+MAX_BUCKETS = 10_000
+
+_COUNTS_SQL = (
+    "WITH counts AS ("
+    "  SELECT date_trunc(CAST(:unit AS text), timezone(CAST(:tz AS text), timezone('UTC', start_at))) AS bucket, "
+    "         count(*) AS total, "
+    "         count(*) FILTER (WHERE status = 'booked') AS booked, "
+    "         count(*) FILTER (WHERE status = 'done') AS done, "
+    "         count(*) FILTER (WHERE status = 'canceled') AS canceled "
+    "  FROM appointments "
+    "  WHERE start_at >= :start AND start_at < :end{doctor} "
+    "  GROUP BY 1"
+    ") "
+    "SELECT s.bucket, coalesce(c.total, 0), coalesce(c.booked, 0), coalesce(c.done, 0), coalesce(c.canceled, 0) "
+    "FROM generate_series("
+    "  date_trunc(CAST(:unit AS text), CAST(:first AS timestamp)), CAST(:last AS timestamp), CAST(:step AS interval)"
+    ") AS s(bucket) "
+    "LEFT JOIN counts c ON c.bucket = s.bucket "
+    "ORDER BY s.bucket"
+)
+_ALL_SQL = text(_COUNTS_SQL.format(doctor=""))
+_DOCTOR_SQL = text(_COUNTS_SQL.format(doctor=" AND doctor_id = :doctor_id"))
+
+
+@dataclass
+class TimeSeriesParams:
+    start: datetime  # UTC, không kèm múi giờ (như appointments.start_at)
+    end: datetime
+    granularity: str
+    zone: ZoneInfo
+
+
+def _to_utc(value: datetime, zone: ZoneInfo) -> datetime:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=zone)
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _to_local(value: datetime, zone: ZoneInfo) -> datetime:
+    return value.replace(tzinfo=timezone.utc).astimezone(zone).replace(tzinfo=None)
+
+
+def timeseries_params(
+        start: datetime = Query(..., alias="from", description="Từ thời điểm (ISO 8601, gồm)"),
+        end: datetime = Query(..., alias="to", description="Đến thời điểm (ISO 8601, không gồm)"),
+        granularity: str = Query("day", pattern=GRANULARITY_PATTERN),
+        tz: str = Query("UTC", description="Múi giờ IANA để chia khoảng, vd Asia/Ho_Chi_Minh"),
+) -> TimeSeriesParams:
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid timezone")
+    start, end = _to_utc(start, zone), _to_utc(end, zone)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="`to` must be after `from`")
+    if (end - start) / _MIN_STEP[granularity] >= MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Too many buckets (max {MAX_BUCKETS})")
+    return TimeSeriesParams(start=start, end=end, granularity=granularity, zone=zone)
+
+
+def appointment_counts(
+        db: Session, params: TimeSeriesParams, doctor_id: Optional[int] = None
+) -> List[schemas.TimeSeriesPoint]:
+    """Số lịch hẹn (tổng và theo trạng thái) trong từng khoảng chạm [start, end)."""
+    zone = params.zone
+    binds = {
+        "unit": params.granularity,
+        "tz": zone.key,
+        "start": params.start,
+        "end": params.end,
+        "first": _to_local(params.start, zone),
+        # Khoảng cuối là khoảng chứa thời điểm ngay trước `end`
+        "last": _to_local(params.end - timedelta(microseconds=1), zone),
+        "step": f"1 {params.granularity}",
+    }
+    if doctor_id is None:
+        rows = db.execute(_ALL_SQL, binds)
+    else:
+        rows = db.execute(_DOCTOR_SQL, {**binds, "doctor_id": doctor_id})
+    return [
+        schemas.TimeSeriesPoint(
+            bucket=bucket.replace(tzinfo=zone), count=total, booked=booked, done=done, canceled=canceled
+        )
+        for bucket, total, booked, done, canceled in rows
+    ]
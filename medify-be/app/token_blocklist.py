@@ -1,33 +1,207 @@
 # app/token_blocklist.py
-from typing import Dict
+"""
+Danh sách token đã thu hồi (logout), backend chọn qua TOKEN_BLOCKLIST_BACKEND:
+
+- "memory":   trong tiến trình; chỉ đúng khi chạy 1 worker.
+- "database": bảng token_revocations, dùng chung cho mọi worker.
+- "redis":    Redis (hoặc server tương thích giao thức Redis), cần REDIS_URL
+              và gói `redis`.
+
+Backend dùng chung được bọc bởi cache cục bộ mỗi worker: kết quả "chưa bị thu hồi"
+được nhớ TOKEN_BLOCKLIST_CACHE_SECONDS giây, nên get_current_user không phải gọi
+DB/Redis ở mọi request. Đổi lại, token bị thu hồi ở worker khác có thể còn dùng
+được tối đa chừng đó thời gian (worker thực hiện logout thấy ngay lập tức).
+
+Khoá được lưu:
+- "j:<jti>" -> exp: token đã logout (token cũ không có jti dùng "t:<sha256>").
+- "u:<user_id>" -> thời điểm (epoch giây) mọi token của user bị thu hồi. Token có
+  claim "iat" trước thời điểm này bị từ chối, nên revoke_user() vô hiệu mọi token
+  cũ ngay mà đăng nhập không phải đọc store, và không truy vấn bảng users ở mỗi
+  request. Độ phân giải là 1 giây (như "iat"): token cấp trong cùng giây với lúc thu
+  hồi vẫn dùng được. Khoá sống bằng thời hạn token, sau đó các token cũ đã tự hết hạn.
+"""
+import hashlib
+import heapq
 import time
-from threading import RLock
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
 
-# In-memory blocklist: token -> exp_epoch
-# Dùng lock để an toàn luồng khi chạy đa-worker dev.
-_blocked: Dict[str, int] = {}
-_lock = RLock()
+from app.cache import ShardedTTLCache
+from app.config import settings
 
-def block(token: str, exp_epoch: int) -> None:
-    with _lock:
-        _blocked[token] = exp_epoch
-        _cleanup()
 
-def is_blocked(token: str) -> bool:
-    now = int(time.time())
-    with _lock:
-        exp = _blocked.get(token)
-        if exp is None:
-            return False
-        if exp <= now:
-            # token đã hết hạn -> gỡ khỏi blocklist
-            _blocked.pop(token, None)
-            return False
-        return True
+class MemoryStore:
+    """
+    key -> (value, exp_epoch) trong dict + min-heap theo exp để dọn dẹp:
+    thêm O(log n), dọn các phần tử hết hạn ở đỉnh heap (khấu hao O(log n)).
+    Đọc không cần lock.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[int, int]] = {}
+        self._heap: List[Tuple[int, str]] = []
+        self._lock = Lock()
+
+    def put(self, key: str, value: int, exp_epoch: int) -> None:
+        now = int(time.time())
+        with self._lock:
+            self._data[key] = (value, exp_epoch)
+            heapq.heappush(self._heap, (exp_epoch, key))
+            self._purge(now)
+
+    def get(self, key: str) -> Optional[int]:
+        item = self._data.get(key)
+        if item is None or item[1] <= time.time():
+            return None
+        return item[0]
+
+    def _purge(self, now: int) -> None:
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            exp, key = heapq.heappop(heap)
+            item = self._data.get(key)
+            # Key có thể đã được put lại với exp khác -> giữ lại
+            if item is not None and item[1] == exp:
+                del self._data[key]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DatabaseStore:
+    """Bảng token_revocations; các hàng hết hạn được xoá định kỳ khi có put."""
+
+    CLEANUP_INTERVAL = 60  # giây
+
+    def __init__(self):
+        self._last_cleanup = 0.0
+
+    def put(self, key: str, value: int, exp_epoch: int) -> None:
+        from sqlalchemy.dialects.postgresql import insert
+
+        from app.db import engine
+        from app.models import TokenRevocation
+
+        stmt = insert(TokenRevocation).values(key=key, value=value, expires_at=exp_epoch)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TokenRevocation.key],
+            set_={"value": stmt.excluded.value, "expires_at": stmt.excluded.expires_at},
+        )
+        now = time.time()
+        with engine.begin() as conn:
+            conn.execute(stmt)
+            if now - self._last_cleanup > self.CLEANUP_INTERVAL:
+                self._last_cleanup = now
+                conn.execute(TokenRevocation.__table__.delete().where(TokenRevocation.expires_at <= int(now)))
+
+    def get(self, key: str) -> Optional[int]:
+        from sqlalchemy import select
+
+        from app.db import engine
+        from app.models import TokenRevocation
+
+        with engine.connect() as conn:
+            return conn.execute(
+                select(TokenRevocation.value).where(
+                    TokenRevocation.key == key,
+                    TokenRevocation.expires_at > int(time.time()),
+                )
+            ).scalar()
+
+
+class RedisStore:
+    """Mỗi key là một string Redis có TTL (SET ... EX), Redis tự dọn khi hết hạn."""
+
+    PREFIX = "medify:revoked:"
 
-def _cleanup() -> None:
-    """Dọn các token đã hết hạn để tránh đầy bộ nhớ."""
+    def __init__(self, client=None, url: Optional[str] = None):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("TOKEN_BLOCKLIST_BACKEND=redis cần cài gói `redis`")
+            if not url:
+                raise RuntimeError("TOKEN_BLOCKLIST_BACKEND=redis cần REDIS_URL")
+            client = redis.Redis.from_url(url)
+        self._client = client
+
+    def put(self, key: str, value: int, exp_epoch: int) -> None:
+        ttl = exp_epoch - int(time.time())
+        if ttl > 0:
+            self._client.set(self.PREFIX + key, value, ex=ttl)
+
+    def get(self, key: str) -> Optional[int]:
+        raw = self._client.get(self.PREFIX + key)
+        return None if raw is None else int(raw)
+
+
+_MISSING = object()
+
+
+class CachedStore:
+    """Cache cục bộ (kể cả kết quả âm) phía trước một backend dùng chung."""
+
+    def __init__(self, inner, ttl: float, maxsize: int):
+        self._inner = inner
+        self._cache = ShardedTTLCache(maxsize=maxsize, ttl=ttl)
+
+    def put(self, key: str, value: int, exp_epoch: int) -> None:
+        self._inner.put(key, value, exp_epoch)
+        self._cache.set(key, value, ttl=max(exp_epoch - time.time(), 0))
+
+    def get(self, key: str) -> Optional[int]:
+        value = self._cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = self._inner.get(key)
+            self._cache.set(key, value)
+        return value
+
+
+def _create_store():
+    backend = settings.TOKEN_BLOCKLIST_BACKEND
+    if backend == "memory":
+        return MemoryStore()
+    if backend == "database":
+        inner = DatabaseStore()
+    elif backend == "redis":
+        inner = RedisStore(url=settings.REDIS_URL)
+    else:
+        raise ValueError(f"Unknown TOKEN_BLOCKLIST_BACKEND: {backend!r}")
+    if settings.TOKEN_BLOCKLIST_CACHE_SECONDS <= 0:
+        return inner
+    return CachedStore(
+        inner,
+        ttl=settings.TOKEN_BLOCKLIST_CACHE_SECONDS,
+        maxsize=settings.TOKEN_BLOCKLIST_CACHE_SIZE,
+    )
+
+
+_store = _create_store()
+
+
+def _token_key(claims: Dict, token: str) -> str:
+    jti = claims.get("jti")
+    if jti:
+        return "j:" + jti
+    return "t:" + hashlib.sha256(token.encode()).hexdigest()
+
+
+def revoke_token(claims: Dict, token: str) -> None:
+    """Thu hồi một token (logout) đến khi nó hết hạn."""
+    exp = int(claims["exp"])
+    _store.put(_token_key(claims, token), exp, exp)
+
+
+def revoke_user(user_id: int) -> int:
+    """Vô hiệu mọi token đã cấp cho user (khoá tài khoản, đổi mật khẩu, xoá user)."""
     now = int(time.time())
-    for t, exp in list(_blocked.items()):
-        if exp <= now:
-            _blocked.pop(t, None)
+    _store.put(f"u:{user_id}", now, now + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    return now
+
+
+def is_revoked(claims: Dict, token: str) -> bool:
+    """claims là payload JWT đã giải mã và xác thực chữ ký."""
+    if _store.get(_token_key(claims, token)) is not None:
+        return True
+    revoked_at = _store.get(f"u:{claims['sub']}")
+    return revoked_at is not None and int(claims.get("iat", 0)) < revoked_at
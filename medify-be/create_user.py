@@ -8,8 +8,9 @@ from typing import Optional
 sys.path.insert(0, ".")
 
 from app.db import SessionLocal
-from app import models
+from app import models, stats
 from app.security import hash_password
+from app.search import doctor_search_vector
 
 ROLE_CHOICES = {
     "1": models.Role.admin,
@@ -100,10 +101,15 @@ def upsert_user(email: str, password: str, role: models.Role, full_name: Optiona
         if user:
             print(f"⚠️ Người dùng với email '{email}' đã tồn tại (id={user.id}, role={user.role.value}).")
             if prompt_yes_no("Bạn có muốn CẬP NHẬT role/password cho người dùng này?", default=False):
-                user.role = role
+                old_role, user.role = user.role, role
+                stats.user_role_changed(db, user, old_role)
                 user.password_hash = hash_password(password)
                 if full_name:
                     user.full_name = full_name
+                    # Họ tên nằm trong search_vector của hồ sơ bác sĩ
+                    prof = user.doctor_profile
+                    if user.role == models.Role.doctor and prof is not None:
+                        prof.search_vector = doctor_search_vector(user.full_name, prof.specialty, prof.bio)
                 db.commit()
                 db.refresh(user)
                 print(f"✅ Đã cập nhật người dùng (id={user.id}) → role={user.role.value}")
@@ -122,6 +128,8 @@ def upsert_user(email: str, password: str, role: models.Role, full_name: Optiona
             gender=None,
         )
         db.add(new_user)
+        db.flush()
+        stats.user_added(db, new_user)
         db.commit()
         db.refresh(new_user)
         print(f"✅ Đã tạo người dùng mới: id={new_user.id}, email={new_user.email}, role={new_user.role.value}")
@@ -133,6 +141,7 @@ def upsert_user(email: str, password: str, role: models.Role, full_name: Optiona
                     specialty="General",
                     years_exp=0,
                     bio="",
+                    search_vector=doctor_search_vector(new_user.full_name, "General", ""),
                 )
                 db.add(prof)
                 db.commit()
@@ -0,0 +1,433 @@
+# scripts/bench_api.py
+"""
+Benchmark end-to-end API với traffic mix thực tế, chạy trên dữ liệu đang có trong
+DATABASE_URL (nên sinh bằng scripts/generate_data.py).
+
+App chạy trong cùng process (httpx ASGITransport, có startup/shutdown); --concurrency
+người dùng ảo, mỗi người lặp lại một thao tác chọn ngẫu nhiên theo trọng số --mix:
+    login            POST /auth/login (cộng thêm một đợt đăng nhập đồng loạt lúc đầu)
+    doctor_search    GET /doctors?q=...
+    doctor_list      GET /doctors?specialty=...
+    doctor_detail    GET /doctors/{id}
+    book             GET /doctors/{id}/slots rồi POST /appointments một khung trống
+    cancel           POST /appointments/{id}/cancel (lịch vừa đặt trong lần chạy)
+    review           POST /reviews (lịch hẹn đã khám, chưa đánh giá)
+    my_appointments  GET /appointments
+    admin_dashboard  GET /admin/dashboard
+    admin_timeseries GET /admin/dashboard/timeseries
+
+Mỗi route: số request, req/s, p50/p95/p99, số lỗi (5xx và 4xx ngoài dự kiến), số câu
+SQL trung bình mỗi request (đếm theo request bằng contextvar + before_cursor_execute).
+
+    PYTHONPATH=. python scripts/bench_api.py -c 20 -d 30 --json results/base.json
+    PYTHONPATH=. python scripts/bench_api.py -c 20 -d 30 --compare results/base.json
+
+--compare: thoát mã 1 nếu route nào có số câu SQL/request tăng, hoặc p95 chậm hơn
+--tolerance (tương đối) và quá --min-ms (tuyệt đối), hoặc req/s giảm quá --tolerance.
+Lịch hẹn / review tạo ra khi chạy bị xoá khi xong (bộ đếm và điểm được tính lại).
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Thêm thư mục gốc vào PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from sqlalchemy import event, text
+
+from app import ratings, stats
+from app.config import settings
+from app.db import SessionLocal, async_engine, engine
+from app.main import app
+
+NOTE = "bench-api"
+
+DEFAULT_MIX = {
+    "login": 3,
+    "doctor_search": 25,
+    "doctor_list": 10,
+    "doctor_detail": 20,
+    "book": 8,
+    "cancel": 3,
+    "review": 3,
+    "my_appointments": 15,
+    "admin_dashboard": 3,
+    "admin_timeseries": 2,
+}
+
+# Mã lỗi là kết quả bình thường của thao tác (vd hai người cùng đặt một khung giờ)
+EXPECTED_STATUS = {"book": {409}, "review": {409}}
+
+# Bộ đếm câu SQL của request hiện tại (được copy sang threadpool / greenlet của app)
+_queries: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar("bench_queries", default=None)
+
+
+def _count_query(*args) -> None:
+    counter = _queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class Recorder:
+    def __init__(self):
+        self.enabled = False
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.queries: Dict[str, int] = {}
+
+    def add(self, route: str, ms: float, status: int, queries: int) -> None:
+        if not self.enabled:
+            return
+        self.latencies.setdefault(route, []).append(ms)
+        self.queries[route] = self.queries.get(route, 0) + queries
+        if status >= 500 or (status >= 400 and status not in EXPECTED_STATUS.get(route, ())):
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict]:
+        out = {}
+        for route in sorted(self.latencies):
+            lat = sorted(self.latencies[route])
+            n = len(lat)
+
+            def pct(p: float) -> float:
+                return round(lat[min(n - 1, int(n * p))], 2)
+
+            out[route] = {
+                "requests": n,
+                "errors": self.errors.get(route, 0),
+                "rps": round(n / elapsed, 2),
+                "p50_ms": round(statistics.median(lat), 2),
+                "p95_ms": pct(0.95),
+                "p99_ms": pct(0.99),
+                "queries_per_request": round(self.queries[route] / n, 2),
+            }
+        return out
+
+
+class VirtualUser:
+    def __init__(self, email: str, user_id: int, reviewable: List[int]):
+        self.email = email
+        self.user_id = user_id
+        self.headers: Dict[str, str] = {}
+        self.booked: List[int] = []  # lịch đã đặt, chưa huỷ
+        self.created: List[int] = []
+        self.reviewable = reviewable
+        self.reviewed: List[int] = []
+
+
+class Bench:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, args, world: Dict):
+        self.client = client
+        self.recorder = recorder
+        self.args = args
+        self.world = world
+        self.admin_headers: Dict[str, str] = {}
+
+    async def call(self, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        counter = [0]
+        token = _queries.set(counter)
+        t0 = time.perf_counter()
+        try:
+            r = await self.client.request(method, url, **kwargs)
+        finally:
+            _queries.reset(token)
+        self.recorder.add(route, (time.perf_counter() - t0) * 1000, r.status_code, counter[0])
+        return r
+
+    async def login(self, email: str) -> Dict[str, str]:
+        r = await self.call("login", "POST", "/auth/login", json={"email": email, "password": self.args.password})
+        r.raise_for_status()
+        return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    # --- Các thao tác của mix: trả False nếu không thực hiện được (vd chưa có lịch để huỷ) ---
+
+    async def op_login(self, vu: VirtualUser, rng: random.Random) -> bool:
+        vu.headers = await self.login(vu.email)
+        return True
+
+    async def op_doctor_search(self, vu: VirtualUser, rng: random.Random) -> bool:
+        await self.call("doctor_search", "GET", "/doctors", params={"q": rng.choice(self.world["terms"]), "limit": 20})
+        return True
+
+    async def op_doctor_list(self, vu: VirtualUser, rng: random.Random) -> bool:
+        params = {"specialty": rng.choice(self.world["specialties"]), "limit": 20}
+        await self.call("doctor_list", "GET", "/doctors", params=params)
+        return True
+
+    async def op_doctor_detail(self, vu: VirtualUser, rng: random.Random) -> bool:
+        await self.call("doctor_detail", "GET", f"/doctors/{rng.choice(self.world['doctors'])}")
+        return True
+
+    async def op_book(self, vu: VirtualUser, rng: random.Random) -> bool:
+        doctor_id = rng.choice(self.world["doctors"])
+        day = self.world["book_from"] + timedelta(days=rng.randrange(self.args.book_days))
+        r = await self.call(
+            "doctor_slots", "GET", f"/doctors/{doctor_id}/slots",
+            params={"from": day.isoformat(), "to": (day + timedelta(days=7)).isoformat()},
+        )
+        slots = r.json() if r.status_code == 200 else []
+        if not slots:
+            return True
+        slot = rng.choice(slots)
+        payload = {"doctor_user_id": doctor_id, "start_at": slot["start_at"], "end_at": slot["end_at"], "note": NOTE}
+        r = await self.call("book", "POST", "/appointments", json=payload, headers=vu.headers)
+        if r.status_code == 200:
+            vu.booked.append(r.json()["id"])
+            vu.created.append(vu.booked[-1])
+        return True
+
+    async def op_cancel(self, vu: VirtualUser, rng: random.Random) -> bool:
+        if not vu.booked:
+            return False
+        appointment_id = vu.booked.pop(rng.randrange(len(vu.booked)))
+        await self.call("cancel", "POST", f"/appointments/{appointment_id}/cancel", headers=vu.headers)
+        return True
+
+    async def op_review(self, vu: VirtualUser, rng: random.Random) -> bool:
+        if not vu.reviewable:
+            return False
+        appointment_id = vu.reviewable.pop()
+        payload = {"appointment_id": appointment_id, "rating": rng.randint(1, 5), "comment": NOTE}
+        r = await self.call("review", "POST", "/reviews", json=payload, headers=vu.headers)
+        if r.status_code == 200:
+            vu.reviewed.append(appointment_id)
+        return True
+
+    async def op_my_appointments(self, vu: VirtualUser, rng: random.Random) -> bool:
+        await self.call("my_appointments", "GET", "/appointments", params={"limit": 20}, headers=vu.headers)
+        return True
+
+    async def op_admin_dashboard(self, vu: VirtualUser, rng: random.Random) -> bool:
+        await self.call("admin_dashboard", "GET", "/admin/dashboard", headers=self.admin_headers)
+        return True
+
+    async def op_admin_timeseries(self, vu: VirtualUser, rng: random.Random) -> bool:
+        end = self.world["data_end"]
+        params = {
+            "from": (end - timedelta(days=365)).isoformat(), "to": end.isoformat(),
+            "granularity": rng.choice(["day", "week", "month"]), "tz": "Asia/Ho_Chi_Minh",
+        }
+        await self.call("admin_timeseries", "GET", "/admin/dashboard/timeseries", params=params,
+                        headers=self.admin_headers)
+        return True
+
+    async def worker(self, vu: VirtualUser, rng: random.Random, mix: Dict[str, int], deadline: float) -> None:
+        ops: List[Callable] = [getattr(self, f"op_{name}") for name in mix]
+        weights = list(mix.values())
+        while time.perf_counter() < deadline:
+            for _ in range(5):
+                if await rng.choices(ops, weights=weights)[0](vu, rng):
+                    break
+
+
+def load_world(args, rng: random.Random) -> Dict:
+    """Tài khoản, bác sĩ, từ khoá tìm kiếm... lấy từ dữ liệu hiện có."""
+    with engine.connect() as conn:
+        patients = conn.execute(
+            text(
+                "SELECT id, email FROM users WHERE role = 'patient' AND is_active "
+                "AND email LIKE :pattern ORDER BY id LIMIT :n"
+            ),
+            {"pattern": f"%@{args.domain}", "n": args.concurrency},
+        ).all()
+        if len(patients) < args.concurrency:
+            sys.exit(f"Cần ít nhất {args.concurrency} bệnh nhân @{args.domain} (chạy scripts/generate_data.py)")
+        reviewable = conn.execute(
+            text(
+                "SELECT a.patient_id, a.id FROM appointments a LEFT JOIN reviews r ON r.appointment_id = a.id "
+                "WHERE a.patient_id = ANY(CAST(:ids AS integer[])) AND a.status = 'done' AND r.id IS NULL "
+                "ORDER BY a.id"
+            ),
+            {"ids": [p.id for p in patients]},
+        ).all()
+        doctors = conn.execute(
+            text(
+                "SELECT u.id, u.full_name FROM users u JOIN doctor_profiles p ON p.user_id = u.id "
+                "WHERE u.role = 'doctor' AND u.is_active ORDER BY u.id"
+            )
+        ).all()
+        specialties = conn.execute(text("SELECT DISTINCT specialty FROM doctor_profiles ORDER BY 1")).scalars().all()
+        data_end = conn.execute(text("SELECT max(start_at) FROM appointments")).scalar() or datetime.utcnow()
+
+    by_patient: Dict[int, List[int]] = {}
+    for patient_id, appointment_id in reviewable:
+        by_patient.setdefault(patient_id, []).append(appointment_id)
+    doctors = rng.sample(doctors, min(len(doctors), args.doctors))
+    terms = sorted({w for _, name in doctors for w in name.split()})
+    # Đặt lịch sau mọi lịch hẹn có sẵn để phần lớn khung giờ còn trống
+    book_from = datetime.combine(data_end.date() + timedelta(days=1), datetime.min.time())
+    return {
+        "users": [VirtualUser(p.email, p.id, by_patient.get(p.id, [])) for p in patients],
+        "doctors": [d.id for d in doctors],
+        "terms": terms + [t[:2] for t in terms],
+        "specialties": specialties,
+        "data_end": data_end,
+        "book_from": book_from,
+    }
+
+
+def cleanup(world: Dict) -> None:
+    reviewed = [a for vu in world["users"] for a in vu.reviewed]
+    created = [a for vu in world["users"] for a in vu.created]
+    with SessionLocal() as db:
+        db.execute(text("DELETE FROM reviews WHERE appointment_id = ANY(CAST(:ids AS integer[]))"), {"ids": reviewed})
+        db.execute(text("DELETE FROM appointments WHERE id = ANY(CAST(:ids AS integer[]))"), {"ids": created})
+        stats.rebuild(db)
+        ratings.reconcile(db)
+        db.commit()
+
+
+async def run(args, mix: Dict[str, int], world: Dict, recorder: Recorder) -> Tuple[float, float]:
+    """Trả về (số giây đo, số giây của đợt đăng nhập đồng loạt)."""
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout) as client:
+            bench = Bench(client, recorder, args, world)
+            rngs = [random.Random(args.seed * 1000 + i) for i in range(len(world["users"]))]
+
+            # Đợt đăng nhập đồng loạt (mọi người dùng ảo + admin), đo riêng
+            burst = time.perf_counter()
+            headers = await asyncio.gather(
+                *[bench.login(vu.email) for vu in world["users"]], bench.login(args.admin_email),
+            )
+            for vu, h in zip(world["users"], headers):
+                vu.headers = h
+            bench.admin_headers = headers[-1]
+            burst = time.perf_counter() - burst
+
+            if args.warmup > 0:
+                deadline = time.perf_counter() + args.warmup
+                await asyncio.gather(*[bench.worker(vu, rng, mix, deadline) for vu, rng in zip(world["users"], rngs)])
+            recorder.enabled = True
+
+            started = time.perf_counter()
+            deadline = started + args.duration
+            await asyncio.gather(*[bench.worker(vu, rng, mix, deadline) for vu, rng in zip(world["users"], rngs)])
+            return time.perf_counter() - started, burst
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(routes: Dict[str, Dict]) -> None:
+    print(f"{'route':<18} {'req':>7} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL/req':>8}")
+    for route, r in routes.items():
+        print(f"{route:<18} {r['requests']:>7} {r['errors']:>5} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} "
+              f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['queries_per_request']:>8.2f}")
+
+
+def compare(routes: Dict[str, Dict], baseline: Dict, tolerance: float, min_ms: float) -> List[str]:
+    """Các route chậm / tốn truy vấn hơn baseline."""
+    problems = []
+    print(f"\n{'route':<18} {'p95 base':>9} {'p95 now':>9} {'req/s base':>11} {'req/s now':>10} {'SQL base':>9} {'SQL now':>8}")
+    for route, base in baseline["routes"].items():
+        now = routes.get(route)
+        if now is None:
+            continue
+        print(f"{route:<18} {base['p95_ms']:>9.1f} {now['p95_ms']:>9.1f} {base['rps']:>11.1f} {now['rps']:>10.1f} "
+              f"{base['queries_per_request']:>9.2f} {now['queries_per_request']:>8.2f}")
+        if now["queries_per_request"] > base["queries_per_request"] + 0.01:
+            problems.append(f"{route}: SQL/request {base['queries_per_request']} -> {now['queries_per_request']}")
+        if now["p95_ms"] > base["p95_ms"] * (1 + tolerance) and now["p95_ms"] - base["p95_ms"] > min_ms:
+            problems.append(f"{route}: p95 {base['p95_ms']}ms -> {now['p95_ms']}ms")
+        if now["rps"] < base["rps"] * (1 - tolerance):
+            problems.append(f"{route}: req/s {base['rps']} -> {now['rps']}")
+        if now["errors"] > base["errors"]:
+            problems.append(f"{route}: lỗi {base['errors']} -> {now['errors']}")
+    return problems
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, value.split(",")):
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"thao tác không tồn tại: {name}")
+        mix[name] = int(weight)
+    return {k: v for k, v in mix.items() if v > 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-c", "--concurrency", type=int, default=20, help="số người dùng ảo (bệnh nhân)")
+    parser.add_argument("-d", "--duration", type=float, default=30.0, help="giây đo")
+    parser.add_argument("--warmup", type=float, default=5.0, help="giây chạy trước khi đo (làm nóng cache)")
+    parser.add_argument("--mix", type=parse_mix, default=dict(DEFAULT_MIX),
+                        help="ghi đè trọng số, vd 'login=0,book=20'")
+    parser.add_argument("--doctors", type=int, default=2000, help="số bác sĩ được truy cập")
+    parser.add_argument("--book-days", type=int, default=60, help="đặt lịch trong số ngày này sau dữ liệu hiện có")
+    parser.add_argument("--domain", default="gen.medify.vn", help="domain email của tài khoản sinh bởi generate_data")
+    parser.add_argument("--password", default="123456")
+    parser.add_argument("--admin-email", default="admin@gen.medify.vn")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", help="ghi kết quả ra file JSON")
+    parser.add_argument("--compare", help="file JSON kết quả trước đó để so sánh")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="mức chậm đi tương đối cho phép")
+    parser.add_argument("--min-ms", type=float, default=2.0, help="bỏ qua chênh lệch p95 nhỏ hơn (ms)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    world = load_world(args, rng)
+    for e in (engine, async_engine.sync_engine if async_engine is not None else None):
+        if e is not None:
+            event.listen(e, "before_cursor_execute", _count_query)
+
+    recorder = Recorder()
+    try:
+        elapsed, burst = asyncio.run(run(args, args.mix, world, recorder))
+    finally:
+        cleanup(world)
+
+    routes = recorder.summary(elapsed)
+    total = sum(len(v) for v in recorder.latencies.values())
+    print(f"{total} request trong {elapsed:.1f}s ({total / elapsed:.1f} req/s), concurrency={args.concurrency}, "
+          f"DB_ASYNC={settings.DB_ASYNC}")
+    print(f"Đăng nhập đồng loạt {args.concurrency + 1} tài khoản: {burst:.2f}s\n")
+    print_table(routes)
+
+    result = {
+        "meta": {
+            "commit": _git_commit(),
+            "time_utc": datetime.utcnow().isoformat(timespec="seconds"),
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "login_burst_seconds": round(burst, 3),
+            "mix": args.mix,
+            "db_async": settings.DB_ASYNC,
+            "fast_json": settings.FAST_JSON,
+        },
+        "routes": routes,
+    }
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.json).write_text(json.dumps(result, indent=2, ensure_ascii=False))
+
+    if args.compare:
+        problems = compare(routes, json.loads(Path(args.compare).read_text()), args.tolerance, args.min_ms)
+        for p in problems:
+            print(f"❌ {p}")
+        if not problems:
+            print("✅ Không có route nào chậm đi so với baseline")
+        sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
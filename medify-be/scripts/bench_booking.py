@@ -0,0 +1,208 @@
+# scripts/bench_booking.py
+"""
+Benchmark đặt lịch đồng thời cho một bác sĩ "hot" (routers/appointments._create_appointment).
+
+Mỗi vòng, với bảng appointments đã có sẵn --existing lịch hẹn của bác sĩ đó:
+- contended: --clients luồng cùng tranh --slots khung giờ -> mỗi khung đúng 1 lịch
+  thành công, còn lại 409
+- distinct: mỗi lần đặt một khung giờ khác nhau -> không luồng nào phải chờ luồng nào
+
+Kiểm tra cuối mỗi vòng: không có 2 lịch hẹn (chưa huỷ) nào của bác sĩ chồng giờ
+trong khoảng vừa đặt.
+Độ trễ gần như không đổi khi --existing tăng (kiểm tra trùng là tra index GiST
+của constraint appointments_no_overlap, không quét / khoá bảng).
+
+Chạy (cần DATABASE_URL trỏ tới Postgres đã `alembic upgrade head`):
+    PYTHONPATH=. python scripts/bench_booking.py --existing 0,100000,1000000
+
+Dữ liệu giả (email 'bench-book-*', note 'bench-booking') bị xoá khi xong và bộ
+đếm dashboard được dựng lại (stats.rebuild).
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Thêm thư mục gốc vào PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from app import models, schemas, stats
+from app.db import engine, SessionLocal
+from app.routers.appointments import _create_appointment
+
+NOTE = "bench-booking"
+SLOT = timedelta(minutes=30)
+# Lịch hẹn có sẵn nằm liên tiếp từ mốc này (1 triệu khung 30 phút ~ 57 năm)
+HISTORY_START = datetime(1900, 1, 1)
+
+OVERLAPS = (
+    "SELECT count(*) FROM appointments a JOIN appointments b "
+    "  ON a.doctor_id = b.doctor_id AND a.id < b.id "
+    " AND tsrange(a.start_at, a.end_at) && tsrange(b.start_at, b.end_at) "
+    "WHERE a.doctor_id = :d AND a.start_at >= :since AND b.start_at >= :since "
+    "  AND a.status <> 'canceled' AND b.status <> 'canceled'"
+)
+
+PROBE = (
+    "EXPLAIN SELECT 1 FROM appointments "
+    "WHERE int4range(doctor_id, doctor_id, '[]') = int4range(:d, :d, '[]') "
+    "  AND tsrange(start_at, end_at) && tsrange(:s, :e) "
+    "  AND doctor_id IS NOT NULL AND status <> 'canceled' AND end_at > start_at"
+)
+
+
+def setup(patients: int):
+    with engine.begin() as conn:
+        doctor_id = conn.execute(
+            text(
+                "INSERT INTO users (email, full_name, password_hash, is_active, role) "
+                "VALUES ('bench-book-d@medify.vn', 'Bench Doctor', 'x', true, 'doctor') RETURNING id"
+            )
+        ).scalar()
+        profile_id = conn.execute(
+            text(
+                "INSERT INTO doctor_profiles (user_id, specialty, years_exp, bio, avg_rating) "
+                "VALUES (:u, 'Tim mạch', 10, '', 0) RETURNING id"
+            ),
+            {"u": doctor_id},
+        ).scalar()
+        # Làm việc cả tuần để kiểm tra lịch làm việc luôn được thực hiện
+        conn.execute(
+            text(
+                "INSERT INTO availabilities (doctor_id, weekday, start_time, end_time) "
+                "SELECT :p, wd, '00:00', '23:59' FROM generate_series(0, 6) wd"
+            ),
+            {"p": profile_id},
+        )
+        patient_ids = conn.execute(
+            text(
+                "INSERT INTO users (email, full_name, password_hash, is_active, role) "
+                "SELECT 'bench-book-p' || g || '@medify.vn', 'Bench Patient ' || g, 'x', true, 'patient' "
+                "FROM generate_series(1, :n) g RETURNING id"
+            ),
+            {"n": patients},
+        ).scalars().all()
+    return doctor_id, patient_ids
+
+
+def fill_history(doctor_id: int, patient_id: int, total: int) -> None:
+    """Thêm lịch hẹn quá khứ liên tiếp (không trùng) cho tới khi bác sĩ có `total` lịch."""
+    with engine.begin() as conn:
+        have = conn.execute(
+            text("SELECT count(*) FROM appointments WHERE doctor_id = :d AND note = :note AND start_at < :t"),
+            {"d": doctor_id, "note": NOTE, "t": datetime(2000, 1, 1)},
+        ).scalar()
+        if total > have:
+            conn.execute(
+                text(
+                    "INSERT INTO appointments (patient_id, doctor_id, start_at, end_at, status, note) "
+                    "SELECT :p, :d, s, s + interval '30 minutes', 'done', :note FROM ("
+                    "  SELECT CAST(:start AS timestamp) + g * interval '30 minutes' AS s "
+                    "  FROM generate_series(:lo, :hi) g) t"
+                ),
+                {"p": patient_id, "d": doctor_id, "note": NOTE, "start": HISTORY_START, "lo": have, "hi": total - 1},
+            )
+        conn.execute(text("ANALYZE appointments"))
+
+
+def day_slots(first: datetime, n: int):
+    """n khung 30 phút liên tiếp từ `first`, bỏ khung vắt qua nửa đêm (ngoài lịch làm việc)."""
+    out, s = [], first
+    while len(out) < n:
+        if (s + SLOT).date() == s.date():
+            out.append(s)
+        s += SLOT
+    return out
+
+
+def book(doctor_id: int, patient_id: int, start: datetime):
+    payload = schemas.AppointmentCreate(doctor_user_id=doctor_id, start_at=start, end_at=start + SLOT, note=NOTE)
+    user = {"sub": patient_id, "role": models.Role.patient.value}
+    t0 = time.perf_counter()
+    try:
+        with SessionLocal() as db:
+            _create_appointment(db, payload, user)
+        code = 201
+    except HTTPException as e:
+        code = e.status_code
+    return code, (time.perf_counter() - t0) * 1000
+
+
+def storm(doctor_id, patient_ids, starts, clients: int):
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(lambda s: book(doctor_id, random.choice(patient_ids), s), starts))
+    elapsed = time.perf_counter() - t0
+    latencies = sorted(ms for _, ms in results)
+    codes = {}
+    for code, _ in results:
+        codes[code] = codes.get(code, 0) + 1
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return codes, len(results) / elapsed, statistics.median(latencies), p99
+
+
+def cleanup() -> None:
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM appointments WHERE note = :note"), {"note": NOTE})
+        conn.execute(
+            text(
+                "DELETE FROM availabilities WHERE doctor_id IN (SELECT p.id FROM doctor_profiles p "
+                "JOIN users u ON u.id = p.user_id WHERE u.email LIKE 'bench-book-%')"
+            )
+        )
+        conn.execute(
+            text("DELETE FROM doctor_profiles WHERE user_id IN (SELECT id FROM users WHERE email LIKE 'bench-book-%')")
+        )
+        conn.execute(text("DELETE FROM users WHERE email LIKE 'bench-book-%'"))
+    with SessionLocal() as db:
+        stats.rebuild(db)
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--existing", default="0,200000", help="số lịch hẹn có sẵn của bác sĩ, cách nhau dấu phẩy")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=400, help="số lần đặt mỗi vòng")
+    parser.add_argument("--slots", type=int, default=20, help="số khung giờ bị tranh ở vòng contended")
+    parser.add_argument("--patients", type=int, default=200)
+    args = parser.parse_args()
+
+    doctor_id, patient_ids = setup(args.patients)
+    try:
+        base = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        # Mỗi vòng dùng một khoảng thời gian riêng trong tương lai để không đụng vòng trước
+        span = timedelta(days=2 + args.attempts // 47)
+        print(f"{'existing':>9} {'mode':<10} {'201':>5} {'409':>5} {'other':>5} {'req/s':>8} {'p50':>9} {'p99':>9}")
+        for i, total in enumerate(int(x) for x in args.existing.split(",")):
+            fill_history(doctor_id, patient_ids[0], total)
+            start = base + span * i
+            hot = day_slots(start, args.slots)
+            contended = [random.choice(hot) for _ in range(args.attempts)]
+            distinct = day_slots(start + timedelta(days=1), args.attempts)
+            for mode, starts in (("contended", contended), ("distinct", distinct)):
+                codes, rps, p50, p99 = storm(doctor_id, patient_ids, starts, args.clients)
+                other = sum(n for c, n in codes.items() if c not in (201, 409))
+                print(f"{total:>9} {mode:<10} {codes.get(201, 0):>5} {codes.get(409, 0):>5} {other:>5} "
+                      f"{rps:>8.0f} {p50:>7.1f}ms {p99:>7.1f}ms")
+            with engine.connect() as conn:
+                overlaps = conn.execute(text(OVERLAPS), {"d": doctor_id, "since": start}).scalar()
+            assert overlaps == 0, f"{overlaps} cặp lịch hẹn trùng giờ"
+
+        with engine.connect() as conn:
+            plan = conn.execute(text(PROBE), {"d": doctor_id, "s": base, "e": base + SLOT}).scalars().all()
+        print("\nKiểm tra trùng giờ (cùng điều kiện với constraint):")
+        print("\n".join("  " + line for line in plan))
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# scripts/bench_dashboard.py
+"""
+Benchmark dashboard admin trên bảng appointments lớn (mặc định 1 triệu dòng).
+
+So sánh:
+- overview: 6 truy vấn COUNT trên users / appointments (cách cũ) với cộng bộ đếm
+  user_stats / appointment_daily_stats (app/stats.py)
+- /admin/dashboard (các widget đọc bộ đếm): chạy tuần tự trên một session với
+  dashboard_data() (asyncio.gather, tối đa DASHBOARD_MAX_CONNECTIONS connection)
+  như routers/dashboard.get_dashboard_data
+
+Chạy (cần DATABASE_URL trỏ tới Postgres đã `alembic upgrade head`):
+    PYTHONPATH=. python scripts/bench_dashboard.py --appointments 1000000
+
+Truy vấn song song cần dữ liệu đã COMMIT nên dữ liệu giả được chèn thật (email
+'bench-dash-*', note 'bench-dashboard') và bị xoá khi xong, trừ khi truyền --keep. Bộ đếm dashboard được dựng lại
+(stats.rebuild) sau khi chèn và sau khi xoá.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+# Thêm thư mục gốc vào PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+from app import stats
+from app.db import engine, SessionLocal
+from app.routers import dashboard
+
+NOTE = "bench-dashboard"
+SPECIALTIES = ["Tim mạch", "Nhi khoa", "Da liễu", "Thần kinh", "Răng hàm mặt", "Tai mũi họng",
+               "Nội tiết", "Sản phụ khoa", "Chấn thương chỉnh hình", "Mắt", "Tiêu hoá", "Hô hấp"]
+
+# Overview như trước đây: 6 lần COUNT, mỗi lần một truy vấn
+LEGACY_OVERVIEW = [
+    "SELECT count(*) FROM users WHERE role = 'patient'",
+    "SELECT count(*) FROM users WHERE role = 'doctor'",
+    "SELECT count(*) FROM appointments",
+    "SELECT count(*) FROM appointments WHERE status = 'booked'",
+    "SELECT count(*) FROM appointments WHERE CAST(start_at AS DATE) = :today",
+    "SELECT count(*) FROM users WHERE is_active = true",
+]
+
+
+def seed(conn, doctors: int, patients: int, appointments: int) -> None:
+    conn.execute(
+        text(
+            "INSERT INTO users (email, full_name, password_hash, is_active, role) "
+            "SELECT 'bench-dash-d' || g || '@medify.vn', 'Bench Doctor ' || g, 'x', true, 'doctor' "
+            "FROM generate_series(1, :n) g"
+        ),
+        {"n": doctors},
+    )
+    conn.execute(
+        text(
+            "INSERT INTO doctor_profiles (user_id, specialty, years_exp, bio, avg_rating) "
+            "SELECT id, (:specs)[1 + (id % cardinality(:specs))], 5, '', 0 "
+            "FROM users WHERE email LIKE 'bench-dash-d%'"
+        ),
+        {"specs": SPECIALTIES},
+    )
+    conn.execute(
+        text(
+            "INSERT INTO users (email, full_name, password_hash, is_active, role) "
+            "SELECT 'bench-dash-p' || g || '@medify.vn', 'Bench Patient ' || g, 'x', g % 10 <> 0, 'patient' "
+            "FROM generate_series(1, :n) g"
+        ),
+        {"n": patients},
+    )
+    # Lịch hẹn rải đều trong 1 năm trước và 30 ngày tới; mỗi bác sĩ cách nhau
+    # `step` giờ để không vi phạm appointments_no_overlap
+    step = max(1, 395 * 24 // -(-appointments // doctors))
+    conn.execute(
+        text(
+            "WITH d AS (SELECT array_agg(id) AS ids FROM users WHERE email LIKE 'bench-dash-d%'), "
+            "p AS (SELECT array_agg(id) AS ids FROM users WHERE email LIKE 'bench-dash-p%'), "
+            "a AS (SELECT g, date_trunc('hour', now()::timestamp - interval '365 days') "
+            "             + ((g - 1) / cardinality(d.ids)) * :step * interval '1 hour' AS s "
+            "      FROM generate_series(1, :n) g, d) "
+            "INSERT INTO appointments (patient_id, doctor_id, start_at, end_at, status, note) "
+            "SELECT p.ids[1 + floor(random() * cardinality(p.ids))::int], "
+            "       d.ids[1 + (a.g - 1) % cardinality(d.ids)], "
+            "       a.s, a.s + interval '30 minutes', "
+            "       (ARRAY['booked', 'canceled', 'done'])[1 + floor(random() * 3)::int]::appointmentstatus, "
+            "       :note "
+            "FROM a, d, p"
+        ),
+        {"n": appointments, "step": step, "note": NOTE},
+    )
+    conn.execute(text("ANALYZE users; ANALYZE doctor_profiles; ANALYZE appointments"))
+
+
+def rebuild_stats() -> None:
+    # Dữ liệu giả chèn bằng SQL, không qua API: bộ đếm phải dựng lại từ bảng gốc
+    with SessionLocal() as db:
+        stats.rebuild(db)
+        db.commit()
+
+
+def cleanup() -> None:
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM appointments WHERE note = :note"), {"note": NOTE})
+    # Dọn dead tuple trước khi xoá users: kiểm tra khoá ngoại appointments.patient_id
+    # (không có index) quét lại bảng appointments cho mỗi user bị xoá
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE appointments"))
+    with engine.begin() as conn:
+        conn.execute(
+            text("DELETE FROM doctor_profiles WHERE user_id IN (SELECT id FROM users WHERE email LIKE 'bench-dash-%')")
+        )
+        conn.execute(text("DELETE FROM users WHERE email LIKE 'bench-dash-%'"))
+    rebuild_stats()
+
+
+def measure(fn, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    return statistics.median(timings), p99
+
+
+def legacy_overview():
+    today = date.today()
+    with engine.connect() as conn:
+        for sql in LEGACY_OVERVIEW:
+            conn.execute(text(sql), {"today": today}).scalar()
+
+
+def counter_overview():
+    with SessionLocal() as db:
+        dashboard._overview(db)
+
+
+def sequential_dashboard():
+    with SessionLocal() as db:
+        dashboard._overview(db)
+        dashboard._appointments_by_status(db)
+        dashboard._users_by_role(db)
+        dashboard._specialty_stats(db)
+        dashboard._top_doctors(db, 5)
+        dashboard._recent_activities(db, 10)
+        dashboard._appointment_trends(db, 7)
+
+
+def concurrent_dashboard():
+    asyncio.run(dashboard.dashboard_data())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--appointments", type=int, default=1_000_000)
+    parser.add_argument("--doctors", type=int, default=2_000)
+    parser.add_argument("--patients", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--keep", action="store_true", help="giữ lại dữ liệu giả sau khi chạy")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        seed(conn, args.doctors, args.patients, args.appointments)
+    rebuild_stats()
+    print(f"Seeded {args.appointments} appointments in {time.perf_counter() - t0:.1f}s\n")
+
+    try:
+        print(f"{'case':<28} {'p50':>10} {'p99':>10}")
+        for label, fn in [
+            ("overview: 6 x COUNT", legacy_overview),
+            ("overview: counter tables", counter_overview),
+            ("dashboard: one session", sequential_dashboard),
+            ("dashboard: dashboard_data()", concurrent_dashboard),
+        ]:
+            fn()  # khởi động (cache, pool)
+            p50, p99 = measure(fn, args.repeat)
+            print(f"{label:<28} {p50:>8.1f}ms {p99:>8.1f}ms")
+    finally:
+        if not args.keep:
+            cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# scripts/bench_hash.py
+"""
+Đo chi phí bcrypt_sha256 theo số vòng trên máy hiện tại để chọn BCRYPT_ROUNDS.
+
+Mỗi lần đăng nhập tốn 1 lần verify; số login/giây tối đa ~ số core / thời gian verify.
+Chọn số vòng lớn nhất mà p99 verify (cộng thời gian chờ hàng đợi lúc cao điểm) vẫn
+nằm trong mục tiêu p99 của login.
+
+Ví dụ:
+    python scripts/bench_hash.py --rounds 10 11 12 13 -n 20 --target-ms 250
+"""
+import argparse
+import os
+import statistics
+import time
+
+from passlib.hash import bcrypt_sha256
+
+PASSWORD = "Medify@2024-benchmark"
+
+
+def measure(rounds: int, n: int):
+    hasher = bcrypt_sha256.using(rounds=rounds)
+    hashed = hasher.hash(PASSWORD)  # khởi động
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        hasher.verify(PASSWORD, hashed)
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        "p50": statistics.median(samples),
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13, 14])
+    parser.add_argument("-n", type=int, default=10, help="số lần verify cho mỗi mức")
+    parser.add_argument("--target-ms", type=float, default=None, help="mục tiêu p99 cho 1 lần verify")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    print(f"{'rounds':>6} {'p50 ms':>9} {'p99 ms':>9} {'login/s/core':>13} {'login/s (' + str(cores) + ' cores)':>18}")
+    best = None
+    for rounds in args.rounds:
+        r = measure(rounds, args.n)
+        per_core = 1000 / r["p50"]
+        print(f"{rounds:>6} {r['p50']:>9.1f} {r['p99']:>9.1f} {per_core:>13.1f} {per_core * cores:>18.1f}")
+        if args.target_ms is not None and r["p99"] <= args.target_ms:
+            best = rounds
+    if args.target_ms is not None:
+        print(f"\nBCRYPT_ROUNDS đề xuất (p99 <= {args.target_ms} ms): {best if best is not None else 'không có'}")
+
+
+if __name__ == "__main__":
+    main()
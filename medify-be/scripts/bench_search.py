@@ -0,0 +1,174 @@
+# scripts/bench_search.py
+"""
+Benchmark tìm kiếm bác sĩ: ILIKE '%q%' (cách cũ) so với full-text search (app/search.py).
+
+Chạy (cần DATABASE_URL trỏ tới Postgres đã `alembic upgrade head`):
+    PYTHONPATH=. python scripts/bench_search.py --doctors 100000
+
+Dữ liệu giả được chèn trong một transaction và ROLLBACK khi xong,
+trừ khi truyền --keep.
+"""
+import argparse
+import enum
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Thêm thư mục gốc vào PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import select, text
+
+from app.db import engine
+from app import models, search
+
+LAST_NAMES = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng", "Bùi", "Đỗ"]
+MIDDLE_NAMES = ["Văn", "Thị", "Hữu", "Minh", "Ngọc", "Thanh", "Quốc", "Đức", "Gia", "Bảo"]
+FIRST_NAMES = ["An", "Bình", "Châu", "Dũng", "Giang", "Hà", "Hải", "Hạnh", "Hùng", "Khoa",
+               "Lan", "Linh", "Long", "Mai", "Nam", "Phúc", "Quân", "Tâm", "Thảo", "Trang",
+               "Tuấn", "Uyên", "Việt", "Vy", "Yến"]
+SPECIALTIES = ["Tim mạch", "Nhi khoa", "Da liễu", "Thần kinh", "Răng hàm mặt", "Tai mũi họng",
+               "Nội tiết", "Sản phụ khoa", "Chấn thương chỉnh hình", "Mắt", "Tiêu hoá", "Hô hấp"]
+BIO_WORDS = ["tốt", "nghiệp", "đại", "học", "y", "dược", "bệnh", "viện", "chợ", "rẫy", "bạch", "mai",
+             "kinh", "nghiệm", "điều", "trị", "nội", "soi", "phẫu", "thuật", "tư", "vấn", "sức", "khoẻ"]
+
+QUERIES = [
+    ("name", {"q": "Nguyễn Tâm"}),
+    ("name_no_diacritics", {"q": "nguyen tam"}),
+    ("typeahead", {"q": "hu"}),
+    ("bio", {"q": "phẫu thuật"}),
+    ("specialty", {"specialty": "tim mach"}),
+    ("specialty_and_q", {"specialty": "nhi", "q": "linh"}),
+]
+
+
+def seed(conn, n: int, rng: random.Random) -> None:
+    emails, names, docs_name, docs_spec, docs_bio, specs, bios = [], [], [], [], [], [], []
+    for i in range(n):
+        name = f"{rng.choice(LAST_NAMES)} {rng.choice(MIDDLE_NAMES)} {rng.choice(FIRST_NAMES)}"
+        spec = rng.choice(SPECIALTIES)
+        bio = " ".join(rng.choice(BIO_WORDS) for _ in range(rng.randint(8, 30)))
+        d_name, d_spec, d_bio = search.search_document(name, spec, bio)
+        emails.append(f"bench-doctor-{i}@medify.vn")
+        names.append(name)
+        specs.append(spec)
+        bios.append(bio)
+        docs_name.append(d_name)
+        docs_spec.append(d_spec)
+        docs_bio.append(d_bio)
+
+    conn.execute(
+        text(
+            "INSERT INTO users (email, full_name, password_hash, is_active, role) "
+            "SELECT e, n, 'x', true, 'doctor' FROM unnest(:emails, :names) AS t(e, n)"
+        ),
+        {"emails": emails, "names": names},
+    )
+    conn.execute(
+        text(
+            "INSERT INTO doctor_profiles (user_id, specialty, years_exp, bio, avg_rating, search_vector) "
+            "SELECT u.id, t.s, 5, t.b, round((random() * 5)::numeric, 1), "
+            "setweight(to_tsvector('simple', t.dn), 'A') || "
+            "setweight(to_tsvector('simple', t.ds), 'B') || "
+            "setweight(to_tsvector('simple', t.db), 'C') "
+            "FROM unnest(:emails, :specs, :bios, :dn, :ds, :db) AS t(e, s, b, dn, ds, db) "
+            "JOIN users u ON u.email = t.e"
+        ),
+        {"emails": emails, "specs": specs, "bios": bios, "dn": docs_name, "ds": docs_spec, "db": docs_bio},
+    )
+    conn.execute(text("ANALYZE users; ANALYZE doctor_profiles"))
+
+
+def legacy_sql(params: dict):
+    """Truy vấn ILIKE như search_doctors trước đây."""
+    sql = (
+        "SELECT u.id FROM users u JOIN doctor_profiles p ON p.user_id = u.id "
+        "WHERE u.role = 'doctor'"
+    )
+    binds = {}
+    if params.get("specialty"):
+        sql += " AND p.specialty ILIKE :spec"
+        binds["spec"] = f"%{params['specialty']}%"
+    if params.get("q"):
+        sql += " AND (u.full_name ILIKE :q OR p.bio ILIKE :q)"
+        binds["q"] = f"%{params['q']}%"
+    sql += " ORDER BY p.avg_rating DESC"
+    return text(sql), binds
+
+
+def fts_sql(params: dict):
+    """Cùng logic lọc/xếp hạng với routers/doctors.search_doctors."""
+    vector = models.DoctorProfile.search_vector
+    stmt = (
+        select(models.User.id)
+        .join(models.DoctorProfile, models.DoctorProfile.user_id == models.User.id)
+        .where(models.User.role == models.Role.doctor)
+    )
+    spec_query = search.to_tsquery(params.get("specialty"), weights=search.WEIGHT_SPECIALTY)
+    if spec_query is not None:
+        stmt = stmt.where(search.matches(vector, spec_query))
+    text_query = search.to_tsquery(params.get("q"))
+    if text_query is not None:
+        stmt = stmt.where(search.matches(vector, text_query)).order_by(
+            search.rank(vector, text_query).desc(), models.DoctorProfile.avg_rating.desc()
+        )
+    else:
+        stmt = stmt.order_by(models.DoctorProfile.avg_rating.desc())
+    return stmt, {}
+
+
+def measure(conn, stmt, binds, repeat: int):
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = len(conn.execute(stmt, binds).all())
+        timings.append((time.perf_counter() - t0) * 1000)
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    return statistics.median(timings), p99, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctors", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--limit", type=int, default=20, help="số kết quả lấy mỗi truy vấn (trang đầu)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="COMMIT dữ liệu giả thay vì ROLLBACK")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            t0 = time.perf_counter()
+            seed(conn, args.doctors, random.Random(args.seed))
+            print(f"Seeded {args.doctors} doctors in {time.perf_counter() - t0:.1f}s\n")
+
+            print(f"{'query':<20} {'ILIKE p50':>10} {'ILIKE p99':>10} {'FTS p50':>10} {'FTS p99':>10} {'rows':>6}")
+            for label, params in QUERIES:
+                stmt, binds = legacy_sql(params)
+                stmt = text(f"{stmt.text} LIMIT {int(args.limit)}")
+                old_p50, old_p99, _ = measure(conn, stmt, binds, args.repeat)
+                new_stmt, new_binds = fts_sql(params)
+                new_p50, new_p99, rows = measure(conn, new_stmt.limit(args.limit), new_binds, args.repeat)
+                print(f"{label:<20} {old_p50:>8.2f}ms {old_p99:>8.2f}ms {new_p50:>8.2f}ms {new_p99:>8.2f}ms {rows:>6}")
+
+            stmt, _ = fts_sql({"q": "nguyen tam"})
+            compiled = stmt.limit(args.limit).compile(engine)
+            print("\nEXPLAIN (FTS, q='nguyen tam'):")
+            # Enum được lưu theo tên (vd 'doctor'), exec_driver_sql không tự chuyển đổi
+            params = {k: v.name if isinstance(v, enum.Enum) else v for k, v in compiled.params.items()}
+            for (line,) in conn.exec_driver_sql(f"EXPLAIN {compiled.string}", params):
+                print("  " + line)
+        finally:
+            if args.keep:
+                trans.commit()
+            else:
+                trans.rollback()
+
+
+if __name__ == "__main__":
+    main()
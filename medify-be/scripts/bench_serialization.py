@@ -0,0 +1,125 @@
+# scripts/bench_serialization.py
+"""
+Benchmark serialize danh sách: đường mặc định (validate response_model + dump_json
+của Pydantic) so với FAST_JSON (app/serialization.py: đọc thuộc tính + orjson).
+
+Mặc định chạy trong bộ nhớ với đối tượng ORM dựng sẵn (không cần DB):
+    PYTHONPATH=. python scripts/bench_serialization.py --rows 5000
+
+--http: gọi thật các endpoint qua TestClient trên dữ liệu đang có trong DATABASE_URL
+(đăng nhập bằng --email/--password của admin), đo request/giây khi tắt / bật FAST_JSON:
+    PYTHONPATH=. python scripts/bench_serialization.py --http --limit 200
+"""
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+# Thêm thư mục gốc vào PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pydantic import TypeAdapter
+
+from app import models, schemas, serialization
+from app.config import settings
+
+
+def make_appointments(n: int) -> List[models.Appointment]:
+    doctors = []
+    for i in range(50):
+        d = models.User(id=10_000 + i, email=f"d{i}@medify.vn", full_name=f"Bác sĩ {i}",
+                        gender=models.Gender.male, role=models.Role.doctor, is_active=True)
+        d.specialty = "Tim mạch"
+        doctors.append(d)
+    patients = [
+        models.User(id=20_000 + i, email=f"p{i}@medify.vn", full_name=f"Bệnh nhân {i}",
+                    gender=models.Gender.female, role=models.Role.patient, is_active=True)
+        for i in range(500)
+    ]
+    start = datetime(2025, 1, 1, 8, 0)
+    rows = []
+    for i in range(n):
+        d, p = doctors[i % len(doctors)], patients[i % len(patients)]
+        s = start + timedelta(minutes=30 * i)
+        rows.append(models.Appointment(
+            id=i + 1, patient_id=p.id, doctor_id=d.id, start_at=s, end_at=s + timedelta(minutes=30),
+            status=models.AppointmentStatus.booked, note="Khám định kỳ", patient=p, doctor=d,
+        ))
+    return rows
+
+
+def measure(fn, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings)
+
+
+def bench_memory(rows: int, repeat: int) -> None:
+    appointments = make_appointments(rows)
+    users = [u for u in {a.patient.id: a.patient for a in appointments}.values()]
+
+    cases = []
+    for label, schema, data in [
+        ("AppointmentOut", schemas.AppointmentOut, appointments),
+        ("UserOut", schemas.UserOut, users),
+    ]:
+        adapter = TypeAdapter(List[schema])
+
+        def default(schema=schema, adapter=adapter, data=data):
+            # Như FastAPI với response_model: validate from_attributes rồi dump_json
+            return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+        def fast(schema=schema, data=data):
+            return serialization.dumps_trusted(schema, data)
+
+        assert default() == fast(), f"{label}: output khác nhau"
+        cases.append((label, len(data), default, fast))
+
+    print(f"{'schema':<16} {'rows':>6} {'default':>12} {'FAST_JSON':>12} {'speedup':>8}")
+    for label, n, default, fast in cases:
+        t_default, t_fast = measure(default, repeat), measure(fast, repeat)
+        print(f"{label:<16} {n:>6} {n / t_default:>8.0f} r/s {n / t_fast:>8.0f} r/s {t_default / t_fast:>7.1f}x")
+
+
+def bench_http(limit: int, repeat: int, email: str, password: str) -> None:
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        token = client.post("/auth/login", json={"email": email, "password": password}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        print(f"{'endpoint':<24} {'default':>10} {'FAST_JSON':>10} {'speedup':>8}")
+        for url in ["/appointments", "/admin/appointments", "/admin/users"]:
+            results = []
+            for fast in (False, True):
+                settings.FAST_JSON = fast
+                call = lambda: client.get(url, params={"limit": limit}, headers=headers).raise_for_status()
+                call()  # khởi động
+                results.append(1 / measure(call, repeat))
+            print(f"{url:<24} {results[0]:>6.1f} r/s {results[1]:>6.1f} r/s {results[1] / results[0]:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--http", action="store_true", help="đo qua endpoint thật (cần DB)")
+    parser.add_argument("--limit", type=int, default=settings.PAGE_SIZE_MAX)
+    parser.add_argument("--email", default="admin@medify.vn")
+    parser.add_argument("--password", default="Admin@123")
+    args = parser.parse_args()
+
+    if args.http:
+        bench_http(args.limit, args.repeat, args.email, args.password)
+    else:
+        bench_memory(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# scripts/check_query_counts.py
+"""
+Kiểm tra số câu SQL mỗi request của các endpoint danh sách lịch hẹn không phụ
+thuộc số dòng trả về (chặn lại lỗi N+1 do lazy-load quan hệ).
+
+Tạo dữ liệu giả (email 'qcount-*', note 'qcount'): một bệnh nhân hẹn với --rows bác
+sĩ khác nhau và một bác sĩ được --rows bệnh nhân khác nhau hẹn, rồi gọi qua TestClient
+với limit=1, limit=--rows và trang kế tiếp (cursor), khi tắt / bật FAST_JSON.
+Số câu SQL được đếm bằng sự kiện before_cursor_execute của engine.
+
+Thoát mã 1 nếu số câu SQL thay đổi theo limit hoặc vượt --budget:
+    PYTHONPATH=. python scripts/check_query_counts.py
+    DB_ASYNC=true PYTHONPATH=. python scripts/check_query_counts.py
+
+Dữ liệu giả bị xoá khi xong.
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Thêm thư mục gốc vào PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+from app import models
+from app.config import settings
+from app.db import async_engine, engine
+from app.main import app
+from app.security import create_access_token
+
+NOTE = "qcount"
+FIRST = datetime(2100, 1, 1, 8, 0)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.engines = [e for e in (engine, async_engine and async_engine.sync_engine) if e is not None]
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        for e in self.engines:
+            event.listen(e, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        for e in self.engines:
+            event.remove(e, "before_cursor_execute", self._on_execute)
+
+
+def _users(conn, prefix: str, role: str, n: int):
+    return conn.execute(
+        text(
+            "INSERT INTO users (email, full_name, password_hash, is_active, role) "
+            "SELECT 'qcount-' || :prefix || g || '@medify.vn', 'QCount ' || :prefix || g, 'x', true, :role "
+            "FROM generate_series(1, :n) g ORDER BY g RETURNING id"
+        ),
+        {"prefix": prefix, "role": role, "n": n},
+    ).scalars().all()
+
+
+def setup(rows: int):
+    with engine.begin() as conn:
+        admin_id, = _users(conn, "a", "admin", 1)
+        doctor_ids = _users(conn, "d", "doctor", rows)
+        patient_ids = _users(conn, "p", "patient", rows)
+        conn.execute(
+            text(
+                "INSERT INTO doctor_profiles (user_id, specialty, years_exp, bio, avg_rating) "
+                "SELECT unnest(CAST(:ids AS integer[])), 'Tim mạch', 5, '', 0"
+            ),
+            {"ids": doctor_ids},
+        )
+        # Bệnh nhân đầu hẹn với mọi bác sĩ; bác sĩ đầu được mọi bệnh nhân hẹn (ngày khác)
+        pairs = [(patient_ids[0], d, FIRST + timedelta(hours=i)) for i, d in enumerate(doctor_ids)]
+        pairs += [(p, doctor_ids[0], FIRST + timedelta(days=1, hours=i)) for i, p in enumerate(patient_ids)]
+        conn.execute(
+            text(
+                "INSERT INTO appointments (patient_id, doctor_id, start_at, end_at, status, note) "
+                "VALUES (:p, :d, :s, :s + interval '30 minutes', 'booked', :note)"
+            ),
+            [{"p": p, "d": d, "s": s, "note": NOTE} for p, d, s in pairs],
+        )
+    return admin_id, doctor_ids[0], patient_ids[0]
+
+
+def cleanup() -> None:
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM appointments WHERE note = :note"), {"note": NOTE})
+        conn.execute(
+            text("DELETE FROM doctor_profiles WHERE user_id IN (SELECT id FROM users WHERE email LIKE 'qcount-%')")
+        )
+        conn.execute(text("DELETE FROM users WHERE email LIKE 'qcount-%'"))
+
+
+def _headers(user_id: int, role: models.Role) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(str(user_id), role.value)}"}
+
+
+def measure(client: TestClient, url: str, headers: dict, params: dict):
+    with QueryCounter() as counter:
+        r = client.get(url, headers=headers, params=params)
+    r.raise_for_status()
+    return counter.count, len(r.json()), r.headers.get("x-next-cursor")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50, help="số lịch hẹn của mỗi người dùng thử")
+    parser.add_argument("--budget", type=int, default=1, help="số câu SQL tối đa mỗi request")
+    args = parser.parse_args()
+    rows = min(args.rows, settings.PAGE_SIZE_MAX)
+
+    admin_id, doctor_id, patient_id = setup(rows)
+    failures = []
+    try:
+        cases = [
+            ("GET /appointments (patient)", "/appointments", _headers(patient_id, models.Role.patient)),
+            ("GET /appointments (doctor)", "/appointments", _headers(doctor_id, models.Role.doctor)),
+            ("GET /admin/appointments", "/admin/appointments", _headers(admin_id, models.Role.admin)),
+        ]
+        with TestClient(app) as client:
+            print(f"{'endpoint':<30} {'FAST_JSON':<9} {'limit=1':>8} {f'limit={rows}':>9} {'cursor':>7}")
+            for label, url, headers in cases:
+                for fast in (False, True):
+                    settings.FAST_JSON = fast
+                    measure(client, url, headers, {"limit": 1})  # khởi động (cache, kết nối)
+                    one, _, cursor = measure(client, url, headers, {"limit": 1})
+                    many, n, _ = measure(client, url, headers, {"limit": rows})
+                    nxt, _, _ = measure(client, url, headers, {"limit": rows, "cursor": cursor})
+                    print(f"{label:<30} {str(fast):<9} {one:>8} {many:>9} {nxt:>7}")
+                    if n < rows:
+                        failures.append(f"{label}: chỉ trả {n}/{rows} dòng")
+                    if not one == many == nxt:
+                        failures.append(f"{label} FAST_JSON={fast}: số câu SQL đổi theo số dòng ({one}/{many}/{nxt})")
+                    if max(one, many, nxt) > args.budget:
+                        failures.append(f"{label} FAST_JSON={fast}: {max(one, many, nxt)} câu SQL > {args.budget}")
+    finally:
+        cleanup()
+
+    for f in failures:
+        print(f"❌ {f}")
+    if not failures:
+        print("✅ Số câu SQL không đổi theo số dòng")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# scripts/check_search_paging.py
+"""
+Kiểm tra phân trang keyset của GET /doctors?q=... (sắp theo điểm liên quan): đi hết
+các trang bằng X-Next-Cursor và so với số bác sĩ khớp truy vấn đếm trực tiếp bằng SQL.
+Điểm ts_rank_cd trùng nhau rất nhiều, nên giá trị rank trong cursor phải so sánh
+chính xác với giá trị trong DB; sai lệch làm mất hoặc lặp dòng ở ranh giới trang.
+
+Chạy trên dữ liệu có sẵn (vd sinh bằng scripts/generate_data.py):
+    PYTHONPATH=. python scripts/check_search_paging.py
+    PYTHONPATH=. python scripts/check_search_paging.py -q "nguyen van" -q nhi --limit 3
+
+Thoát mã 1 nếu có dòng bị lặp hoặc bị bỏ sót.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Thêm thư mục gốc vào PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+
+from app import models, search
+from app.db import SessionLocal
+from app.main import app
+from app.pagination import NEXT_CURSOR_HEADER
+
+DEFAULT_QUERIES = ["tran van", "thi", "nhi", "tim mach", "minh"]
+
+
+def expected(q: str):
+    """(số bác sĩ khớp, số giá trị rank khác nhau) tính trực tiếp bằng SQL."""
+    vector = models.DoctorProfile.search_vector
+    query = search.to_tsquery(q)
+    relevance = search.rank(vector, query)
+    with SessionLocal() as db:
+        return (
+            db.query(func.count(), func.count(relevance.distinct()))
+            .select_from(models.User)
+            .join(models.DoctorProfile, models.DoctorProfile.user_id == models.User.id)
+            .filter(models.User.role == models.Role.doctor, search.matches(vector, query))
+            .one()
+        )
+
+
+def walk(client: TestClient, q: str, limit: int, max_pages: int):
+    ids, pages, cursor = [], 0, None
+    # Cursor lỗi có thể trả lại cùng một trang mãi: dừng sau max_pages
+    while pages < max_pages:
+        params = {"q": q, "limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        r = client.get("/doctors", params=params)
+        r.raise_for_status()
+        ids.extend(d["id"] for d in r.json())
+        pages += 1
+        cursor = r.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+    return ids, pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-q", "--query", action="append", help="từ khoá (lặp lại được)")
+    parser.add_argument("--limit", type=int, default=7, help="kích thước trang (nhỏ để có nhiều ranh giới)")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'q':<12} {'khớp':>6} {'rank≠':>6} {'trang':>6} {'nhận':>6} {'lặp':>5} {'thiếu':>6}")
+    with TestClient(app) as client:
+        for q in args.query or DEFAULT_QUERIES:
+            total, distinct_ranks = expected(q)
+            ids, pages = walk(client, q, args.limit, max_pages=total // args.limit + 2)
+            duplicates = len(ids) - len(set(ids))
+            missing = total - len(set(ids))
+            ok = duplicates == 0 and missing == 0
+            failed |= not ok
+            print(f"{q:<12} {total:>6} {distinct_ranks:>6} {pages:>6} {len(ids):>6} {duplicates:>5} {missing:>6} "
+                  f"{'✅' if ok else '❌'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
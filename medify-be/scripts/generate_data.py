@@ -0,0 +1,405 @@
+# scripts/generate_data.py
+"""
+Sinh dữ liệu giả quy mô lớn (đo tải / capacity) và nạp bằng COPY.
+
+Thế giới sinh ra (cùng --seed -> cùng dữ liệu, để benchmark lặp lại được):
+- --patients bệnh nhân, --doctors bác sĩ thuộc các chuyên khoa, một admin;
+  mọi tài khoản dùng chung mật khẩu --password (bcrypt một lần)
+- lịch làm việc 3-6 ngày/tuần mỗi bác sĩ, ca sáng / chiều / cả ngày
+- khoảng --appointments lịch hẹn 30 phút trong --years năm trước --end và
+  --future-days ngày sau đó, chia cho bác sĩ theo độ "hot" (lệch), luôn nằm trong
+  lịch làm việc và không trùng giờ; trước --end: done / canceled, sau: booked / canceled
+- review cho khoảng --review-rate lịch hẹn đã khám
+
+Cách nạp: id được đánh trước (tiếp theo max(id) hiện có) và ghi bằng COPY theo lô;
+lịch hẹn được ghi theo thứ tự thời gian (như dữ liệu thật). Index / constraint phụ của
+appointments và reviews bị gỡ trong lúc nạp rồi tạo lại (cùng một transaction: lỗi
+giữa chừng thì không còn gì thay đổi); phần lớn thời gian là dựng index GiST của
+appointments_no_overlap. Sau đó dựng lại
+bộ đếm dashboard (stats.rebuild), điểm đánh giá (ratings.reconcile) và ANALYZE.
+
+Chạy (cần DATABASE_URL dùng driver psycopg2, đã `alembic upgrade head`):
+    PYTHONPATH=. python scripts/generate_data.py --truncate
+    PYTHONPATH=. python scripts/generate_data.py --truncate --patients 500000 --doctors 5000 --appointments 10000000
+
+Email có dạng patient<i>@<--domain>, doctor<i>@<--domain>, admin@<--domain>; chạy lần
+hai vào cùng DB mà không --truncate thì cần --domain khác. Server đang chạy chỉ thấy
+bác sĩ mới sau khi cache danh mục hết hạn (DOCTOR_CATALOG_REFRESH_SECONDS).
+"""
+import argparse
+import bisect
+import io
+import random
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Thêm thư mục gốc vào PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import column, table, text, update
+
+from app import ratings, search, stats
+from app.db import SessionLocal, engine
+from app.security import hash_password
+
+LAST_NAMES = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng", "Bùi", "Đỗ",
+              "Hồ", "Ngô", "Dương", "Lý"]
+MIDDLE_NAMES = ["Văn", "Thị", "Hữu", "Minh", "Ngọc", "Thanh", "Quốc", "Đức", "Gia", "Bảo", "Kim", "Xuân"]
+FIRST_NAMES = ["An", "Bình", "Châu", "Dũng", "Giang", "Hà", "Hải", "Hạnh", "Hùng", "Khoa", "Lan", "Linh",
+               "Long", "Mai", "Nam", "Phúc", "Quân", "Tâm", "Thảo", "Trang", "Tuấn", "Uyên", "Việt", "Vy", "Yến"]
+# Chuyên khoa kèm tỉ trọng số bác sĩ
+SPECIALTIES = [("Nội tổng quát", 14), ("Nhi khoa", 12), ("Tim mạch", 9), ("Sản phụ khoa", 9),
+               ("Răng hàm mặt", 8), ("Da liễu", 7), ("Tai mũi họng", 7), ("Mắt", 6), ("Tiêu hoá", 6),
+               ("Thần kinh", 5), ("Nội tiết", 5), ("Hô hấp", 4), ("Chấn thương chỉnh hình", 5),
+               ("Tâm lý", 3)]
+HOSPITALS = ["Chợ Rẫy", "Bạch Mai", "Từ Dũ", "Nhi Đồng 1", "Đại học Y Dược", "Việt Đức", "115", "Thống Nhất"]
+NOTES = ["Khám định kỳ", "Tái khám", "Đau đầu kéo dài", "Ho, sốt", "Tư vấn kết quả xét nghiệm",
+         "Đau bụng", "Khám tổng quát", "Dị ứng da"]
+COMMENTS = ["Bác sĩ tận tình", "Khám kỹ, giải thích rõ ràng", "Phải chờ hơi lâu", "Rất hài lòng",
+            "Tư vấn dễ hiểu", "Bình thường", "Thái độ chưa tốt", "Sẽ quay lại"]
+# Ca làm việc (giờ bắt đầu, giờ kết thúc) tính bằng phút trong ngày
+SHIFTS = [(7 * 60 + 30, 11 * 60 + 30), (13 * 60, 17 * 60), (8 * 60, 17 * 60)]
+SLOT_MINUTES = 30
+
+NULL = "\\N"
+
+
+class CopyWriter:
+    """Gom dòng theo lô rồi COPY ... FROM STDIN (định dạng text, tab)."""
+
+    def __init__(self, cursor, table_name: str, columns: Sequence[str], batch: int):
+        self.cursor = cursor
+        self.sql = f"COPY {table_name} ({', '.join(columns)}) FROM STDIN"
+        self.batch = batch
+        self.buf = io.StringIO()
+        self.pending = 0
+        self.total = 0
+
+    def add(self, *values) -> None:
+        self.add_line("\t".join(NULL if v is None else str(v) for v in values) + "\n")
+
+    def add_line(self, line: str) -> None:
+        """Một dòng đã format sẵn (kết thúc bằng \\n, NULL là \\N)."""
+        self.buf.write(line)
+        self.pending += 1
+        if self.pending >= self.batch:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.pending:
+            self.buf.seek(0)
+            self.cursor.copy_expert(self.sql, self.buf)
+            self.total += self.pending
+            self.buf = io.StringIO()
+            self.pending = 0
+
+
+def _next_id(conn, table_name: str) -> int:
+    return conn.execute(text(f"SELECT COALESCE(max(id), 0) + 1 FROM {table_name}")).scalar()
+
+
+def _drop_secondary(conn, table_name: str) -> List[str]:
+    """Gỡ mọi index / constraint (trừ khoá chính) của bảng, trả về các câu tạo lại."""
+    constraints = conn.execute(
+        text(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = CAST(:t AS regclass) AND contype <> 'p'"
+        ),
+        {"t": table_name},
+    ).all()
+    indexes = conn.execute(
+        text(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE schemaname = current_schema() AND tablename = :t "
+            "  AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = CAST(:t AS regclass))"
+        ),
+        {"t": table_name},
+    ).all()
+    for name, _ in constraints:
+        conn.execute(text(f'ALTER TABLE {table_name} DROP CONSTRAINT "{name}"'))
+    for name, _ in indexes:
+        conn.execute(text(f'DROP INDEX "{name}"'))
+    return [d for _, d in indexes] + [f'ALTER TABLE {table_name} ADD CONSTRAINT "{n}" {d}' for n, d in constraints]
+
+
+def _full_name(rng: random.Random) -> str:
+    return f"{rng.choice(LAST_NAMES)} {rng.choice(MIDDLE_NAMES)} {rng.choice(FIRST_NAMES)}"
+
+
+def _gender(rng: random.Random) -> Optional[str]:
+    return rng.choices(["male", "female", "other", None], weights=[47, 49, 1, 3])[0]
+
+
+def load_users(conn, cursor, args, rng: random.Random, password_hash: str, start: datetime):
+    """Ghi users, doctor_profiles, availabilities; trả về danh sách bác sĩ và id bệnh nhân."""
+    user_id = _next_id(conn, "users")
+    profile_id = _next_id(conn, "doctor_profiles")
+    availability_id = _next_id(conn, "availabilities")
+
+    users = CopyWriter(
+        cursor, "users",
+        ["id", "email", "full_name", "gender", "password_hash", "is_active", "role", "created_at"], args.batch,
+    )
+    profiles = CopyWriter(
+        cursor, "doctor_profiles", ["id", "user_id", "specialty", "years_exp", "bio", "avg_rating"], args.batch,
+    )
+    availabilities = CopyWriter(
+        cursor, "availabilities", ["id", "doctor_id", "weekday", "start_time", "end_time"], args.batch,
+    )
+
+    def joined_at() -> datetime:
+        return start - timedelta(days=rng.randint(0, 365), seconds=rng.randint(0, 86399))
+
+    users.add(user_id, f"admin@{args.domain}", "Quản trị", None, password_hash, True, "admin", joined_at())
+    user_id += 1
+
+    specialties, weights = zip(*SPECIALTIES)
+    doctors, documents = [], []
+    for i in range(1, args.doctors + 1):
+        name = _full_name(rng)
+        specialty = rng.choices(specialties, weights=weights)[0]
+        years = rng.randint(1, 35)
+        bio = (f"Tốt nghiệp Đại học Y, {years} năm kinh nghiệm {specialty.lower()} "
+               f"tại bệnh viện {rng.choice(HOSPITALS)}")
+        users.add(user_id, f"doctor{i}@{args.domain}", name, _gender(rng), password_hash,
+                  rng.random() > 0.02, "doctor", joined_at())
+        profiles.add(profile_id, user_id, specialty, years, bio, 0)
+        documents.append((profile_id, *search.search_document(name, specialty, bio)))
+
+        # Lịch làm việc -> các khung 30 phút trong tuần (phút tính từ 00:00 thứ Hai)
+        week_slots = []
+        for weekday in sorted(rng.sample(range(6), rng.randint(3, 6))):
+            shift_start, shift_end = rng.choice(SHIFTS)
+            availabilities.add(
+                availability_id, profile_id, weekday,
+                f"{shift_start // 60:02d}:{shift_start % 60:02d}", f"{shift_end // 60:02d}:{shift_end % 60:02d}",
+            )
+            availability_id += 1
+            base = weekday * 1440
+            week_slots.extend(range(base + shift_start, base + shift_end - SLOT_MINUTES + 1, SLOT_MINUTES))
+        # Độ "hot" (số lịch hẹn tương đối) và chất lượng (điểm review trung bình)
+        doctors.append((user_id, profile_id, week_slots, rng.lognormvariate(0, 0.8), rng.uniform(3.0, 5.0)))
+        user_id += 1
+        profile_id += 1
+
+    first_patient = user_id
+    for i in range(1, args.patients + 1):
+        users.add(user_id, f"patient{i}@{args.domain}", _full_name(rng), _gender(rng), password_hash,
+                  rng.random() > 0.01, "patient", joined_at())
+        user_id += 1
+
+    for w in (users, profiles, availabilities):
+        w.flush()
+
+    # search_vector tính bằng cùng biểu thức với API (app/search.py)
+    cursor.execute("CREATE TEMP TABLE gen_documents (id integer, name text, specialty text, bio text) ON COMMIT DROP")
+    docs = CopyWriter(cursor, "gen_documents", ["id", "name", "specialty", "bio"], args.batch)
+    for row in documents:
+        docs.add(*row)
+    docs.flush()
+    d = table("gen_documents", column("id"), column("name"), column("specialty"), column("bio"))
+    p = table("doctor_profiles", column("id"), column("search_vector"))
+    stmt = (
+        update(p)
+        .where(p.c.id == d.c.id)
+        .values(search_vector=search.vector_from_document(d.c.name, d.c.specialty, d.c.bio))
+    )
+    conn.execute(stmt)
+
+    return doctors, list(range(first_patient, user_id)), users.total
+
+
+def _rating(rng: random.Random, quality: float) -> int:
+    return max(1, min(5, round(rng.gauss(quality, 1.0))))
+
+
+def load_appointments(conn, cursor, args, rng: random.Random, doctors, patient_ids, start: datetime,
+                      end: datetime) -> Tuple[int, int, Dict[str, int]]:
+    appointment_id = _next_id(conn, "appointments")
+    review_id = _next_id(conn, "reviews")
+    appointments = CopyWriter(
+        cursor, "appointments",
+        ["id", "patient_id", "doctor_id", "start_at", "end_at", "status", "note", "created_at"], args.batch,
+    )
+    reviews = CopyWriter(
+        cursor, "reviews", ["id", "appointment_id", "doctor_profile_id", "rating", "comment", "created_at"],
+        args.batch,
+    )
+
+    # Lịch hẹn nằm trong các tuần (tính từ thứ Hai) phủ [start, end + future_days).
+    # Mọi mốc thời gian rơi vào lưới 30 phút: chuỗi timestamp được dựng sẵn theo chỉ số
+    # nửa giờ (h) thay vì tạo / format datetime cho từng dòng
+    monday = datetime.combine((start - timedelta(days=start.weekday())).date(), datetime.min.time())
+    horizon = end + timedelta(days=args.future_days)
+    weeks = (horizon - monday).days // 7 + 1
+    half_hours_per_week = 7 * 24 * 60 // SLOT_MINUTES
+    lead = 30 * 24 * 60 // SLOT_MINUTES       # đặt lịch trước tối đa 30 ngày
+    review_delay = 7 * 24 * 60 // SLOT_MINUTES  # review trong vòng 7 ngày sau khám
+    slot = timedelta(minutes=SLOT_MINUTES)
+    stamps = [str(monday + slot * (h - lead)) for h in range(lead + weeks * half_hours_per_week + review_delay + 2)]
+
+    def half_hour(dt: datetime) -> int:
+        return lead - (-(dt - monday) // slot)  # làm tròn lên
+
+    first, now, last = half_hour(start), half_hour(end), half_hour(horizon)
+    status_counts = {"booked": 0, "done": 0, "canceled": 0}
+    n_patients = len(patient_ids)
+    rand, randint, choice = rng.random, rng.randint, rng.choice
+
+    # Khung k của một bác sĩ (k = tuần * số khung/tuần + i) ứng với nửa giờ h tăng theo
+    # k: các khung nằm trong [start, horizon) là một đoạn liên tiếp [k_lo, k_hi)
+    windows = []
+    for user_id, profile_id, week_slots, weight, quality in doctors:
+        if not week_slots:
+            continue
+        offsets = [m // SLOT_MINUTES for m in week_slots]
+
+        def position(k: int, n: int = len(offsets), offsets: List[int] = offsets) -> int:
+            return lead + k // n * half_hours_per_week + offsets[k % n]
+
+        ks = range(weeks * len(offsets))
+        windows.append((user_id, profile_id, offsets, weight, quality,
+                        bisect.bisect_left(ks, first, key=position), bisect.bisect_left(ks, last, key=position)))
+
+    # Chia --appointments theo trọng số; bác sĩ kín lịch nhận đủ sức chứa, phần dư
+    # chia lại cho những người còn chỗ
+    quotas: Dict[int, float] = {}
+    open_ = list(range(len(windows)))
+    while open_:
+        remaining = args.appointments - sum(quotas.values())
+        weight_sum = sum(windows[i][3] for i in open_)
+        full = [i for i in open_ if windows[i][6] - windows[i][5] <= remaining * windows[i][3] / weight_sum]
+        for i in full or open_:
+            capacity = windows[i][6] - windows[i][5]
+            quotas[i] = capacity if full else remaining * windows[i][3] / weight_sum
+        open_ = [i for i in open_ if i not in quotas]
+
+    # Mỗi bác sĩ: chọn trước các khung (đã sắp xếp); các khung khác nhau -> không bao
+    # giờ trùng giờ
+    plans = []
+    for i, (user_id, profile_id, offsets, _, quality, k_lo, k_hi) in enumerate(windows):
+        ks = sorted(rng.sample(range(k_lo, k_hi), min(k_hi - k_lo, round(quotas[i]))))
+        plans.append((user_id, profile_id, offsets, quality, array("l", ks)))
+
+    # Ghi theo thứ tự thời gian (từng tuần, trộn mọi bác sĩ) như dữ liệu thật: id tăng
+    # theo giờ khám, và index GiST của appointments_no_overlap dựng nhanh hơn nhiều so
+    # với khi dữ liệu xếp theo từng bác sĩ
+    cursors = [0] * len(plans)
+    for week in range(weeks):
+        if week % max(1, weeks // 10) == 0:
+            print(f"  ... tuần {week}/{weeks}, {appointments.total + appointments.pending:,} lịch hẹn", flush=True)
+        batch = []
+        for p, (_, _, offsets, _, ks) in enumerate(plans):
+            n, j = len(offsets), cursors[p]
+            base = lead + week * half_hours_per_week
+            while j < len(ks) and ks[j] < (week + 1) * n:
+                batch.append((base + offsets[ks[j] - week * n], p))
+                j += 1
+            cursors[p] = j
+        batch.sort()
+
+        for h, p in batch:
+            if h < first or h >= last:
+                continue
+            user_id, profile_id, _, quality, _ = plans[p]
+            if h < now:
+                status = "canceled" if rand() < args.cancel_rate else "done"
+            else:
+                status = "canceled" if rand() < args.cancel_rate / 2 else "booked"
+            # Bệnh nhân có id nhỏ đặt lịch nhiều hơn (khách quen)
+            patient_id = patient_ids[int(n_patients * rand() ** 2)]
+            note = choice(NOTES) if rand() < 0.6 else NULL
+            created_at = stamps[h - randint(2, lead)]
+            appointments.add_line(
+                f"{appointment_id}\t{patient_id}\t{user_id}\t{stamps[h]}\t{stamps[h + 1]}\t"
+                f"{status}\t{note}\t{created_at}\n"
+            )
+            status_counts[status] += 1
+            if status == "done" and rand() < args.review_rate:
+                comment = choice(COMMENTS) if rand() < 0.7 else NULL
+                reviews.add_line(
+                    f"{review_id}\t{appointment_id}\t{profile_id}\t{_rating(rng, quality)}\t{comment}\t"
+                    f"{stamps[h + 1 + randint(1, review_delay)]}\n"
+                )
+                review_id += 1
+            appointment_id += 1
+
+    appointments.flush()
+    reviews.flush()
+    return appointments.total, reviews.total, status_counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=50_000)
+    parser.add_argument("--doctors", type=int, default=1_000)
+    parser.add_argument("--appointments", type=int, default=1_000_000, help="số lịch hẹn (xấp xỉ)")
+    parser.add_argument("--years", type=float, default=3.0, help="số năm lịch sử trước --end")
+    parser.add_argument("--end", type=datetime.fromisoformat, default=datetime(2026, 1, 1),
+                        help="mốc 'hiện tại' của dữ liệu (cố định để dữ liệu không đổi theo ngày chạy)")
+    parser.add_argument("--future-days", type=int, default=30, help="số ngày lịch hẹn booked sau --end")
+    parser.add_argument("--cancel-rate", type=float, default=0.12)
+    parser.add_argument("--review-rate", type=float, default=0.35, help="tỉ lệ lịch hẹn đã khám có review")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default="123456")
+    parser.add_argument("--domain", default="gen.medify.vn")
+    parser.add_argument("--batch", type=int, default=100_000, help="số dòng mỗi lệnh COPY")
+    parser.add_argument("--maintenance-work-mem", default="512MB", help="bộ nhớ khi tạo lại index")
+    parser.add_argument("--truncate", action="store_true", help="xoá sạch dữ liệu hiện có trước khi nạp")
+    args = parser.parse_args()
+
+    if engine.dialect.driver != "psycopg2":
+        sys.exit("generate_data.py cần DATABASE_URL dùng driver psycopg2 (COPY FROM STDIN)")
+
+    rng = random.Random(args.seed)
+    end = args.end
+    start = end - timedelta(days=round(365 * args.years))
+    password_hash = hash_password(args.password)
+
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        cursor = conn.connection.dbapi_connection.cursor()
+        conn.execute(text(f"SET LOCAL maintenance_work_mem = '{args.maintenance_work_mem}'"))
+        if args.truncate:
+            conn.execute(text(
+                "TRUNCATE reviews, appointments, availabilities, doctor_profiles, users, "
+                "appointment_daily_stats, user_stats RESTART IDENTITY CASCADE"
+            ))
+
+        doctors, patient_ids, n_users = load_users(conn, cursor, args, rng, password_hash, start)
+        t_users = time.perf_counter()
+        print(f"users: {n_users:,} ({args.doctors:,} bác sĩ) trong {t_users - t0:.1f}s", flush=True)
+
+        recreate = _drop_secondary(conn, "reviews") + _drop_secondary(conn, "appointments")
+        n_appointments, n_reviews, status_counts = load_appointments(
+            conn, cursor, args, rng, doctors, patient_ids, start, end
+        )
+        t_load = time.perf_counter()
+        print(f"appointments: {n_appointments:,} {status_counts}, reviews: {n_reviews:,} "
+              f"trong {t_load - t_users:.1f}s ({n_appointments / max(t_load - t_users, 1e-9):,.0f} dòng/s)",
+              flush=True)
+
+        for stmt in recreate:
+            conn.execute(text(stmt))
+        t_index = time.perf_counter()
+        print(f"index / constraint: {len(recreate)} trong {t_index - t_load:.1f}s", flush=True)
+
+        for name in ("users", "doctor_profiles", "availabilities", "appointments", "reviews"):
+            conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), "
+                              f"(SELECT COALESCE(max(id), 1) FROM {name}))"))
+
+    with SessionLocal() as db:
+        stats.rebuild(db)
+        ratings.reconcile(db)
+        db.commit()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+    print(f"✅ Xong trong {time.perf_counter() - t0:.1f}s (bộ đếm dashboard, điểm đánh giá, ANALYZE)")
+
+
+if __name__ == "__main__":
+    main()
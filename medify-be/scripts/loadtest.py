@@ -0,0 +1,72 @@
+# scripts/loadtest.py
+"""
+Load test đơn giản (closed-loop) cho một endpoint của API đang chạy.
+
+Ví dụ so sánh sync / async trên 1 worker:
+    DB_ASYNC=false uvicorn app.main:app --port 8000 --workers 1
+    python scripts/loadtest.py --url http://127.0.0.1:8000/doctors?limit=20 -c 100 -d 20
+
+    DB_ASYNC=true uvicorn app.main:app --port 8000 --workers 1
+    python scripts/loadtest.py --url http://127.0.0.1:8000/doctors?limit=20 -c 100 -d 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def worker(client: httpx.AsyncClient, url: str, headers: dict, deadline: float, latencies: list, errors: list):
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            r = await client.get(url, headers=headers)
+            if r.status_code >= 400:
+                errors.append(r.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+
+async def run(args) -> None:
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    latencies, errors = [], []
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        deadline = time.perf_counter() + args.duration
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            worker(client, args.url, headers, deadline, latencies, errors)
+            for _ in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def pct(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else 0.0
+
+    print(f"URL          : {args.url}")
+    print(f"Concurrency  : {args.concurrency}  Duration: {elapsed:.1f}s")
+    print(f"Requests     : {len(latencies)} ok, {len(errors)} errors")
+    print(f"Throughput   : {len(latencies) / elapsed:.1f} req/s")
+    if latencies:
+        print(f"Latency (ms) : p50={statistics.median(latencies):.1f} p95={pct(0.95):.1f} "
+              f"p99={pct(0.99):.1f} max={latencies[-1]:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True)
+    parser.add_argument("-c", "--concurrency", type=int, default=50)
+    parser.add_argument("-d", "--duration", type=float, default=15.0, help="giây")
+    parser.add_argument("--token", help="JWT cho endpoint cần đăng nhập")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
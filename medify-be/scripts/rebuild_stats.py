@@ -0,0 +1,37 @@
+# scripts/rebuild_stats.py
+"""
+Kiểm tra / dựng lại bộ đếm dashboard (app/stats.py) từ bảng users và appointments.
+
+    PYTHONPATH=. python scripts/rebuild_stats.py --check   # chỉ in các khoá bị lệch
+    PYTHONPATH=. python scripts/rebuild_stats.py           # dựng lại toàn bộ
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Thêm thư mục gốc vào PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db import SessionLocal
+from app import stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="không ghi, chỉ báo chênh lệch")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        rows = stats.drift(db)
+        for r in rows:
+            print(f"{r['stat']:<13} {r['key']:<40} counter={r['counter']} actual={r['actual']}")
+        print(f"{len(rows)} khoá bị lệch")
+        if rows and not args.check:
+            stats.rebuild(db)
+            db.commit()
+            print("✅ Đã dựng lại bộ đếm")
+    sys.exit(1 if rows and args.check else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# scripts/reconcile_ratings.py
+"""
+Kiểm tra / sửa review_count, rating_sum, avg_rating của bác sĩ (app/ratings.py)
+theo bảng reviews. Có thể chạy định kỳ (cron) sau khi nhập dữ liệu ngoài API.
+
+    PYTHONPATH=. python scripts/reconcile_ratings.py --check   # chỉ in các hồ sơ bị lệch
+    PYTHONPATH=. python scripts/reconcile_ratings.py           # sửa các hồ sơ bị lệch
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Thêm thư mục gốc vào PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db import SessionLocal
+from app import ratings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="không ghi, chỉ báo chênh lệch")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        rows = ratings.drift(db)
+        for r in rows:
+            print(
+                f"profile {r['id']:<8} count={r['review_count']}/{r['actual_count']} "
+                f"sum={r['rating_sum']}/{r['actual_sum']} avg={r['avg_rating']}/{r['actual_avg']}"
+            )
+        print(f"{len(rows)} hồ sơ bị lệch")
+        if rows and not args.check:
+            fixed = ratings.reconcile(db)
+            db.commit()
+            print(f"✅ Đã sửa {fixed} hồ sơ")
+    sys.exit(1 if rows and args.check else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
 import sys
+from datetime import time
 from pathlib import Path
 
 # Thêm thư mục gốc vào PYTHONPATH
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.db import SessionLocal
-from app.models import User, Role, DoctorProfile
+from app.models import User, Role, DoctorProfile, Availability
 from app.security import hash_password
+from app.search import doctor_search_vector
+from app import stats
 
 
 if __name__ == "__main__":
@@ -14,6 +17,13 @@ if __name__ == "__main__":
     p = User(email="patient@medify.vn", full_name="Người Bệnh", password_hash=hash_password("123456"), role=Role.patient)
     d = User(email="doctor@medify.vn", full_name="Bác Sĩ A", password_hash=hash_password("123456"), role=Role.doctor)
     a = User(email="admin@medify.vn", full_name="Quản trị", password_hash=hash_password("Admin@123"), role=Role.admin)
-    db.add_all([p, d, a]); db.commit()
-    dp = DoctorProfile(user_id=d.id, specialty="Cardiology", years_exp=5, bio="Tốt nghiệp XYZ")
-    db.add(dp); db.commit(); db.close()
\ No newline at end of file
+    db.add_all([p, d, a]); db.flush()
+    for u in (p, d, a):
+        stats.user_added(db, u)
+    db.commit()
+    dp = DoctorProfile(user_id=d.id, specialty="Cardiology", years_exp=5, bio="Tốt nghiệp XYZ",
+                       search_vector=doctor_search_vector(d.full_name, "Cardiology", "Tốt nghiệp XYZ"))
+    db.add(dp); db.flush()
+    # Lịch làm việc thứ Hai - thứ Sáu (weekday theo datetime.weekday())
+    db.add_all([Availability(doctor_id=dp.id, weekday=wd, start_time=time(8), end_time=time(17)) for wd in range(5)])
+    db.commit(); db.close()
\ No newline at end of file